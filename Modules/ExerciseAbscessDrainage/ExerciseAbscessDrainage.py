@@ -2,6 +2,7 @@ import vtk, qt, ctk, slicer
 import os
 import numpy as np
 import time
+import shutil
 
 from slicer.ScriptedLoadableModule import *
 from slicer.util import VTKObservationMixin
@@ -42,8 +43,9 @@ class ExerciseAbscessDrainageWidget(ScriptedLoadableModuleWidget, VTKObservation
     ScriptedLoadableModuleWidget.__init__(self, parent)
     VTKObservationMixin.__init__(self)
 
-    # Create logic class
-    self.logic = ExerciseAbscessDrainageLogic(self)
+    # Create logic class (the module widget is only created when the exercise is selected)
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseAbscessDrainage.createLogic'):
+      self.logic = ExerciseAbscessDrainageLogic(self)
 
     slicer.ExerciseAbscessDrainageWidget = self # ONLY FOR DEVELOPMENT
 
@@ -55,7 +57,8 @@ class ExerciseAbscessDrainageWidget(ScriptedLoadableModuleWidget, VTKObservation
     ScriptedLoadableModuleWidget.setup(self)
 
     # Set up UI
-    self.setupUi()
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseAbscessDrainage.setupUi'):
+      self.setupUi()
 
     # Setup connections
     self.setupConnections()
@@ -83,7 +86,8 @@ class ExerciseAbscessDrainageWidget(ScriptedLoadableModuleWidget, VTKObservation
     self.logic.exerciseMode = appUseCase
     
     # Load exercise data
-    self.logic.loadExerciseData()
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseAbscessDrainage.loadExerciseData'):
+      self.logic.loadExerciseData()
 
     # Evaluation use case
     if appUseCase == Parameters.APP_USE_CASE_EVALUATION:
@@ -166,6 +170,7 @@ class ExerciseAbscessDrainageWidget(ScriptedLoadableModuleWidget, VTKObservation
     self.ui.trimSequenceDoubleRangeSlider.minimumPositionChanged.connect(self.onTrimSequenceMinPosDoubleRangeSliderModified)
     self.ui.trimSequenceDoubleRangeSlider.maximumPositionChanged.connect(self.onTrimSequenceMaxPosDoubleRangeSliderModified)
     self.ui.trimSequenceButton.clicked.connect(self.onTrimSequenceButtonClicked)
+    self.ui.playbackSpeedComboBox.currentIndexChanged.connect(self.onPlaybackSpeedComboBoxChanged)
     # Back to menu
     self.ui.backToMenuButton.clicked.connect(self.onBackToMenuButtonClicked)
 
@@ -198,6 +203,7 @@ class ExerciseAbscessDrainageWidget(ScriptedLoadableModuleWidget, VTKObservation
     self.ui.trimSequenceDoubleRangeSlider.minimumPositionChanged.disconnect()
     self.ui.trimSequenceDoubleRangeSlider.maximumPositionChanged.disconnect()
     self.ui.trimSequenceButton.clicked.disconnect()
+    self.ui.playbackSpeedComboBox.currentIndexChanged.disconnect()
     # Back to menu
     self.ui.backToMenuButton.clicked.disconnect()
 
@@ -419,6 +425,7 @@ class ExerciseAbscessDrainageWidget(ScriptedLoadableModuleWidget, VTKObservation
     # Create new recording
     synchronizedNodes = [self.logic.NeedleToTracker, self.logic.ProbeToTracker, self.logic.TrackerToPatient, self.logic.usImageVolumeNode]
     self.logic.sequenceBrowserUtils.setSynchronizedNodes(synchronizedNodes)
+    self.logic.sequenceBrowserUtils.setPreRollDuration(Parameters.instance.getParameterFloat(Parameters.RECORDING_PRE_ROLL_DURATION))
     self.logic.sequenceBrowserUtils.createNewSequenceBrowser()
 
     # Update GUI
@@ -430,8 +437,18 @@ class ExerciseAbscessDrainageWidget(ScriptedLoadableModuleWidget, VTKObservation
     # Get recording duration
     recordingDuration = self.logic.sequenceBrowserUtils.getRecordingLength()
     
+    # Save sequence browser node to a temporary file first, so that no recording is created if saving fails
+    filename = 'Recording-' + time.strftime("%Y%m%d-%H%M%S") + os.extsep + "sqbr"
+    temporaryFilePath = os.path.join(slicer.app.temporaryPath, filename)
+    if not self.logic.sequenceBrowserUtils.saveSequenceBrowser(temporaryFilePath):
+      logging.error('Recording could not be saved.')
+      return
+
     # Create new recording
-    slicer.trainUsWidget.logic.recordingManager.createNewRecording(Parameters.EXERCISE_ADVANCED_DRAINAGE, recordingDuration)
+    newRecordingInfo = slicer.trainUsWidget.logic.recordingManager.createNewRecording(Parameters.EXERCISE_ADVANCED_DRAINAGE, recordingDuration)
+    if newRecordingInfo is None:
+      os.remove(temporaryFilePath)
+      return
 
     # Get recording folder path
     selectedParticipantID = slicer.trainUsWidget.logic.recordingManager.getSelectedParticipantID()
@@ -439,12 +456,16 @@ class ExerciseAbscessDrainageWidget(ScriptedLoadableModuleWidget, VTKObservation
     recordingInfoFilePath = slicer.trainUsWidget.logic.recordingManager.getRecordingInfoFilePath(selectedParticipantID, selectedRecordingID)
     recordingFolderPath = os.path.dirname(recordingInfoFilePath)
 
-    # Generate recording file path
-    filename = 'Recording-' + time.strftime("%Y%m%d-%H%M%S") + os.extsep + "sqbr"
+    # Move recording file to recording folder
     filePath = os.path.join(recordingFolderPath, filename)
-
-    # Save sequence browser node
-    self.logic.sequenceBrowserUtils.saveSequenceBrowser(filePath)
+    try:
+      shutil.move(temporaryFilePath, filePath)
+    except:
+      logging.error('Recording could not be moved to recording folder: ' + recordingFolderPath)
+      slicer.trainUsWidget.logic.recordingManager.deleteRecording(selectedParticipantID, selectedRecordingID)
+      if os.path.exists(temporaryFilePath):
+        os.remove(temporaryFilePath)
+      return
 
     # Save exercise options to JSON file
     recordingInfo = slicer.trainUsWidget.logic.recordingManager.readRecordingInfoFile(recordingInfoFilePath)
@@ -454,6 +475,11 @@ class ExerciseAbscessDrainageWidget(ScriptedLoadableModuleWidget, VTKObservation
     # Rewrite info JSON file
     slicer.trainUsWidget.logic.recordingManager.writeRecordingInfoFile(recordingInfoFilePath, recordingInfo)
 
+    # Save tracking data to columnar file for analysis outside Slicer
+    timestamps, transforms = self.logic.sequenceBrowserUtils.getTrackingDataArrays()
+    trackingDataFileFormat = Parameters.instance.getParameterString(Parameters.TRACKING_DATA_FILE_FORMAT)
+    slicer.trainUsWidget.logic.recordingManager.writeTrackingDataFile(filePath, timestamps, transforms, recordingInfo, trackingDataFileFormat)
+
     # Recording info to save in JSON file
     print('>>>>>>>>>>>>>>>>RECORDING SAVED<<<<<<<<<<<<<<<<')
     print('Date:', time.strftime("%Y%m%d"))
@@ -485,6 +511,12 @@ class ExerciseAbscessDrainageWidget(ScriptedLoadableModuleWidget, VTKObservation
     # Update current sample in sequence browser by modifying seek widget slider
     self.ui.SequenceBrowserSeekWidget.slider().value = self.logic.sequenceBrowserUtils.getSequenceBrowserItemFromTimestamp(maxValue)
 
+  #------------------------------------------------------------------------------
+  def onPlaybackSpeedComboBoxChanged(self, index):
+    # Update playback speed (combo box items are speed factors, e.g. "0.25x")
+    playbackSpeed = float(self.ui.playbackSpeedComboBox.currentText.rstrip('x'))
+    self.logic.sequenceBrowserUtils.setPlaybackSpeed(playbackSpeed)
+
   #------------------------------------------------------------------------------
   def onTrimSequenceButtonClicked(self):
     # Get slider values
@@ -537,6 +569,12 @@ class ExerciseAbscessDrainageLogic(ScriptedLoadableModuleLogic, VTKObservationMi
     self.sequenceBrowserUtils= TrainUsUtilities.SequenceBrowserUtils()
     self.layoutUtils= TrainUsUtilities.LayoutUtils()
 
+    # Exercise assets are cached for the whole session
+    self.assetCache = slicer.trainUsWidget.logic.assetCache
+
+    # Large models are rendered with decimated meshes when they are small in the 3D views
+    self.modelLevelOfDetailSwitcher = TrainUsUtilities.ModelLevelOfDetailSwitcher()
+
     # Data path
     self.dataFolderPath = self.moduleWidget.resourcePath('ExerciseAbscessDrainageData/')
 
@@ -562,13 +600,13 @@ class ExerciseAbscessDrainageLogic(ScriptedLoadableModuleLogic, VTKObservationMi
         self.instructionsImageVolume = slicer.util.getNode('Slide1')
     except:
       try:
-        self.instructionsImageVolume = slicer.util.loadVolume(self.dataFolderPath + '/Instructions/Slide1.PNG')
+        self.instructionsImageVolume = self.assetCache.loadVolume(self.dataFolderPath + '/Instructions/Slide1.PNG')
       except:
         logging.error('ERROR: Instructions files could not be loaded...')
 
     # Load instructions video
     try:
-      self.instructionsSequenceBrowser = slicer.util.loadNodeFromFile(self.dataFolderPath + '/Instructions/video.sqbr', 'Tracked Sequence Browser')
+      self.instructionsSequenceBrowser = self.assetCache.loadSequenceBrowser(self.dataFolderPath + '/Instructions/video.sqbr')
       self.instructionsVideoVolume = slicer.util.getNode('video')
     except:
       logging.error('ERROR:  Video instructions could not be loaded...')     
@@ -587,6 +625,10 @@ class ExerciseAbscessDrainageLogic(ScriptedLoadableModuleLogic, VTKObservationMi
     _ = self.loadTransformFromFile(self.dataFolderPath, 'ProbeToTracker') # ONLY FOR DEVELOPMENT
     _ = self.loadTransformFromFile(self.dataFolderPath, 'TrackerToPatient') # ONLY FOR DEVELOPMENT
     
+    # Switch level of detail of large models, whose meshes are not used for computations
+    for modelNode, modelFileName in [(self.usProbe_model, 'UsProbe_Telemed_L12'), (self.softTissue_model, 'DrainagePhantom_SoftTissue'), (self.boneTissue_model, 'DrainagePhantom_Ribs'), (self.phantomFilling_model, 'DrainagePhantom_Filling')]:
+      self.modelLevelOfDetailSwitcher.addModel(modelNode, self.assetCache.getModelLevelsOfDetail(self.dataFolderPath + '/Models/' + modelFileName + '.stl'))
+
     # Load transforms
     self.NeedleToTracker = self.getOrCreateTransform('NeedleToTracker')
     self.ProbeToTracker = self.getOrCreateTransform('ProbeToTracker')
@@ -663,6 +705,9 @@ class ExerciseAbscessDrainageLogic(ScriptedLoadableModuleLogic, VTKObservationMi
     except:
       pass
 
+    # Restore full resolution models
+    self.modelLevelOfDetailSwitcher.removeAllModels()
+
     # Delete models
     slicer.mrmlScene.RemoveNode(self.usProbe_model)
     slicer.mrmlScene.RemoveNode(self.usProbe_plane_model)
@@ -797,7 +842,7 @@ class ExerciseAbscessDrainageLogic(ScriptedLoadableModuleLogic, VTKObservationMi
         node = slicer.util.getNode(transformFileName)
     except:
         try:
-          node = slicer.util.loadTransform(transformFilePath +  '/' + transformFileName + '.h5')
+          node = self.assetCache.loadTransform(transformFilePath +  '/' + transformFileName + '.h5')
           print(transformFileName + ' transform loaded')
         except:
           node=slicer.vtkMRMLLinearTransformNode()
@@ -812,7 +857,7 @@ class ExerciseAbscessDrainageLogic(ScriptedLoadableModuleLogic, VTKObservationMi
         node = slicer.util.getNode(modelFileName)
     except:
         try:
-          node = slicer.util.loadModel(modelFilePath + '/' + modelFileName + '.stl')
+          node = self.assetCache.loadModel(modelFilePath + '/' + modelFileName + '.stl')
           node.GetModelDisplayNode().SetColor(colorRGB_array)
           node.GetModelDisplayNode().SetVisibility(visibility_bool)
           node.GetModelDisplayNode().SetOpacity(opacityValue)
@@ -828,7 +873,7 @@ class ExerciseAbscessDrainageLogic(ScriptedLoadableModuleLogic, VTKObservationMi
         node = slicer.util.getNode(markupsFiducialListFileName)
     except:
         try:
-          node = slicer.util.loadMarkups(markupsFiducialListFilePath + '/' + markupsFiducialListFileName + '.mrk.json')
+          node = self.assetCache.loadMarkups(markupsFiducialListFilePath + '/' + markupsFiducialListFileName + '.mrk.json')
           node.SetLocked(True)
           node.GetDisplayNode().SetSelectedColor(colorRGB_array)
           node.GetDisplayNode().SetPropertiesLabelVisibility(False) # hide text
@@ -845,7 +890,7 @@ class ExerciseAbscessDrainageLogic(ScriptedLoadableModuleLogic, VTKObservationMi
         node = slicer.util.getNode(markupsPlaneFileName)
     except:
         try:
-          node = slicer.util.loadMarkups(markupsPlaneFilePath + '/' + markupsPlaneFileName + '.mrk.json')
+          node = self.assetCache.loadMarkups(markupsPlaneFilePath + '/' + markupsPlaneFileName + '.mrk.json')
           node.SetLocked(True)
           node.GetDisplayNode().SetGlyphScale(0.0)
           node.GetDisplayNode().SetOpacity(opacityValue)
@@ -901,8 +946,9 @@ class ExerciseAbscessDrainageLogic(ScriptedLoadableModuleLogic, VTKObservationMi
     # Delete previous recording
     self.sequenceBrowserUtils.clearSequenceBrowser()
 
-    # Load sequence browser node
-    self.sequenceBrowserUtils.loadSequenceBrowser(filePath)
+    # Load sequence browser node (image frames are read on demand if lazy loading is enabled)
+    lazyImageLoading = Parameters.instance.getParameterBool(Parameters.LAZY_RECORDING_LOADING)
+    self.sequenceBrowserUtils.loadSequenceBrowser(filePath, lazyImageLoading)
 
     # Reset focal point in 3D view
     self.layoutUtils.resetFocalPointInThreeDViews()
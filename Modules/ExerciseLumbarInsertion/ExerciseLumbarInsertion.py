@@ -2,6 +2,7 @@ import vtk, qt, ctk, slicer
 import os
 import numpy as np
 import time
+import shutil
 
 from slicer.ScriptedLoadableModule import *
 from slicer.util import VTKObservationMixin
@@ -42,8 +43,9 @@ class ExerciseLumbarInsertionWidget(ScriptedLoadableModuleWidget, VTKObservation
     ScriptedLoadableModuleWidget.__init__(self, parent)
     VTKObservationMixin.__init__(self)
 
-    # Create logic class
-    self.logic = ExerciseLumbarInsertionLogic(self)
+    # Create logic class (the module widget is only created when the exercise is selected)
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseLumbarInsertion.createLogic'):
+      self.logic = ExerciseLumbarInsertionLogic(self)
 
     slicer.ExerciseLumbarInsertionWidget = self # ONLY FOR DEVELOPMENT
 
@@ -55,7 +57,8 @@ class ExerciseLumbarInsertionWidget(ScriptedLoadableModuleWidget, VTKObservation
     ScriptedLoadableModuleWidget.setup(self)
 
     # Set up UI
-    self.setupUi()
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseLumbarInsertion.setupUi'):
+      self.setupUi()
 
     # Setup connections
     self.setupConnections()
@@ -83,7 +86,8 @@ class ExerciseLumbarInsertionWidget(ScriptedLoadableModuleWidget, VTKObservation
     self.logic.exerciseMode = appUseCase
     
     # Load exercise data
-    self.logic.loadExerciseData()
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseLumbarInsertion.loadExerciseData'):
+      self.logic.loadExerciseData()
 
     # Evaluation use case
     if appUseCase == Parameters.APP_USE_CASE_EVALUATION:
@@ -194,6 +198,7 @@ class ExerciseLumbarInsertionWidget(ScriptedLoadableModuleWidget, VTKObservation
     self.ui.trimSequenceDoubleRangeSlider.minimumPositionChanged.connect(self.onTrimSequenceMinPosDoubleRangeSliderModified)
     self.ui.trimSequenceDoubleRangeSlider.maximumPositionChanged.connect(self.onTrimSequenceMaxPosDoubleRangeSliderModified)
     self.ui.trimSequenceButton.clicked.connect(self.onTrimSequenceButtonClicked)
+    self.ui.playbackSpeedComboBox.currentIndexChanged.connect(self.onPlaybackSpeedComboBoxChanged)
     # Workflow
     self.ui.checkStep1Button.clicked.connect(self.onCheckStep1ButtonClicked)
     self.ui.checkStep2Button.clicked.connect(self.onCheckStep2ButtonClicked)
@@ -236,6 +241,7 @@ class ExerciseLumbarInsertionWidget(ScriptedLoadableModuleWidget, VTKObservation
     self.ui.trimSequenceDoubleRangeSlider.minimumPositionChanged.disconnect()
     self.ui.trimSequenceDoubleRangeSlider.maximumPositionChanged.disconnect()
     self.ui.trimSequenceButton.clicked.disconnect()
+    self.ui.playbackSpeedComboBox.currentIndexChanged.disconnect()
     # Workflow
     self.ui.checkStep1Button.clicked.disconnect()
     self.ui.checkStep2Button.clicked.disconnect()
@@ -467,6 +473,7 @@ class ExerciseLumbarInsertionWidget(ScriptedLoadableModuleWidget, VTKObservation
     # Create new recording
     synchronizedNodes = [self.logic.NeedleToTracker, self.logic.ProbeToTracker, self.logic.TrackerToPatient, self.logic.usImageVolumeNode]
     self.logic.sequenceBrowserUtils.setSynchronizedNodes(synchronizedNodes)
+    self.logic.sequenceBrowserUtils.setPreRollDuration(Parameters.instance.getParameterFloat(Parameters.RECORDING_PRE_ROLL_DURATION))
     self.logic.sequenceBrowserUtils.createNewSequenceBrowser()
 
     # Update GUI
@@ -478,8 +485,18 @@ class ExerciseLumbarInsertionWidget(ScriptedLoadableModuleWidget, VTKObservation
     # Get recording duration
     recordingDuration = self.logic.sequenceBrowserUtils.getRecordingLength()
     
+    # Save sequence browser node to a temporary file first, so that no recording is created if saving fails
+    filename = 'Recording-' + time.strftime("%Y%m%d-%H%M%S") + os.extsep + "sqbr"
+    temporaryFilePath = os.path.join(slicer.app.temporaryPath, filename)
+    if not self.logic.sequenceBrowserUtils.saveSequenceBrowser(temporaryFilePath):
+      logging.error('Recording could not be saved.')
+      return
+
     # Create new recording
-    slicer.trainUsWidget.logic.recordingManager.createNewRecording(Parameters.EXERCISE_ADVANCED_LUMBAR, recordingDuration)
+    newRecordingInfo = slicer.trainUsWidget.logic.recordingManager.createNewRecording(Parameters.EXERCISE_ADVANCED_LUMBAR, recordingDuration)
+    if newRecordingInfo is None:
+      os.remove(temporaryFilePath)
+      return
 
     # Get recording folder path
     selectedParticipantID = slicer.trainUsWidget.logic.recordingManager.getSelectedParticipantID()
@@ -487,12 +504,16 @@ class ExerciseLumbarInsertionWidget(ScriptedLoadableModuleWidget, VTKObservation
     recordingInfoFilePath = slicer.trainUsWidget.logic.recordingManager.getRecordingInfoFilePath(selectedParticipantID, selectedRecordingID)
     recordingFolderPath = os.path.dirname(recordingInfoFilePath)
 
-    # Generate recording file path
-    filename = 'Recording-' + time.strftime("%Y%m%d-%H%M%S") + os.extsep + "sqbr"
+    # Move recording file to recording folder
     filePath = os.path.join(recordingFolderPath, filename)
-
-    # Save sequence browser node
-    self.logic.sequenceBrowserUtils.saveSequenceBrowser(filePath)
+    try:
+      shutil.move(temporaryFilePath, filePath)
+    except:
+      logging.error('Recording could not be moved to recording folder: ' + recordingFolderPath)
+      slicer.trainUsWidget.logic.recordingManager.deleteRecording(selectedParticipantID, selectedRecordingID)
+      if os.path.exists(temporaryFilePath):
+        os.remove(temporaryFilePath)
+      return
 
     # Save exercise options to JSON file
     recordingInfo = slicer.trainUsWidget.logic.recordingManager.readRecordingInfoFile(recordingInfoFilePath)
@@ -502,6 +523,11 @@ class ExerciseLumbarInsertionWidget(ScriptedLoadableModuleWidget, VTKObservation
     # Rewrite info JSON file
     slicer.trainUsWidget.logic.recordingManager.writeRecordingInfoFile(recordingInfoFilePath, recordingInfo)
 
+    # Save tracking data to columnar file for analysis outside Slicer
+    timestamps, transforms = self.logic.sequenceBrowserUtils.getTrackingDataArrays()
+    trackingDataFileFormat = Parameters.instance.getParameterString(Parameters.TRACKING_DATA_FILE_FORMAT)
+    slicer.trainUsWidget.logic.recordingManager.writeTrackingDataFile(filePath, timestamps, transforms, recordingInfo, trackingDataFileFormat)
+
     # Recording info to save in JSON file
     print('>>>>>>>>>>>>>>>>RECORDING SAVED<<<<<<<<<<<<<<<<')
     print('Date:', time.strftime("%Y%m%d"))
@@ -533,6 +559,12 @@ class ExerciseLumbarInsertionWidget(ScriptedLoadableModuleWidget, VTKObservation
     # Update current sample in sequence browser by modifying seek widget slider
     self.ui.SequenceBrowserSeekWidget.slider().value = self.logic.sequenceBrowserUtils.getSequenceBrowserItemFromTimestamp(maxValue)
 
+  #------------------------------------------------------------------------------
+  def onPlaybackSpeedComboBoxChanged(self, index):
+    # Update playback speed (combo box items are speed factors, e.g. "0.25x")
+    playbackSpeed = float(self.ui.playbackSpeedComboBox.currentText.rstrip('x'))
+    self.logic.sequenceBrowserUtils.setPlaybackSpeed(playbackSpeed)
+
   #------------------------------------------------------------------------------
   def onTrimSequenceButtonClicked(self):
     # Get slider values
@@ -716,6 +748,12 @@ class ExerciseLumbarInsertionLogic(ScriptedLoadableModuleLogic, VTKObservationMi
     self.plotChartUtils= TrainUsUtilities.PlaybackPlotChartUtils()
     self.metricCalculationUtils= TrainUsUtilities.MetricCalculationUtils()
 
+    # Exercise assets are cached for the whole session
+    self.assetCache = slicer.trainUsWidget.logic.assetCache
+
+    # Large models are rendered with decimated meshes when they are small in the 3D views
+    self.modelLevelOfDetailSwitcher = TrainUsUtilities.ModelLevelOfDetailSwitcher()
+
     # Data path
     self.dataFolderPath = self.moduleWidget.resourcePath('ExerciseLumbarInsertionData/')
 
@@ -741,13 +779,13 @@ class ExerciseLumbarInsertionLogic(ScriptedLoadableModuleLogic, VTKObservationMi
         self.instructionsImageVolume = slicer.util.getNode('Slide1')
     except:
       try:
-        self.instructionsImageVolume = slicer.util.loadVolume(self.dataFolderPath + '/Instructions/Slide1.PNG')
+        self.instructionsImageVolume = self.assetCache.loadVolume(self.dataFolderPath + '/Instructions/Slide1.PNG')
       except:
         logging.error('ERROR: Instructions files could not be loaded...')
 
     # Load instructions video
     try:
-      self.instructionsSequenceBrowser = slicer.util.loadNodeFromFile(self.dataFolderPath + '/Instructions/video.sqbr', 'Tracked Sequence Browser')
+      self.instructionsSequenceBrowser = self.assetCache.loadSequenceBrowser(self.dataFolderPath + '/Instructions/video.sqbr')
       self.instructionsVideoVolume = slicer.util.getNode('video')
     except:
       logging.error('ERROR:  Video instructions could not be loaded...')     
@@ -786,6 +824,10 @@ class ExerciseLumbarInsertionLogic(ScriptedLoadableModuleLogic, VTKObservationMi
     _ = self.loadTransformFromFile(self.dataFolderPath, 'ProbeToTracker') # ONLY FOR DEVELOPMENT
     _ = self.loadTransformFromFile(self.dataFolderPath, 'TrackerToPatient') # ONLY FOR DEVELOPMENT
     
+    # Switch level of detail of large models, whose meshes are not used for computations
+    for modelNode, modelFileName in [(self.usProbe_model, 'UsProbe_Telemed_L12'), (self.softTissue_model, 'LumbarPhantom_SoftTissueModel')]:
+      self.modelLevelOfDetailSwitcher.addModel(modelNode, self.assetCache.getModelLevelsOfDetail(self.dataFolderPath + '/Models/' + modelFileName + '.stl'))
+
     # Load transforms
     self.NeedleToTracker = self.getOrCreateTransform('NeedleToTracker')
     self.ProbeToTracker = self.getOrCreateTransform('ProbeToTracker')
@@ -864,6 +906,9 @@ class ExerciseLumbarInsertionLogic(ScriptedLoadableModuleLogic, VTKObservationMi
     except:
       pass
 
+    # Restore full resolution models
+    self.modelLevelOfDetailSwitcher.removeAllModels()
+
     # Delete models
     slicer.mrmlScene.RemoveNode(self.usProbe_model)
     slicer.mrmlScene.RemoveNode(self.usProbe_plane_model)
@@ -1012,7 +1057,7 @@ class ExerciseLumbarInsertionLogic(ScriptedLoadableModuleLogic, VTKObservationMi
         node = slicer.util.getNode(transformFileName)
     except:
         try:
-          node = slicer.util.loadTransform(transformFilePath +  '/' + transformFileName + '.h5')
+          node = self.assetCache.loadTransform(transformFilePath +  '/' + transformFileName + '.h5')
           print(transformFileName + ' transform loaded')
         except:
           node=slicer.vtkMRMLLinearTransformNode()
@@ -1027,7 +1072,7 @@ class ExerciseLumbarInsertionLogic(ScriptedLoadableModuleLogic, VTKObservationMi
         node = slicer.util.getNode(modelFileName)
     except:
         try:
-          node = slicer.util.loadModel(modelFilePath + '/' + modelFileName + '.stl')
+          node = self.assetCache.loadModel(modelFilePath + '/' + modelFileName + '.stl')
           node.GetModelDisplayNode().SetColor(colorRGB_array)
           node.GetModelDisplayNode().SetVisibility(visibility_bool)
           node.GetModelDisplayNode().SetOpacity(opacityValue)
@@ -1043,7 +1088,7 @@ class ExerciseLumbarInsertionLogic(ScriptedLoadableModuleLogic, VTKObservationMi
         node = slicer.util.getNode(markupsFiducialListFileName)
     except:
         try:
-          node = slicer.util.loadMarkups(markupsFiducialListFilePath + '/' + markupsFiducialListFileName + '.mrk.json')
+          node = self.assetCache.loadMarkups(markupsFiducialListFilePath + '/' + markupsFiducialListFileName + '.mrk.json')
           node.SetLocked(True)
           node.GetDisplayNode().SetSelectedColor(colorRGB_array)
           node.GetDisplayNode().SetPropertiesLabelVisibility(False) # hide text
@@ -1060,7 +1105,7 @@ class ExerciseLumbarInsertionLogic(ScriptedLoadableModuleLogic, VTKObservationMi
         node = slicer.util.getNode(markupsPlaneFileName)
     except:
         try:
-          node = slicer.util.loadMarkups(markupsPlaneFilePath + '/' + markupsPlaneFileName + '.mrk.json')
+          node = self.assetCache.loadMarkups(markupsPlaneFilePath + '/' + markupsPlaneFileName + '.mrk.json')
           node.SetLocked(True)
           node.GetDisplayNode().SetGlyphScale(0.0)
           node.GetDisplayNode().SetOpacity(opacityValue)
@@ -1116,8 +1161,9 @@ class ExerciseLumbarInsertionLogic(ScriptedLoadableModuleLogic, VTKObservationMi
     # Delete previous recording
     self.sequenceBrowserUtils.clearSequenceBrowser()
 
-    # Load sequence browser node
-    self.sequenceBrowserUtils.loadSequenceBrowser(filePath)
+    # Load sequence browser node (image frames are read on demand if lazy loading is enabled)
+    lazyImageLoading = Parameters.instance.getParameterBool(Parameters.LAZY_RECORDING_LOADING)
+    self.sequenceBrowserUtils.loadSequenceBrowser(filePath, lazyImageLoading)
 
     # Reset focal point in 3D view
     self.layoutUtils.resetFocalPointInThreeDViews()
@@ -1,7 +1,9 @@
 import vtk, qt, ctk, slicer
 import os
+import sys
 import numpy as np
 import time
+import shutil
 
 from slicer.ScriptedLoadableModule import *
 from slicer.util import VTKObservationMixin
@@ -41,8 +43,9 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     ScriptedLoadableModuleWidget.__init__(self, parent)
     VTKObservationMixin.__init__(self)
 
-    # Create logic class
-    self.logic = ExerciseOutPlaneNeedleInsertionLogic(self)
+    # Create logic class (the module widget is only created when the exercise is selected)
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseOutPlaneNeedleInsertion.createLogic'):
+      self.logic = ExerciseOutPlaneNeedleInsertionLogic(self)
 
     slicer.ExerciseOutPlaneNeedleInsertionWidget = self # ONLY FOR DEVELOPMENT
 
@@ -54,7 +57,8 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     ScriptedLoadableModuleWidget.setup(self)
 
     # Set up UI
-    self.setupUi()
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseOutPlaneNeedleInsertion.setupUi'):
+      self.setupUi()
 
     # Setup connections
     self.setupConnections()
@@ -82,7 +86,8 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     self.logic.exerciseMode = appUseCase
 
     # Load exercise data
-    self.logic.loadExerciseData()
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseOutPlaneNeedleInsertion.loadExerciseData'):
+      self.logic.loadExerciseData()
 
     # Evaluation use case
     if appUseCase == Parameters.APP_USE_CASE_EVALUATION:
@@ -168,6 +173,7 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     self.ui.trimSequenceDoubleRangeSlider.minimumPositionChanged.connect(self.onTrimSequenceMinPosDoubleRangeSliderModified)
     self.ui.trimSequenceDoubleRangeSlider.maximumPositionChanged.connect(self.onTrimSequenceMaxPosDoubleRangeSliderModified)
     self.ui.trimSequenceButton.clicked.connect(self.onTrimSequenceButtonClicked)
+    self.ui.playbackSpeedComboBox.currentIndexChanged.connect(self.onPlaybackSpeedComboBoxChanged)
     # View control
     self.ui.leftViewButton.clicked.connect(self.onLeftViewButtonClicked)
     self.ui.frontViewButton.clicked.connect(self.onFrontViewButtonClicked)
@@ -178,6 +184,8 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     self.ui.computeRealTimeMetricsButton.clicked.connect(self.onComputeRealTimeMetricsButtonClicked)
     self.ui.displayPlotButton.clicked.connect(self.onDisplayPlotButtonClicked)
     self.ui.metricSelectionComboBox.currentTextChanged.connect(self.onMetricSelectionComboBoxTextChanged)
+    self.ui.compareAttemptsButton.clicked.connect(self.onCompareAttemptsButtonClicked)
+    self.ui.overlayAlignmentComboBox.currentTextChanged.connect(self.onOverlayAlignmentComboBoxTextChanged)
     self.ui.computeOverallMetricsButton.clicked.connect(self.onComputeOverallMetricsButtonClicked)
     self.ui.displayTableButton.clicked.connect(self.onDisplayTableButtonClicked)
     # Back to menu
@@ -212,6 +220,7 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     self.ui.trimSequenceDoubleRangeSlider.minimumPositionChanged.disconnect()
     self.ui.trimSequenceDoubleRangeSlider.maximumPositionChanged.disconnect()
     self.ui.trimSequenceButton.clicked.disconnect()
+    self.ui.playbackSpeedComboBox.currentIndexChanged.disconnect()
     # View control
     self.ui.leftViewButton.clicked.disconnect()
     self.ui.frontViewButton.clicked.disconnect()
@@ -222,6 +231,8 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     self.ui.computeRealTimeMetricsButton.clicked.disconnect()
     self.ui.displayPlotButton.clicked.disconnect()
     self.ui.metricSelectionComboBox.currentTextChanged.disconnect()
+    self.ui.compareAttemptsButton.clicked.disconnect()
+    self.ui.overlayAlignmentComboBox.currentTextChanged.disconnect()
     self.ui.computeOverallMetricsButton.clicked.disconnect()
     self.ui.displayTableButton.clicked.disconnect()
     # Back to menu
@@ -334,6 +345,8 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     else:
       self.ui.displayPlotButton.setText('Show results')
     self.ui.metricSelectionComboBox.enabled = (not self.logic.sequenceBrowserUtils.isSequenceBrowserEmpty()) and plotVisible
+    self.ui.compareAttemptsButton.enabled = plotVisible
+    self.ui.overlayAlignmentComboBox.enabled = plotVisible and self.ui.compareAttemptsButton.checked
 
     # Display table    
     tableVisible = self.logic.layoutUtils.isTableVisibleInCurrentLayout()
@@ -452,10 +465,12 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
 
     # Delete previous recording
     self.logic.sequenceBrowserUtils.clearSequenceBrowser()
+    self.logic.recordingFilePath = None
 
     # Create new recording
     synchronizedNodes = [self.logic.NeedleToTracker, self.logic.ProbeToTracker, self.logic.usImageVolumeNode]
     self.logic.sequenceBrowserUtils.setSynchronizedNodes(synchronizedNodes)
+    self.logic.sequenceBrowserUtils.setPreRollDuration(Parameters.instance.getParameterFloat(Parameters.RECORDING_PRE_ROLL_DURATION))
     self.logic.sequenceBrowserUtils.createNewSequenceBrowser()
 
     # Add observer
@@ -470,8 +485,18 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     # Get recording duration
     recordingDuration = self.logic.sequenceBrowserUtils.getRecordingLength()
     
+    # Save sequence browser node to a temporary file first, so that no recording is created if saving fails
+    filename = 'Recording-' + time.strftime("%Y%m%d-%H%M%S") + os.extsep + "sqbr"
+    temporaryFilePath = os.path.join(slicer.app.temporaryPath, filename)
+    if not self.logic.sequenceBrowserUtils.saveSequenceBrowser(temporaryFilePath):
+      logging.error('Recording could not be saved.')
+      return
+
     # Create new recording
-    slicer.trainUsWidget.logic.recordingManager.createNewRecording(Parameters.EXERCISE_BASIC_OUTPLANE_INSERTION, recordingDuration)
+    newRecordingInfo = slicer.trainUsWidget.logic.recordingManager.createNewRecording(Parameters.EXERCISE_BASIC_OUTPLANE_INSERTION, recordingDuration)
+    if newRecordingInfo is None:
+      os.remove(temporaryFilePath)
+      return
 
     # Get recording folder path
     selectedParticipantID = slicer.trainUsWidget.logic.recordingManager.getSelectedParticipantID()
@@ -479,12 +504,17 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     recordingInfoFilePath = slicer.trainUsWidget.logic.recordingManager.getRecordingInfoFilePath(selectedParticipantID, selectedRecordingID)
     recordingFolderPath = os.path.dirname(recordingInfoFilePath)
 
-    # Generate recording file path
-    filename = 'Recording-' + time.strftime("%Y%m%d-%H%M%S") + os.extsep + "sqbr"
+    # Move recording file to recording folder
     filePath = os.path.join(recordingFolderPath, filename)
-
-    # Save sequence browser node
-    self.logic.sequenceBrowserUtils.saveSequenceBrowser(filePath)
+    try:
+      shutil.move(temporaryFilePath, filePath)
+    except:
+      logging.error('Recording could not be moved to recording folder: ' + recordingFolderPath)
+      slicer.trainUsWidget.logic.recordingManager.deleteRecording(selectedParticipantID, selectedRecordingID)
+      if os.path.exists(temporaryFilePath):
+        os.remove(temporaryFilePath)
+      return
+    self.logic.recordingFilePath = filePath
 
     # Save exercise options to JSON file
     recordingInfo = slicer.trainUsWidget.logic.recordingManager.readRecordingInfoFile(recordingInfoFilePath)
@@ -495,6 +525,11 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     # Rewrite info JSON file
     slicer.trainUsWidget.logic.recordingManager.writeRecordingInfoFile(recordingInfoFilePath, recordingInfo)
 
+    # Save tracking data to columnar file for analysis outside Slicer
+    timestamps, transforms = self.logic.sequenceBrowserUtils.getTrackingDataArrays()
+    trackingDataFileFormat = Parameters.instance.getParameterString(Parameters.TRACKING_DATA_FILE_FORMAT)
+    slicer.trainUsWidget.logic.recordingManager.writeTrackingDataFile(filePath, timestamps, transforms, recordingInfo, trackingDataFileFormat)
+
     # Recording info to save in JSON file
     print('>>>>>>>>>>>>>>>>RECORDING SAVED<<<<<<<<<<<<<<<<')
     print('Date:', time.strftime("%Y%m%d"))
@@ -551,6 +586,12 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     # Update current sample in sequence browser by modifying seek widget slider
     self.ui.SequenceBrowserSeekWidget.slider().value = self.logic.sequenceBrowserUtils.getSequenceBrowserItemFromTimestamp(maxValue)
 
+  #------------------------------------------------------------------------------
+  def onPlaybackSpeedComboBoxChanged(self, index):
+    # Update playback speed (combo box items are speed factors, e.g. "0.25x")
+    playbackSpeed = float(self.ui.playbackSpeedComboBox.currentText.rstrip('x'))
+    self.logic.sequenceBrowserUtils.setPlaybackSpeed(playbackSpeed)
+
   #------------------------------------------------------------------------------
   def onTrimSequenceButtonClicked(self):
     # Get slider values
@@ -671,6 +712,41 @@ class ExerciseOutPlaneNeedleInsertionWidget(ScriptedLoadableModuleWidget, VTKObs
     # Update GUI
     self.updateGUIFromMRML()
 
+  #------------------------------------------------------------------------------
+  def onCompareAttemptsButtonClicked(self):
+    # Set wait cursor
+    qt.QApplication.setOverrideCursor(qt.Qt.WaitCursor)
+
+    # Load metrics of previous attempts of the participant
+    self.logic.compareAttempts = self.ui.compareAttemptsButton.checked
+    if self.logic.compareAttempts:
+      self.logic.loadOverlayRecordings()
+    else:
+      self.logic.plotChartUtils.clearOverlayRecordings()
+
+    # Update plot chart
+    self.logic.updatePlotChart()
+
+    # Restore cursor
+    qt.QApplication.restoreOverrideCursor()
+
+    # Update GUI
+    self.updateGUIFromMRML()
+
+  #------------------------------------------------------------------------------
+  def onOverlayAlignmentComboBoxTextChanged(self, text):
+    # Selected alignment
+    if text == 'DTW':
+      self.logic.overlayAlignment = 'dtw'
+    else:
+      self.logic.overlayAlignment = 'normalized'
+
+    # Update plot chart
+    self.logic.updatePlotChart()
+
+    # Update GUI
+    self.updateGUIFromMRML()
+
   #------------------------------------------------------------------------------
   def onBackToMenuButtonClicked(self):
     # Free viewpoint
@@ -709,6 +785,13 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
     self.layoutUtils= TrainUsUtilities.LayoutUtils()
     self.plotChartUtils= TrainUsUtilities.PlaybackPlotChartUtils()
     self.metricCalculationUtils= TrainUsUtilities.MetricCalculationUtils()
+    self.metricResultsCache= TrainUsUtilities.MetricResultsCache()
+
+    # Exercise assets are cached for the whole session
+    self.assetCache = slicer.trainUsWidget.logic.assetCache
+
+    # Large models are rendered with decimated meshes when they are small in the 3D views
+    self.modelLevelOfDetailSwitcher = TrainUsUtilities.ModelLevelOfDetailSwitcher()
 
     # Data path
     self.dataFolderPath = self.moduleWidget.resourcePath('ExerciseOutPlaneNeedleInsertionData/')
@@ -744,6 +827,17 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
     self.perkEvaluatorNode = None
     self.perkTutorMetricTableNode = None
 
+    # Recording file path (metrics are stored in the same folder)
+    self.recordingFilePath = None
+
+    # Hash of the tracking data of the current recording, computed once per loaded recording
+    self.trackingDataHash = None
+    self.trackingDataHashSource = None
+
+    # Comparison of real-time metrics across attempts
+    self.compareAttempts = False
+    self.overlayAlignment = 'normalized'
+
   #------------------------------------------------------------------------------
   def loadExerciseData(self):
     logging.debug('Loading data')
@@ -753,13 +847,13 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
         self.instructionsImageVolume = slicer.util.getNode('Slide1')
     except:
       try:
-        self.instructionsImageVolume = slicer.util.loadVolume(self.dataFolderPath + '/Instructions/Slide1.PNG')
+        self.instructionsImageVolume = self.assetCache.loadVolume(self.dataFolderPath + '/Instructions/Slide1.PNG')
       except:
         logging.error('ERROR: Instructions files could not be loaded...')
 
     # Load instructions video
     try:
-      self.instructionsSequenceBrowser = slicer.util.loadNodeFromFile(self.dataFolderPath + '/Instructions/video.sqbr', 'Tracked Sequence Browser')
+      self.instructionsSequenceBrowser = self.assetCache.loadSequenceBrowser(self.dataFolderPath + '/Instructions/video.sqbr')
       self.instructionsVideoVolume = slicer.util.getNode('video')
     except:
       logging.error('ERROR:  Video instructions could not be loaded...')     
@@ -768,6 +862,9 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
     self.usProbe_model = self.loadModelFromFile(self.dataFolderPath + '/Models/', 'UsProbe_Telemed_L12', [1.0,0.93,0.91], visibility_bool = True, opacityValue = 1.0)    
     self.needle_model = self.loadModelFromFile(self.dataFolderPath + '/Models/', 'NeedleModel', [1.0,0.86,0.68], visibility_bool = True, opacityValue = 1.0)
 
+    # Switch level of detail of probe model
+    self.modelLevelOfDetailSwitcher.addModel(self.usProbe_model, self.assetCache.getModelLevelsOfDetail(self.dataFolderPath + '/Models/UsProbe_Telemed_L12.stl'))
+
     # Load transforms
     self.NeedleToTracker = self.getOrCreateTransform('NeedleToTracker')
     self.ProbeToTracker = self.getOrCreateTransform('ProbeToTracker')
@@ -849,6 +946,9 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
     except:
       pass
 
+    # Restore full resolution models
+    self.modelLevelOfDetailSwitcher.removeAllModels()
+
     # Delete models
     slicer.mrmlScene.RemoveNode(self.usProbe_model)
     slicer.mrmlScene.RemoveNode(self.needle_model)
@@ -985,7 +1085,7 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
     # Load selected target    
     targetFilePath = targetDataFolder + targetFileName
     try:
-      self.targetPointNode = slicer.util.loadMarkups(targetFilePath)
+      self.targetPointNode = self.assetCache.loadMarkups(targetFilePath)
       self.targetPointNode.SetName('Target Point')
     except:
       logging.error('ERROR: Target markups file could not be loaded')
@@ -1022,7 +1122,7 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
         node = slicer.util.getNode(transformName)
     except:
         try:
-          node = slicer.util.loadTransform(transformFilePath +  '/' + transformFileName + '.h5')
+          node = self.assetCache.loadTransform(transformFilePath +  '/' + transformFileName + '.h5')
           print(transformFileName + ' transform loaded')
         except:
           node=slicer.vtkMRMLLinearTransformNode()
@@ -1037,7 +1137,7 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
         node = slicer.util.getNode(modelFileName)
     except:
         try:
-          node = slicer.util.loadModel(modelFilePath + '/' + modelFileName + '.stl')
+          node = self.assetCache.loadModel(modelFilePath + '/' + modelFileName + '.stl')
           node.GetModelDisplayNode().SetColor(colorRGB_array)
           node.GetModelDisplayNode().SetVisibility(visibility_bool)
           node.GetModelDisplayNode().SetOpacity(opacityValue)
@@ -1073,7 +1173,7 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
     """
     Update cursor position in plot chart.
     """
-    self.plotChartUtils.updateCursorPosition(self.sequenceBrowserUtils.getSelectedTimestampInSequenceBrowser())    
+    self.plotChartUtils.scheduleCursorUpdate(self.sequenceBrowserUtils.getSelectedTimestampInSequenceBrowser)    
 
   #------------------------------------------------------------------------------
   def readRecordingInfoFile(self, filePath):
@@ -1133,46 +1233,55 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
       logging.error('No target point is defined...')
       return
 
-    # Iterate along items
-    self.sequenceBrowserUtils.selectFirstItemInSequenceBrowser() # reset
-    for currentItem in range(numItems):
+    # Reuse cached metric results if recording, calibration, target and metric code did not change
+    metricResultsKey = self.getMetricResultsKey('realTime')
+    cachedTimestamps, cachedMetrics = self.metricResultsCache.loadRealTimeMetrics(self.getRecordingDirectory(), metricResultsKey)
+    if cachedTimestamps is not None:
+      self.sampleID = list(range(len(cachedTimestamps)))
+      self.timestamp = list(cachedTimestamps)
+      for metricName, metricValues in cachedMetrics.items():
+        setattr(self, metricName, list(metricValues))
+    else:
+      # Iterate along items
+      self.sequenceBrowserUtils.selectFirstItemInSequenceBrowser() # reset
+      for currentItem in range(numItems):
 
-      # Update progress dialog if any
-      if progressDialog:
-        progress = (currentItem / numItems) * (progressDialog.maximum - progressDialog.minimum)
-        progressDialog.setValue(progress)
+        # Update progress dialog if any
+        if progressDialog:
+          progress = (currentItem / numItems) * (progressDialog.maximum - progressDialog.minimum)
+          progressDialog.setValue(progress)
 
-      # Get timestamp
-      timestamp = self.sequenceBrowserUtils.getTimestampFromItemID(currentItem)
+        # Get timestamp
+        timestamp = self.sequenceBrowserUtils.getTimestampFromItemID(currentItem)
 
-      # Get target point position
-      targetPoint = [0,0,0]
-      self.targetPointNode.GetNthControlPointPositionWorld(0, targetPoint)
+        # Get target point position
+        targetPoint = [0,0,0]
+        self.targetPointNode.GetNthControlPointPositionWorld(0, targetPoint)
 
-      #
-      # Real-time metrics
-      #
-      # Get current tool positions
-      self.metricCalculationUtils.getCurrentToolPositions(self.NeedleTipToNeedle, self.ProbeModelToProbe, self.ImageToProbe)
+        #
+        # Real-time metrics
+        #
+        # Get current tool positions
+        self.metricCalculationUtils.getCurrentToolPositions(self.NeedleTipToNeedle, self.ProbeModelToProbe, self.ImageToProbe)
 
-      # Distance from needle tip to US plane
-      distance_NeedleTipToUSPlane = self.metricCalculationUtils.computeNeedleTipToUsPlaneDistanceMm()
+        # Distance from needle tip to US plane
+        distance_NeedleTipToUSPlane = self.metricCalculationUtils.computeNeedleTipToUsPlaneDistanceMm()
 
-      # Distance from needle tip to target point
-      distance_NeedleTipToTargetPoint = self.metricCalculationUtils.computeNeedleTipToTargetDistanceMm(targetPoint)
+        # Distance from needle tip to target point
+        distance_NeedleTipToTargetPoint = self.metricCalculationUtils.computeNeedleTipToTargetDistanceMm(targetPoint)
 
-      # Angle between needle and US plane
-      angle_NeedleToUsPlane = self.metricCalculationUtils.computeNeedleToUsPlaneAngleDeg()
+        # Angle between needle and US plane
+        angle_NeedleToUsPlane = self.metricCalculationUtils.computeNeedleToUsPlaneAngleDeg()
 
-      # Store metrics
-      self.sampleID.append(currentItem)
-      self.timestamp.append(timestamp)
-      self.needleTipToUsPlaneDistanceMm.append(distance_NeedleTipToUSPlane)
-      self.needleTipToTargetDistanceMm.append(distance_NeedleTipToTargetPoint)
-      self.needleToUsPlaneAngleDeg.append(angle_NeedleToUsPlane)
+        # Store metrics
+        self.sampleID.append(currentItem)
+        self.timestamp.append(timestamp)
+        self.needleTipToUsPlaneDistanceMm.append(distance_NeedleTipToUSPlane)
+        self.needleTipToTargetDistanceMm.append(distance_NeedleTipToTargetPoint)
+        self.needleToUsPlaneAngleDeg.append(angle_NeedleToUsPlane)
 
-      # Next sample
-      self.sequenceBrowserUtils.selectNextItemInSequenceBrowser()
+        # Next sample
+        self.sequenceBrowserUtils.selectNextItemInSequenceBrowser()
 
     # Store real-time metric values
     self.plotChartUtils.addNewMetric('needleTipToUsPlaneDistanceMm', self.needleTipToUsPlaneDistanceMm)
@@ -1182,6 +1291,13 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
     # Store real-time metric timestamps
     self.plotChartUtils.addMetricTimestamps(self.timestamp)
 
+    # Store real-time metrics in recording folder to reuse them and to compare attempts without loading recordings
+    if cachedTimestamps is None:
+      metrics = dict()
+      for metricName in self.plotChartUtils.getListOfMetrics():
+        metrics[metricName] = self.plotChartUtils.metricData_dict[metricName]
+      self.metricResultsCache.saveRealTimeMetrics(self.getRecordingDirectory(), metricResultsKey, self.timestamp, metrics)
+
     # Create real-time plot chart
     self.plotChartUtils.createPlotChart(cursor = True)
 
@@ -1197,6 +1313,19 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
 
   #------------------------------------------------------------------------------
   def computeOverallMetricsFromRecording(self):    
+    # Reuse cached metric table if recording, calibration, target and metric scripts did not change
+    metricResultsKey = self.getMetricResultsKey('overall')
+    columnNames, rows = self.metricResultsCache.loadOverallMetrics(self.getRecordingDirectory(), metricResultsKey)
+    if columnNames is not None:
+      if self.perkTutorMetricTableNode:
+        slicer.mrmlScene.RemoveNode(self.perkTutorMetricTableNode)
+      self.perkTutorMetricTableNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLTableNode')
+      self.perkTutorMetricTableNode.SetName('MetricsTable')
+      self.metricResultsCache.setTableContents(self.perkTutorMetricTableNode, columnNames, rows)
+      self.perkTutorMetricTableNode.SetLocked(True) # lock table to avoid modifications
+      self.displayMetricTable()
+      return
+
     # Get Perk Evaluator logic
     peLogic = slicer.modules.perkevaluator.logic()
     if (peLogic is None):
@@ -1282,17 +1411,135 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
     # Hide progress dialog
     analysisDialogWidget.hide()
 
+    # Store metric table in recording folder
+    columnNames, rows = self.metricResultsCache.getTableContents(self.perkTutorMetricTableNode)
+    self.metricResultsCache.saveOverallMetrics(self.getRecordingDirectory(), metricResultsKey, columnNames, rows)
+
     # Display metrics
     self.displayMetricTable()
 
+  #------------------------------------------------------------------------------
+  def getRecordingDirectory(self):
+    """
+    Get folder of the current recording, where metric results are stored.
+    :return recording folder, or None if the recording is not saved (string)
+    """
+    if not self.recordingFilePath:
+      return None
+    return os.path.dirname(self.recordingFilePath)
+
+  #------------------------------------------------------------------------------
+  def getMetricResultsKey(self, metricType):
+    """
+    Get key identifying all inputs of a metric computation: tracking data of the recording (after
+    trimming), calibration transforms, target position and source code of the metric computation.
+    :param metricType: 'realTime' or 'overall' (string)
+    :return key (string)
+    """
+    # Recording
+    trackingDataHash = self.getTrackingDataHash()
+
+    # Calibration
+    calibrationMatrices = list()
+    for transformNode in [self.NeedleTipToNeedle, self.ProbeModelToProbe, self.ImageToProbe]:
+      try:
+        calibrationMatrices.append(slicer.util.arrayFromTransformMatrix(transformNode))
+      except:
+        calibrationMatrices.append(None)
+
+    # Target
+    try:
+      targetPosition = [0,0,0]
+      self.targetPointNode.GetNthControlPointPositionWorld(0, targetPosition)
+    except:
+      targetPosition = None
+
+    # Metric source code
+    if metricType == 'realTime':
+      sourceFilePaths = [sys.modules[type(self.metricCalculationUtils).__module__].__file__]
+    else:
+      sourceFilePaths = [os.path.join(self.metricsDirectory, fileName) for fileName in sorted(os.listdir(self.metricsDirectory))]
+    sourceHash = self.metricResultsCache.hashFiles(sourceFilePaths)
+
+    return self.metricResultsCache.computeKey(metricType, trackingDataHash, calibrationMatrices, targetPosition, sourceHash)
+
+  #------------------------------------------------------------------------------
+  def getTrackingDataHash(self):
+    """
+    Get hash of the tracking data of the current recording (after trimming). If the recording is saved
+    with a tracking data file, the file is hashed together with the time range of the recording,
+    otherwise the tracking data of the sequence browser are hashed. The hash is only computed again
+    when the tracking data file or the recorded sequences change.
+    :return hash (string)
+    """
+    trackingDataFilePath = None
+    if self.recordingFilePath:
+      trackingDataFilePath = slicer.trainUsWidget.logic.recordingManager.findTrackingDataFilePath(self.recordingFilePath)
+    if trackingDataFilePath:
+      hashSource = (trackingDataFilePath, os.path.getmtime(trackingDataFilePath))
+    else:
+      masterSequenceNode = self.sequenceBrowserUtils.getSequenceBrowser().GetMasterSequenceNode()
+      hashSource = (masterSequenceNode.GetID(), masterSequenceNode.GetMTime())
+
+    if hashSource != self.trackingDataHashSource:
+      if trackingDataFilePath:
+        self.trackingDataHash = self.metricResultsCache.hashFiles([trackingDataFilePath])
+      else:
+        timestamps, transforms = self.sequenceBrowserUtils.getTrackingDataArrays()
+        self.trackingDataHash = self.metricResultsCache.computeKey(timestamps, transforms)
+      self.trackingDataHashSource = hashSource
+
+    # Recordings can be trimmed after the tracking data file is written
+    return self.metricResultsCache.computeKey(self.trackingDataHash, self.sequenceBrowserUtils.getTimeRangeInSequenceBrowser())
+
   #------------------------------------------------------------------------------
   def updatePlotChart(self):
 
     # Get selected metric name
     metricName = self.selectedMetric
 
+    # Display metric of all attempts
+    if self.compareAttempts:
+      self.displayMetricOverlay(metricName)
+      return
+
     # Update visible plot series in plot chart
     self.plotChartUtils.updatePlotChart(metricName)  
+    if self.layoutUtils.isPlotVisibleInCurrentLayout():
+      self.layoutUtils.setActivePlotChart(self.plotChartUtils.getPlotChart())
+
+  #------------------------------------------------------------------------------
+  def loadOverlayRecordings(self):
+    """
+    Load real-time metrics of all recordings of the selected participant for this exercise. Only
+    metric files are read, recordings are not loaded. Current recording is used as reference.
+    """
+    self.plotChartUtils.clearOverlayRecordings()
+    recordingManager = slicer.trainUsWidget.logic.recordingManager
+    if not recordingManager.isParticipantSelected():
+      return
+    participantID = recordingManager.getSelectedParticipantID()
+    currentRecordingID = None
+    if self.recordingFilePath:
+      currentRecordingID = os.path.basename(os.path.dirname(self.recordingFilePath))
+
+    # Sort recordings so that current recording comes first
+    recordingInfo_list = recordingManager.readParticipantDirectory(participantID)
+    recordingInfo_list = [recordingInfo for recordingInfo in recordingInfo_list if recordingInfo['exercise'] == Parameters.EXERCISE_BASIC_OUTPLANE_INSERTION]
+    recordingInfo_list.sort(key = lambda recordingInfo: recordingInfo['id'] != currentRecordingID)
+    for recordingInfo in recordingInfo_list:
+      metricsFilePath = recordingManager.getRecordingMetricsFilePath(participantID, recordingInfo['id'])
+      timestamps, metrics = recordingManager.readRecordingMetricsFile(metricsFilePath)
+      if (timestamps is not None) and (len(timestamps) > 1):
+        self.plotChartUtils.addOverlayRecording(recordingInfo['id'], timestamps, metrics)
+
+  #------------------------------------------------------------------------------
+  def displayMetricOverlay(self, metricName):
+    # Create plot chart with selected metric of all attempts
+    overlayPlotChartNode = self.plotChartUtils.createOverlayPlotChart(metricName, self.overlayAlignment)
+
+    # Show plot chart in plot view
+    self.layoutUtils.setActivePlotChart(overlayPlotChartNode)
 
   #------------------------------------------------------------------------------
   def displayMetricPlot(self):
@@ -1352,8 +1599,12 @@ class ExerciseOutPlaneNeedleInsertionLogic(ScriptedLoadableModuleLogic, VTKObser
     # Delete previous recording
     self.sequenceBrowserUtils.clearSequenceBrowser()
 
-    # Load sequence browser node
-    self.sequenceBrowserUtils.loadSequenceBrowser(filePath)
+    # Recording file path
+    self.recordingFilePath = filePath
+
+    # Load sequence browser node (image frames are read on demand if lazy loading is enabled)
+    lazyImageLoading = Parameters.instance.getParameterBool(Parameters.LAZY_RECORDING_LOADING)
+    self.sequenceBrowserUtils.loadSequenceBrowser(filePath, lazyImageLoading)
 
     # Add observer
     self.addObserverToMasterSequenceNode()
@@ -38,8 +38,9 @@ class ExerciseVascularWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     ScriptedLoadableModuleWidget.__init__(self, parent)
     VTKObservationMixin.__init__(self)
 
-    # Create logic class
-    self.logic = ExerciseVascularLogic(self)
+    # Create logic class (the module widget is only created when the exercise is selected)
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseVascular.createLogic'):
+      self.logic = ExerciseVascularLogic(self)
 
     # TrainUS widget
     self.trainUsWidget = slicer.trainUsWidget
@@ -49,7 +50,8 @@ class ExerciseVascularWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     ScriptedLoadableModuleWidget.setup(self)
 
     # Set up UI
-    self.setupUi()
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseVascular.setupUi'):
+      self.setupUi()
 
     # Setup connections
     self.setupConnections()
@@ -57,10 +59,6 @@ class ExerciseVascularWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     # The parameter node had defaults at creation, propagate them to the GUI
     self.updateGUIFromMRML()
 
-    # Layout
-    self.logic.updateSliceControllerVisibility(True)
-    self.logic.setupLayouts()
-
   #------------------------------------------------------------------------------
   def onClose(self, unusedOne, unusedTwo):
     pass
@@ -79,7 +77,8 @@ class ExerciseVascularWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     self.logic.setupLayouts()
 
     # Load exercise data
-    self.logic.loadExerciseData()
+    with slicer.trainUsWidget.logic.startupProfiler.measure('ExerciseVascular.loadExerciseData'):
+      self.logic.loadExerciseData()
 
     # Update GUI
     self.updateGUIFromMRML()
@@ -199,6 +198,13 @@ class ExerciseVascularLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
     self.moduleWidget = widgetInstance
     self.trainUsWidget = slicer.trainUsWidget
 
+    # Exercise assets are cached for the whole session
+    self.assetCache = self.trainUsWidget.logic.assetCache
+
+    # Large models are rendered with decimated meshes when they are small in the 3D views
+    import TrainUsUtilities
+    self.modelLevelOfDetailSwitcher = TrainUsUtilities.ModelLevelOfDetailSwitcher()
+
     # CreateModels module (SlicerIGT extension)
     try:
       self.createModelsLogic = slicer.modules.createmodels.logic()
@@ -243,7 +249,7 @@ class ExerciseVascularLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
         self.instructions = slicer.util.getNode('Instructions1')
     except:
       try:
-        self.instructions = slicer.util.loadVolume(self.dataFolderPath + '/Instructions/Instructions1.PNG')
+        self.instructions = self.assetCache.loadVolume(self.dataFolderPath + '/Instructions/Instructions1.PNG')
       except:
         print('ERROR: Instructions files could not be loaded...')
 
@@ -254,6 +260,10 @@ class ExerciseVascularLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
     self.phantom_model = self.loadModelFromFile(self.dataFolderPath + '/Models/', 'PhantomVascularTissue', [1.0,0.86,0.68], visibility_bool = True, opacityValue = 0.3)
     self.vessels_model = self.loadModelFromFile(self.dataFolderPath + '/Models/', 'VesselsModel', [0.76,0.18,0.18], visibility_bool = True, opacityValue = 0.5)
 
+    # Switch level of detail of large models, whose meshes are not used for computations
+    for modelNode, modelFileName in [(self.usProbe_model, 'UsProbe_Telemed_L12'), (self.phantom_model, 'PhantomVascularTissue'), (self.vessels_model, 'VesselsModel')]:
+      self.modelLevelOfDetailSwitcher.addModel(modelNode, self.assetCache.getModelLevelsOfDetail(self.dataFolderPath + '/Models/' + modelFileName + '.stl'))
+
     # Load transforms
     self.StylusToTracker = self.getOrCreateTransform('StylusToTracker')
     self.NeedleToTracker = self.getOrCreateTransform('NeedleToTracker')
@@ -308,6 +318,9 @@ class ExerciseVascularLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
     # Delete instructions
     slicer.mrmlScene.RemoveNode(self.instructions)
 
+    # Restore full resolution models
+    self.modelLevelOfDetailSwitcher.removeAllModels()
+
     # Delete models
     slicer.mrmlScene.RemoveNode(self.usProbe_model)
     slicer.mrmlScene.RemoveNode(self.stylus_model)
@@ -440,7 +453,7 @@ class ExerciseVascularLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
         node = slicer.util.getNode(transformName)
     except:
         try:
-          node = slicer.util.loadTransform(transformFilePath +  '/' + transformFileName + '.h5')
+          node = self.assetCache.loadTransform(transformFilePath +  '/' + transformFileName + '.h5')
           print(transformFileName + ' transform loaded')
         except:
           node=slicer.vtkMRMLLinearTransformNode()
@@ -455,7 +468,7 @@ class ExerciseVascularLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
         node = slicer.util.getNode(modelFileName)
     except:
         try:
-          node = slicer.util.loadModel(modelFilePath + '/' + modelFileName + '.stl')
+          node = self.assetCache.loadModel(modelFilePath + '/' + modelFileName + '.stl')
           node.GetModelDisplayNode().SetColor(colorRGB_array)
           node.GetModelDisplayNode().SetVisibility(visibility_bool)
           node.GetModelDisplayNode().SetOpacity(opacityValue)
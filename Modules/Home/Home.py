@@ -104,14 +104,36 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     self.trainUsWidget = slicer.trainUsWidget
     # self.homeWidget.setStyleSheet(self.loadStyleSheet())
 
+    # Panels updated when each parameter changes, and panels updated when each page is displayed
+    self.panelUpdatesByParameter = {
+      Parameters.SELECTED_PARTICIPANT_ID: [self.updateReviewSelectionPanel, self.updateTrainingSessionPanel],
+      Parameters.SELECTED_ULTRASOUND: [self.updateReviewSelectionPanel, self.updateHardwareSelectionPanel, self.updateTrainingSessionPanel, self.updateConfigurationPanel],
+      Parameters.SELECTED_TRACKER: [self.updateReviewSelectionPanel, self.updateHardwareSelectionPanel, self.updateTrainingSessionPanel, self.updateConfigurationPanel],
+      Parameters.SELECTED_PHANTOM: [self.updateReviewSelectionPanel, self.updateHardwareSelectionPanel, self.updateTrainingSessionPanel, self.updateConfigurationPanel],
+      Parameters.PLUS_SERVER_RUNNING: [self.updateHardwareSelectionPanel, self.updatePlugAndPlayPanel, self.updateConfigurationPanel],
+      Parameters.PLUS_CONNECTION_STATUS: [self.updatePlugAndPlayPanel, self.updateConfigurationPanel]
+    }
+    self.panelUpdatesByAppMode = {
+      Parameters.APP_MODE_HARDWARE_SELECTION: [self.updateHardwareSelectionPanel],
+      Parameters.APP_MODE_REVIEW_SELECTION: [self.updateReviewSelectionPanel],
+      Parameters.APP_MODE_PLUG_AND_PLAY: [self.updatePlugAndPlayPanel],
+      Parameters.APP_MODE_TRAINING_SESSION: [self.updateTrainingSessionPanel],
+      Parameters.APP_MODE_CONFIGURATION: [self.updateConfigurationPanel]
+    }
+
+    # Parameter values displayed in the GUI, to detect which parameters changed
+    self.displayedParameterValues = dict()
+
   #------------------------------------------------------------------------------
   def setup(self):
     ScriptedLoadableModuleWidget.setup(self)
 
     # Load widget from .ui file (created by Qt Designer)
-    self.uiWidget = slicer.util.loadUI(self.resourcePath('UI/Home.ui'))
-    self.homeWidget.homeLayout.addWidget(self.uiWidget)
-    self.ui = slicer.util.childWidgetVariables(self.uiWidget)
+    startupProfiler = self.trainUsWidget.logic.startupProfiler
+    with startupProfiler.measure('Home.loadUI'):
+      self.uiWidget = slicer.util.loadUI(self.resourcePath('UI/Home.ui'))
+      self.homeWidget.homeLayout.addWidget(self.uiWidget)
+      self.ui = slicer.util.childWidgetVariables(self.uiWidget)
 
     # Display TrainUS logo in UI
     moduleDir = os.path.dirname(__file__)
@@ -133,14 +155,17 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     self.uiWidget.setPalette(slicer.util.mainWindow().style().standardPalette())
 
     # Setup user interface
-    self.setupUi()
+    with startupProfiler.measure('Home.setupUi'):
+      self.setupUi()
 
     # Update UI tables
-    self.updateParticipantsTable()
-    self.updateRecordingsTable()
+    with startupProfiler.measure('Home.updateTables'):
+      self.updateParticipantsTable()
+      self.updateRecordingsTable()
 
     # The parameter node had defaults at creation, propagate them to the GUI
-    self.updateGUIFromMRML()
+    with startupProfiler.measure('Home.updateGUIFromMRML'):
+      self.updateGUIFromMRML()
 
   #------------------------------------------------------------------------------
   def onClose(self, unusedOne, unusedTwo):
@@ -160,6 +185,9 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     # Observe parameter node
     self.logic.observeParameterNode()
 
+    # Log time of startup steps the first time the home screen is displayed
+    self.trainUsWidget.logic.startupProfiler.logSummary('Time to home screen')
+
   #------------------------------------------------------------------------------
   def showHome(self):
     """
@@ -258,7 +286,7 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
   #------------------------------------------------------------------------------
   def onMainTrainingModeButtonClicked(self):
     # Update mode
-    self.logic.setMode(modeID = 1) # switch to training mode
+    self.logic.setMode(modeID = Parameters.APP_MODE_PARTICIPANT_SELECTION) # switch to training mode
 
     # Update use case to: recording
     Parameters.instance.setParameter(Parameters.APP_USE_CASE, Parameters.APP_USE_CASE_RECORDING)
@@ -277,7 +305,7 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
   def onMainEvaluationModeButtonClicked(self):
 
     # Update mode
-    self.logic.setMode(modeID = 6) # switch to evaluation mode
+    self.logic.setMode(modeID = Parameters.APP_MODE_EVALUATION) # switch to evaluation mode
 
     # Update use case to: evaluation
     Parameters.instance.setParameter(Parameters.APP_USE_CASE, Parameters.APP_USE_CASE_EVALUATION)
@@ -295,7 +323,7 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
   #------------------------------------------------------------------------------
   def onConfigurationButtonClicked(self):
     # Update mode
-    self.logic.setMode(modeID = 7) # switch to configuration
+    self.logic.setMode(modeID = Parameters.APP_MODE_CONFIGURATION) # switch to configuration
 
     # Unpause OpenIGTLink connection
     try:
@@ -329,29 +357,58 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     """
     Set selections and other settings on the GUI based on the parameter node.
 
-    Calls the updateGUIFromMRML function of all tabs so that they can take care of their own GUI.
+    Only the panels that depend on the parameters that changed since the last update are updated,
+    and the page and navigation styles are only updated when the app mode changes. When called
+    directly (not from a parameter change), all panels are updated.
     """
     if not hasattr(slicer, 'trainUsWidget'):
       # The TrainUS module has not been set up yet
       return
+    parameterNode = Parameters.instance.getParameterNode()
+    if not parameterNode:
+      return
 
-    # Update review selection panel
-    self.updateReviewSelectionPanel()
+    # Find parameters that changed
+    if caller is None:
+      self.displayedParameterValues = dict()
+    changedParameterNames = list()
+    for parameterName in [Parameters.APP_MODE] + list(self.panelUpdatesByParameter.keys()):
+      parameterValue = Parameters.instance.getParameterString(parameterName)
+      if self.displayedParameterValues.get(parameterName) != parameterValue:
+        self.displayedParameterValues[parameterName] = parameterValue
+        changedParameterNames.append(parameterName)
+    if not changedParameterNames:
+      return
 
-    # Update hardware selection panel
-    self.updateHardwareSelectionPanel()
+    # Collect panels to update, each of them only once
+    panelUpdates = list()
+    for parameterName in changedParameterNames:
+      panelUpdates += self.panelUpdatesByParameter.get(parameterName, list())
+    if Parameters.APP_MODE in changedParameterNames:
+      modeID = Parameters.instance.getParameterInt(Parameters.APP_MODE)
+      if caller is None:
+        panelUpdates += [panelUpdate for panelUpdates_list in self.panelUpdatesByAppMode.values() for panelUpdate in panelUpdates_list]
+      else:
+        panelUpdates += self.panelUpdatesByAppMode.get(modeID, list()) # page may show data edited in other pages
 
-    # Update plug and play panel
-    self.updatePlugAndPlayPanel()
+    # Update panels
+    for panelUpdate in dict.fromkeys(panelUpdates):
+      panelUpdate()
 
-    # Update training session panel
-    self.updateTrainingSessionPanel()
+    # Switch app mode
+    if Parameters.APP_MODE in changedParameterNames:
+      self.updateAppModePage(modeID)
 
-    # Update configuration panel
-    self.updateConfigurationPanel()
+  #------------------------------------------------------------------------------
+  def onParameterChanged(self, parameterName, parameterValue):
+    self.updateGUIFromMRML(Parameters.instance)
 
-    # Switch app mode
-    modeID = Parameters.instance.getParameterInt(Parameters.APP_MODE)
+  #------------------------------------------------------------------------------
+  def updateAppModePage(self, modeID):
+    """
+    Display the page of the app mode and highlight the current step in the navigation bar.
+    :param modeID: app mode (int)
+    """
     self.ui.step1NavigationLabel.setStyleSheet("QLabel { color : #969696 }")
     self.ui.step2NavigationLabel.setStyleSheet("QLabel { color : #969696 }")
     self.ui.step3NavigationLabel.setStyleSheet("QLabel { color : #969696 }")
@@ -360,13 +417,13 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     self.ui.step2NavigationFrame.lineWidth = 0
     self.ui.step3NavigationFrame.lineWidth = 0
     self.ui.step4NavigationFrame.lineWidth = 0
-    if modeID == 0: # home page
+    if modeID == Parameters.APP_MODE_WELCOME:
       self.ui.welcomePage.visible = True
       self.ui.configurationPage.visible = False
       self.ui.trainingPage.visible = False
       self.ui.trainingSessionPage.visible = False
       self.ui.evaluationPage.visible = False
-    if modeID == 1: # start training - step 1
+    if modeID == Parameters.APP_MODE_PARTICIPANT_SELECTION: # start training - step 1
       self.ui.welcomePage.visible = False
       self.ui.configurationPage.visible = False
       self.ui.trainingPage.visible = True
@@ -375,7 +432,7 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
       self.ui.step1NavigationFrame.lineWidth = 2
       self.ui.trainingSessionPage.visible = False
       self.ui.evaluationPage.visible = False
-    if modeID == 2: # start training - step 2
+    if modeID == Parameters.APP_MODE_HARDWARE_SELECTION: # start training - step 2
       self.ui.welcomePage.visible = False
       self.ui.configurationPage.visible = False
       self.ui.trainingPage.visible = True
@@ -384,7 +441,7 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
       self.ui.step2NavigationFrame.lineWidth = 2
       self.ui.trainingSessionPage.visible = False
       self.ui.evaluationPage.visible = False
-    if modeID == 3: # start training - step 3
+    if modeID == Parameters.APP_MODE_REVIEW_SELECTION: # start training - step 3
       self.ui.welcomePage.visible = False
       self.ui.configurationPage.visible = False
       self.ui.trainingPage.visible = True
@@ -393,7 +450,7 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
       self.ui.step3NavigationFrame.lineWidth = 2
       self.ui.trainingSessionPage.visible = False
       self.ui.evaluationPage.visible = False
-    if modeID == 4: # start training - step 4
+    if modeID == Parameters.APP_MODE_PLUG_AND_PLAY: # start training - step 4
       self.ui.welcomePage.visible = False
       self.ui.configurationPage.visible = False
       self.ui.trainingPage.visible = True
@@ -402,19 +459,19 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
       self.ui.step4NavigationFrame.lineWidth = 2
       self.ui.trainingSessionPage.visible = False
       self.ui.evaluationPage.visible = False
-    if modeID == 5: # Training session
+    if modeID == Parameters.APP_MODE_TRAINING_SESSION:
       self.ui.welcomePage.visible = False
       self.ui.configurationPage.visible = False
       self.ui.trainingPage.visible = False
       self.ui.trainingSessionPage.visible = True
       self.ui.evaluationPage.visible = False
-    if modeID == 6: # Recording management
+    if modeID == Parameters.APP_MODE_EVALUATION: # Recording management
       self.ui.welcomePage.visible = False
       self.ui.configurationPage.visible = False
       self.ui.trainingPage.visible = False
       self.ui.trainingSessionPage.visible = False
       self.ui.evaluationPage.visible = True
-    if modeID == 7: # configuration
+    if modeID == Parameters.APP_MODE_CONFIGURATION:
       self.ui.welcomePage.visible = False
       self.ui.configurationPage.visible = True
       self.ui.trainingPage.visible = False
@@ -424,49 +481,58 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
   #------------------------------------------------------------------------------
   def setupUi(self):
     logging.debug('Home.setupUi')
+    startupProfiler = self.trainUsWidget.logic.startupProfiler
 
     # Configuration page
     self.ui.ConfigurationPanel = Widgets.Configuration(self.ui.configurationWidget)
     self.ui.ConfigurationPanel.homeWidget = self
-    self.ui.ConfigurationPanel.setupUi()
+    with startupProfiler.measure('Configuration.setupUi'):
+      self.ui.ConfigurationPanel.setupUi()
     self.ui.configurationWidget.layout().addWidget(self.ui.ConfigurationPanel)
 
     # Training page
     ## Step 1
     self.ui.ParticipantSelectionPanel = Widgets.ParticipantSelection(self.ui.step1Page)
     self.ui.ParticipantSelectionPanel.homeWidget = self
-    self.ui.ParticipantSelectionPanel.setupUi()
+    with startupProfiler.measure('ParticipantSelection.setupUi'):
+      self.ui.ParticipantSelectionPanel.setupUi()
     self.ui.step1Page.layout().addWidget(self.ui.ParticipantSelectionPanel)
     ## Step 2
     self.ui.HardwareSelectionPanel = Widgets.HardwareSelection(self.ui.step2Page)
     self.ui.HardwareSelectionPanel.homeWidget = self
-    self.ui.HardwareSelectionPanel.setupUi()
+    with startupProfiler.measure('HardwareSelection.setupUi'):
+      self.ui.HardwareSelectionPanel.setupUi()
     self.ui.step2Page.layout().addWidget(self.ui.HardwareSelectionPanel)
     ## Step 3
     self.ui.ReviewSelectionPanel = Widgets.ReviewSelection(self.ui.step3Page)
     self.ui.ReviewSelectionPanel.homeWidget = self
-    self.ui.ReviewSelectionPanel.setupUi()
+    with startupProfiler.measure('ReviewSelection.setupUi'):
+      self.ui.ReviewSelectionPanel.setupUi()
     self.ui.step3Page.layout().addWidget(self.ui.ReviewSelectionPanel)
     ## Step 4
     self.ui.PlugAndPlayPanel = Widgets.PlugAndPlay(self.ui.step4Page)
     self.ui.PlugAndPlayPanel.homeWidget = self
-    self.ui.PlugAndPlayPanel.setupUi()
+    with startupProfiler.measure('PlugAndPlay.setupUi'):
+      self.ui.PlugAndPlayPanel.setupUi()
     self.ui.step4Page.layout().addWidget(self.ui.PlugAndPlayPanel)
 
     # Evaluation page
     self.ui.EvaluationPanel = Widgets.Evaluation(self.ui.evaluationWidget)
     self.ui.EvaluationPanel.homeWidget = self
-    self.ui.EvaluationPanel.setupUi()
+    with startupProfiler.measure('Evaluation.setupUi'):
+      self.ui.EvaluationPanel.setupUi()
     self.ui.evaluationWidget.layout().addWidget(self.ui.EvaluationPanel)
 
     # Training session page
     self.ui.TrainingSessionPanel = Widgets.TrainingSession(self.ui.trainingSessionWidget)
     self.ui.TrainingSessionPanel.homeWidget = self
-    self.ui.TrainingSessionPanel.setupUi()
+    with startupProfiler.measure('TrainingSession.setupUi'):
+      self.ui.TrainingSessionPanel.setupUi()
     self.ui.trainingSessionWidget.layout().addWidget(self.ui.TrainingSessionPanel)
 
     # Update UI language
-    self.logic.updateLanguageUI(selectedLanguageIndex = 0) # english by default
+    with startupProfiler.measure('Home.updateLanguageUI'):
+      self.logic.updateLanguageUI(selectedLanguageIndex = 0) # english by default
 
   #------------------------------------------------------------------------------
   def updateParticipantsTable(self):
@@ -477,45 +543,21 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     modeID = Parameters.instance.getParameterInt(Parameters.APP_MODE)
 
     # Select target table to update according to app mode
-    if (modeID >= 0) and (modeID <= 5): # training mode
+    if (modeID >= Parameters.APP_MODE_WELCOME) and (modeID <= Parameters.APP_MODE_TRAINING_SESSION): # training mode
       uiPanel = self.ui.ParticipantSelectionPanel
-    elif (modeID == 6): # evaluation mode
+    elif (modeID == Parameters.APP_MODE_EVALUATION): # evaluation mode
       uiPanel = self.ui.EvaluationPanel
     else:
       logging.error('Home.updateParticipantsTable: Unknown app mode')
       return
 
-    # Get data from directory
-    participantInfo_list = self.trainUsWidget.logic.recordingManager.readRootDirectory()
-
-    # Filter participants according to search text
+    # Get participants matching search text from catalog
     searchText = uiPanel.ui.participantSearchText.text
-    if searchText != '':
-      participantInfo_list = self.trainUsWidget.logic.recordingManager.filterParticipantInfoListFromSearchText(participantInfo_list, searchText)
-
-    ## Get table widget
-    tableWidget = uiPanel.ui.participantsTable
-
-    ## Reset table
-    tableWidget.clearContents()
-
-    ## Update table content
-    if len(participantInfo_list) >= 0:
-      numParticipants = len(participantInfo_list)
-      tableWidget.setRowCount(numParticipants)
-      for participantPos in range(numParticipants):
-        participantIDTableItem = qt.QTableWidgetItem(participantInfo_list[participantPos]['id'])
-        participantNameTableItem = qt.QTableWidgetItem(participantInfo_list[participantPos]['name'])
-        participantSurnameTableItem = qt.QTableWidgetItem(participantInfo_list[participantPos]['surname'])
-        participantBirthDateTableItem = qt.QTableWidgetItem(participantInfo_list[participantPos]['birthdate'])
-        participantEmailTableItem = qt.QTableWidgetItem(participantInfo_list[participantPos]['email'])
-        tableWidget.setItem(participantPos, 0, participantIDTableItem)
-        tableWidget.setItem(participantPos, 1, participantNameTableItem)
-        tableWidget.setItem(participantPos, 2, participantSurnameTableItem)
-        tableWidget.setItem(participantPos, 3, participantBirthDateTableItem)
-        tableWidget.setItem(participantPos, 4, participantEmailTableItem)
-    else:
-      tableWidget.setRowCount(0)
+    participantInfo_list = self.trainUsWidget.logic.recordingManager.searchParticipants(searchText)
+
+    ## Update table model. Only inserted, removed or modified rows are updated in the view
+    uiPanel.participantsTableModel.setInfoList(participantInfo_list)
+    if len(participantInfo_list) == 0:
       logging.debug('Home.updateParticipantsTable: No participants found in database...')
 
   #------------------------------------------------------------------------------
@@ -530,23 +572,23 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     modeID = Parameters.instance.getParameterInt(Parameters.APP_MODE)
 
     # Select target table to update according to app mode
-    if (modeID >= 0) and (modeID <= 5): # training mode
+    if (modeID >= Parameters.APP_MODE_WELCOME) and (modeID <= Parameters.APP_MODE_TRAINING_SESSION): # training mode
       uiPanel = self.ui.ParticipantSelectionPanel
-    elif (modeID == 6): # evaluation mode
+    elif (modeID == Parameters.APP_MODE_EVALUATION): # evaluation mode
       uiPanel = self.ui.EvaluationPanel
     else:
       logging.error('Home.updateParticipantsTable: Unknown app mode')
       return
 
-    # Get table widget
-    tableWidget = uiPanel.ui.participantsTable
+    # Get table view
+    tableView = uiPanel.ui.participantsTable
 
     # Select row corresponding to selected participant
-    numRows = tableWidget.rowCount
-    for row in range(numRows):
-      item = tableWidget.item(row, 0)
-      if item.text() == selectedParticipantID:
-        tableWidget.setCurrentItem(item)
+    row = uiPanel.participantsTableModel.getProxyRowFromID(uiPanel.participantsTableProxyModel, selectedParticipantID)
+    if row >= 0:
+      tableView.selectRow(row)
+    else:
+      tableView.clearSelection()
 
   #------------------------------------------------------------------------------
   def updateRecordingsTable(self):
@@ -579,40 +621,27 @@ class HomeWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     # Update table content
     #
 
-    # Get table widget
-    tableWidget = self.ui.EvaluationPanel.ui.recordingsTable
-
-    # Reset table
-    tableWidget.clearContents()
-    tableWidget.sortingEnabled = False
+    # Get table model
+    recordingManager = self.trainUsWidget.logic.recordingManager
+    tableModel = self.ui.EvaluationPanel.recordingsTableModel
 
     # Update table if participant is selected
     if selectedParticipantID != '':
-      # Get data from directory
-      recordingInfo_list = self.trainUsWidget.logic.recordingManager.readParticipantDirectory(selectedParticipantID)
-
-      # Update table content
-      if len(recordingInfo_list) >= 0:
-        numRecordings = len(recordingInfo_list)
-        tableWidget.setRowCount(numRecordings)
-        for recordingPos in range(numRecordings):
-          recordingIDTableItem = qt.QTableWidgetItem(recordingInfo_list[recordingPos]['id'])
-          recordingDateTableItem = qt.QTableWidgetItem(recordingInfo_list[recordingPos]['date'])
-          recordingTimeTableItem = qt.QTableWidgetItem(recordingInfo_list[recordingPos]['time'])
-          recordingExerciseTableItem = qt.QTableWidgetItem(recordingInfo_list[recordingPos]['exercise'])
-          recordingDurationTableItem = qt.QTableWidgetItem(recordingInfo_list[recordingPos]['duration'])
-          tableWidget.setItem(recordingPos, 0, recordingIDTableItem)
-          tableWidget.setItem(recordingPos, 1, recordingDateTableItem)
-          tableWidget.setItem(recordingPos, 2, recordingTimeTableItem)
-          tableWidget.setItem(recordingPos, 3, recordingExerciseTableItem)
-          tableWidget.setItem(recordingPos, 4, recordingDurationTableItem)
-      else:
-        tableWidget.setRowCount(0)
+      # Get data from directory, and details computed previously from catalog
+      recordingInfo_list = recordingManager.readParticipantDirectory(selectedParticipantID)
+      if len(recordingInfo_list) == 0:
         logging.debug('Home.updateRecordingsTable: No recordings found in database...')
     else:
-      tableWidget.setRowCount(0)
+      recordingInfo_list = list()
       logging.debug('Home.updateRecordingsTable: No participant is selected')
-    tableWidget.sortingEnabled = True
+
+    # Update table content. Details are shown as placeholders until computed in the background
+    tableModel.setInfoList(recordingInfo_list)
+    if selectedParticipantID != '':
+      tableModel.setDetailsDict(recordingManager.getRecordingDetails(selectedParticipantID))
+      recordingManager.requestRecordingDetails(selectedParticipantID, recordingInfo_list)
+    else:
+      tableModel.setDetailsDict(dict())
 
   #------------------------------------------------------------------------------
   def updateReviewSelectionPanel(self):
@@ -781,6 +810,7 @@ class HomeLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
     self.participants_deleteMessageBoxLabel = ''
     self.recordings_deleteMessageBoxTitle = ''
     self.recordings_deleteMessageBoxLabel = ''
+    self.analytics_summaryText = ''
 
     # Setup keyboard shortcuts
     self.setupKeyboardShortcuts()
@@ -796,9 +826,9 @@ class HomeLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
       logging.error('observeParameterNode: Failed to get parameter node')
       return
 
-    # Add observations on referenced nodes
-    if not self.hasObserver(parameterNode, vtk.vtkCommand.ModifiedEvent, self.moduleWidget.updateGUIFromMRML):
-      self.addObserver(parameterNode, vtk.vtkCommand.ModifiedEvent, self.moduleWidget.updateGUIFromMRML)
+    # Observe only the parameters displayed in Home, instead of every modification of the parameter node
+    for parameterName in [Parameters.APP_MODE] + list(self.moduleWidget.panelUpdatesByParameter.keys()):
+      Parameters.instance.addParameterObserver(parameterName, self.moduleWidget.onParameterChanged)
 
     # Update widgets
     self.moduleWidget.updateGUIFromMRML()
@@ -901,11 +931,7 @@ class HomeLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
     ## Participant selection
     self.moduleWidget.ui.ParticipantSelectionPanel.ui.label_1.setText(languageTexts['ParticipantSelection.label_1'])
     self.moduleWidget.ui.ParticipantSelectionPanel.ui.label_2.setText(languageTexts['ParticipantSelection.label_2'])
-    self.moduleWidget.ui.ParticipantSelectionPanel.ui.participantsTable.setHorizontalHeaderItem(0, qt.QTableWidgetItem(languageTexts['ParticipantSelection.participantsTable_column1']))
-    self.moduleWidget.ui.ParticipantSelectionPanel.ui.participantsTable.setHorizontalHeaderItem(1, qt.QTableWidgetItem(languageTexts['ParticipantSelection.participantsTable_column2']))
-    self.moduleWidget.ui.ParticipantSelectionPanel.ui.participantsTable.setHorizontalHeaderItem(2, qt.QTableWidgetItem(languageTexts['ParticipantSelection.participantsTable_column3']))
-    self.moduleWidget.ui.ParticipantSelectionPanel.ui.participantsTable.setHorizontalHeaderItem(3, qt.QTableWidgetItem(languageTexts['ParticipantSelection.participantsTable_column4']))
-    self.moduleWidget.ui.ParticipantSelectionPanel.ui.participantsTable.setHorizontalHeaderItem(4, qt.QTableWidgetItem(languageTexts['ParticipantSelection.participantsTable_column5']))
+    self.moduleWidget.ui.ParticipantSelectionPanel.participantsTableModel.setHeaderLabels([languageTexts['ParticipantSelection.participantsTable_column' + str(column)] for column in range(1, 6)])
     #self.moduleWidget.ui.ParticipantSelectionPanel.ui.participantOptionsGroupBox.setTitle(languageTexts['ParticipantSelection.participantOptionsGroupBox'])
     #self.moduleWidget.ui.ParticipantSelectionPanel.ui.checkRecordingsButton.setText(languageTexts['ParticipantSelection.checkRecordingsButton'])
     self.moduleWidget.ui.ParticipantSelectionPanel.ui.newParticipantButton.setText(languageTexts['ParticipantSelection.newParticipantButton'])
@@ -971,13 +997,18 @@ class HomeLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
     ## Evaluation
     self.moduleWidget.ui.EvaluationPanel.ui.tabWidget.setTabText(0, languageTexts['Evaluation.participantsTab'])
     self.moduleWidget.ui.EvaluationPanel.ui.tabWidget.setTabText(1, languageTexts['Evaluation.recordingsTab'])
+    self.moduleWidget.ui.EvaluationPanel.ui.tabWidget.setTabText(2, languageTexts['Evaluation.analyticsTab'])
+    self.moduleWidget.ui.EvaluationPanel.ui.analyticsLabel_1.setText(languageTexts['Evaluation.analyticsLabel_1'])
+    self.moduleWidget.ui.EvaluationPanel.ui.analyticsLabel_2.setText(languageTexts['Evaluation.analyticsLabel_2'])
+    self.moduleWidget.ui.EvaluationPanel.ui.analyticsLabel_3.setText(languageTexts['Evaluation.analyticsLabel_3'])
+    self.moduleWidget.ui.EvaluationPanel.ui.analyticsLabel_4.setText(languageTexts['Evaluation.analyticsLabel_4'])
+    self.moduleWidget.ui.EvaluationPanel.ui.analyticsLabel_5.setText(languageTexts['Evaluation.analyticsLabel_5'])
+    self.moduleWidget.ui.EvaluationPanel.ui.analyticsScopeComboBox.setItemText(0, languageTexts['Evaluation.analyticsScopeComboBox_1'])
+    self.moduleWidget.ui.EvaluationPanel.ui.analyticsScopeComboBox.setItemText(1, languageTexts['Evaluation.analyticsScopeComboBox_2'])
+    self.analytics_summaryText = languageTexts['Evaluation.analyticsSummaryText']
     self.moduleWidget.ui.EvaluationPanel.ui.label_1.setText(languageTexts['ParticipantSelection.label_1'])
     self.moduleWidget.ui.EvaluationPanel.ui.label_2.setText(languageTexts['ParticipantSelection.label_2'])
-    self.moduleWidget.ui.EvaluationPanel.ui.participantsTable.setHorizontalHeaderItem(0, qt.QTableWidgetItem(languageTexts['ParticipantSelection.participantsTable_column1']))
-    self.moduleWidget.ui.EvaluationPanel.ui.participantsTable.setHorizontalHeaderItem(1, qt.QTableWidgetItem(languageTexts['ParticipantSelection.participantsTable_column2']))
-    self.moduleWidget.ui.EvaluationPanel.ui.participantsTable.setHorizontalHeaderItem(2, qt.QTableWidgetItem(languageTexts['ParticipantSelection.participantsTable_column3']))
-    self.moduleWidget.ui.EvaluationPanel.ui.participantsTable.setHorizontalHeaderItem(3, qt.QTableWidgetItem(languageTexts['ParticipantSelection.participantsTable_column4']))
-    self.moduleWidget.ui.EvaluationPanel.ui.participantsTable.setHorizontalHeaderItem(4, qt.QTableWidgetItem(languageTexts['ParticipantSelection.participantsTable_column5']))
+    self.moduleWidget.ui.EvaluationPanel.participantsTableModel.setHeaderLabels([languageTexts['ParticipantSelection.participantsTable_column' + str(column)] for column in range(1, 6)])
     self.moduleWidget.ui.EvaluationPanel.ui.participantOptionsGroupBox.setTitle(languageTexts['ParticipantSelection.participantOptionsGroupBox'])
     self.moduleWidget.ui.EvaluationPanel.ui.checkRecordingsButton.setText(languageTexts['ParticipantSelection.checkRecordingsButton'])
     self.moduleWidget.ui.EvaluationPanel.ui.newParticipantButton.setText(languageTexts['ParticipantSelection.newParticipantButton'])
@@ -1003,11 +1034,7 @@ class HomeLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
     self.participants_deleteMessageBoxLabel = languageTexts['ParticipantSelection.deleteMessageBoxText_1'] + '\n\n' + languageTexts['ParticipantSelection.deleteMessageBoxText_2']
     self.moduleWidget.ui.EvaluationPanel.ui.label_3.setText(languageTexts['Recordings.label_3'])
     self.moduleWidget.ui.EvaluationPanel.ui.label_4.setText(languageTexts['Recordings.label_4'])
-    self.moduleWidget.ui.EvaluationPanel.ui.recordingsTable.setHorizontalHeaderItem(0, qt.QTableWidgetItem(languageTexts['Recordings.recordingsTable_column1']))
-    self.moduleWidget.ui.EvaluationPanel.ui.recordingsTable.setHorizontalHeaderItem(1, qt.QTableWidgetItem(languageTexts['Recordings.recordingsTable_column2']))
-    self.moduleWidget.ui.EvaluationPanel.ui.recordingsTable.setHorizontalHeaderItem(2, qt.QTableWidgetItem(languageTexts['Recordings.recordingsTable_column3']))
-    self.moduleWidget.ui.EvaluationPanel.ui.recordingsTable.setHorizontalHeaderItem(3, qt.QTableWidgetItem(languageTexts['Recordings.recordingsTable_column4']))
-    self.moduleWidget.ui.EvaluationPanel.ui.recordingsTable.setHorizontalHeaderItem(4, qt.QTableWidgetItem(languageTexts['Recordings.recordingsTable_column5']))
+    self.moduleWidget.ui.EvaluationPanel.recordingsTableModel.setHeaderLabels([languageTexts['Recordings.recordingsTable_column' + str(column)] for column in range(1, 10)])
     self.moduleWidget.ui.EvaluationPanel.ui.recordingOptionsGroupBox.setTitle(languageTexts['Recordings.recordingOptionsGroupBox'])
     self.moduleWidget.ui.EvaluationPanel.ui.recordingDetailsButton.setText(languageTexts['Recordings.recordingDetailsButton'])
     self.moduleWidget.ui.EvaluationPanel.ui.evaluateRecordingButton.setText(languageTexts['Recordings.evaluateRecordingButton'])
@@ -1032,7 +1059,7 @@ class HomeLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
   def addMarginToColumnWidth(self, tableWidget, margin):
     tableWidget.horizontalHeader().stretchLastSection = False
     tableWidget.resizeColumnsToContents()
-    numColumns = tableWidget.columnCount
+    numColumns = tableWidget.horizontalHeader().count()
     for col in range(numColumns):
       tableWidget.setColumnWidth(col, tableWidget.columnWidth(col) + margin)
     tableWidget.horizontalHeader().stretchLastSection = True
@@ -0,0 +1,268 @@
+from __main__ import vtk, qt, slicer
+import logging
+import os
+
+from .ModelPreprocessor import ModelPreprocessor
+
+#------------------------------------------------------------------------------
+#
+# AssetCache
+#
+#------------------------------------------------------------------------------
+class AssetCache():
+  """
+  Session-wide cache of exercise assets (models, transforms, markups, images and instruction
+  videos), so that entering an exercise again or switching between exercises does not read and
+  parse the files again.
+
+  The first time a file is loaded, it is read with the Slicer loaders and a copy of the loaded
+  node (and of its display node) is kept outside the scene. Next loads of the same file add a
+  new node to the scene with the content of the cached copy, sharing the cached polydata and
+  image data (shallow copy), so nodes created from the cache must not modify their data in
+  place. Sequences of instruction videos are deep copied, since their data nodes cannot be
+  shared. Entries are keyed by file path and modification time, so modified files are read
+  again.
+
+  STL models are read from compressed VTP files with precomputed normals, converted once by
+  ModelPreprocessor, which also provides decimated levels of detail.
+
+  Loading functions mirror slicer.util functions: they return the new node in the scene and
+  raise an exception if the file cannot be loaded.
+
+  Usage:
+    assetCache = AssetCache()
+    modelNode = assetCache.loadModel(modelFilePath)
+    transformNode = assetCache.loadTransform(transformFilePath)
+  """
+
+  #------------------------------------------------------------------------------
+  def __init__(self):
+    # Cached assets: file path -> (modification time, asset)
+    self.assets = dict()
+
+    # STL models are converted to VTP files with normals and levels of detail
+    self.modelPreprocessor = ModelPreprocessor()
+
+  #------------------------------------------------------------------------------
+  #
+  # Load assets
+  #
+  #------------------------------------------------------------------------------
+  def loadModel(self, filePath):
+    """
+    Load model from file (e.g. STL), reusing the polydata of previous loads.
+    :param filePath: path to model file (string)
+    :return model node (vtkMRMLModelNode)
+    """
+    if self.isPreprocessedModelFile(filePath):
+      return self.loadNode(filePath, self.loadPreprocessedModel)
+    return self.loadNode(filePath, slicer.util.loadModel)
+
+  #------------------------------------------------------------------------------
+  def getModelLevelsOfDetail(self, filePath):
+    """
+    Get decimated meshes of a model loaded previously, read from its preprocessed files.
+    :param filePath: path to model file (string)
+    :return meshes, most detailed first, empty if not available (list of vtkPolyData)
+    """
+    filePath = self.getNormalizedPath(filePath)
+    asset = self.getCachedAsset(filePath)
+    if asset is None:
+      return list()
+    if 'levelsOfDetail' not in asset:
+      asset['levelsOfDetail'] = list()
+      if self.isPreprocessedModelFile(filePath):
+        try:
+          filePaths = self.modelPreprocessor.getPreprocessedModelFilePaths(filePath)
+          asset['levelsOfDetail'] = [self.modelPreprocessor.readPolyData(levelFilePath) for levelFilePath in filePaths[1:]]
+        except Exception as error:
+          logging.warning('Levels of detail could not be loaded: ' + str(error))
+    return asset['levelsOfDetail']
+
+  #------------------------------------------------------------------------------
+  def loadTransform(self, filePath):
+    """
+    Load transform from file (e.g. H5), reusing the transform of previous loads.
+    :param filePath: path to transform file (string)
+    :return transform node (vtkMRMLTransformNode)
+    """
+    return self.loadNode(filePath, slicer.util.loadTransform)
+
+  #------------------------------------------------------------------------------
+  def loadMarkups(self, filePath):
+    """
+    Load markups from file (.mrk.json), reusing the control points and display properties of previous loads.
+    :param filePath: path to markups file (string)
+    :return markups node (vtkMRMLMarkupsNode)
+    """
+    return self.loadNode(filePath, slicer.util.loadMarkups)
+
+  #------------------------------------------------------------------------------
+  def loadVolume(self, filePath):
+    """
+    Load volume or image from file (e.g. PNG instruction slides), reusing the image data of previous loads.
+    :param filePath: path to volume file (string)
+    :return volume node (vtkMRMLVolumeNode)
+    """
+    return self.loadNode(filePath, slicer.util.loadVolume)
+
+  #------------------------------------------------------------------------------
+  def loadSequenceBrowser(self, filePath):
+    """
+    Load sequence browser file (.sqbr), e.g. instruction videos, reusing the sequences of previous loads.
+    Proxy nodes get the same names as when the file is loaded.
+    :param filePath: path to sequence browser file (string)
+    :return sequence browser node (vtkMRMLSequenceBrowserNode)
+    """
+    filePath = self.getNormalizedPath(filePath)
+    asset = self.getCachedAsset(filePath)
+    if asset is None:
+      browserNode = slicer.util.loadNodeFromFile(filePath, 'Tracked Sequence Browser')
+      self.storeAsset(filePath, self.createSequenceBrowserAsset(browserNode))
+      return browserNode
+
+    # Add sequences to scene, starting with master sequence
+    browserNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLSequenceBrowserNode', asset['name'])
+    sequenceNodes = list()
+    for sequenceTemplate, sequenceName, proxyName in asset['sequences']:
+      sequenceNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLSequenceNode', sequenceName)
+      sequenceNode.CopyContent(sequenceTemplate)
+      if not sequenceNodes:
+        browserNode.SetAndObserveMasterSequenceNodeID(sequenceNode.GetID())
+      else:
+        browserNode.AddSynchronizedSequenceNode(sequenceNode)
+      sequenceNodes.append((sequenceNode, proxyName))
+    browserNode.SetPlaybackRateFps(asset['playbackRateFps'])
+    browserNode.SetPlaybackLooped(asset['playbackLooped'])
+
+    # Create proxy nodes
+    slicer.modules.sequences.logic().UpdateProxyNodesFromSequences(browserNode)
+    for sequenceNode, proxyName in sequenceNodes:
+      proxyNode = browserNode.GetProxyNode(sequenceNode)
+      if proxyNode and proxyName:
+        proxyNode.SetName(proxyName)
+    return browserNode
+
+  #------------------------------------------------------------------------------
+  def clear(self):
+    """
+    Remove all cached assets, e.g. to release memory.
+    """
+    self.assets = dict()
+
+  #------------------------------------------------------------------------------
+  #
+  # Cache entries
+  #
+  #------------------------------------------------------------------------------
+  def loadNode(self, filePath, loadFunction):
+    """
+    Load node from cache if the file did not change, otherwise from file with the given function.
+    :param filePath: path to file (string)
+    :param loadFunction: function loading the file into the scene, from slicer.util (function)
+    :return node (vtkMRMLNode)
+    """
+    filePath = self.getNormalizedPath(filePath)
+    asset = self.getCachedAsset(filePath)
+    if asset is None:
+      node = loadFunction(filePath)
+      self.storeAsset(filePath, self.createNodeAsset(node))
+      return node
+
+    # Add node with content of cached copy
+    node = slicer.mrmlScene.AddNewNodeByClass(asset['node'].GetClassName(), asset['name'])
+    node.CopyContent(asset['node'], False) # shallow copy of polydata and image data
+    if asset['displayNode']:
+      node.CreateDefaultDisplayNodes()
+      if node.GetDisplayNode():
+        node.GetDisplayNode().CopyContent(asset['displayNode'])
+    return node
+
+  #------------------------------------------------------------------------------
+  def isPreprocessedModelFile(self, filePath):
+    return os.path.splitext(filePath)[1].lower() == '.stl'
+
+  #------------------------------------------------------------------------------
+  def loadPreprocessedModel(self, filePath):
+    """
+    Load STL model from its preprocessed VTP file, or from the STL file if it cannot be preprocessed.
+    :param filePath: path to STL file (string)
+    :return model node (vtkMRMLModelNode)
+    """
+    try:
+      preprocessedFilePath = self.modelPreprocessor.getPreprocessedModelFilePaths(filePath)[0]
+      polyData = self.modelPreprocessor.readPolyData(preprocessedFilePath)
+    except Exception as error:
+      logging.warning('Model could not be preprocessed, loading STL file: ' + str(error))
+      return slicer.util.loadModel(filePath)
+    modelNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLModelNode', os.path.splitext(os.path.basename(filePath))[0])
+    modelNode.SetAndObservePolyData(polyData)
+    modelNode.CreateDefaultDisplayNodes()
+    return modelNode
+
+  #------------------------------------------------------------------------------
+  def createNodeAsset(self, node):
+    """
+    Create copies of a node and its display node, which are not added to the scene.
+    :param node: node loaded from file (vtkMRMLNode)
+    :return cached asset (dict)
+    """
+    nodeTemplate = self.createNodeCopy(node)
+    displayNodeTemplate = None
+    if hasattr(node, 'GetDisplayNode') and node.GetDisplayNode():
+      displayNodeTemplate = self.createNodeCopy(node.GetDisplayNode())
+    return {'name': node.GetName(), 'node': nodeTemplate, 'displayNode': displayNodeTemplate}
+
+  #------------------------------------------------------------------------------
+  def createSequenceBrowserAsset(self, browserNode):
+    """
+    Create copies of the sequences of a sequence browser, master sequence first.
+    :param browserNode: sequence browser loaded from file (vtkMRMLSequenceBrowserNode)
+    :return cached asset (dict)
+    """
+    sequenceNodes = vtk.vtkCollection()
+    browserNode.GetSynchronizedSequenceNodes(sequenceNodes, True) # include master sequence
+    sequences = list()
+    for index in range(sequenceNodes.GetNumberOfItems()):
+      sequenceNode = sequenceNodes.GetItemAsObject(index)
+      proxyNode = browserNode.GetProxyNode(sequenceNode)
+      sequences.append((self.createNodeCopy(sequenceNode), sequenceNode.GetName(), proxyNode.GetName() if proxyNode else None))
+    return {
+      'name': browserNode.GetName(),
+      'sequences': sequences,
+      'playbackRateFps': browserNode.GetPlaybackRateFps(),
+      'playbackLooped': browserNode.GetPlaybackLooped()
+    }
+
+  #------------------------------------------------------------------------------
+  def createNodeCopy(self, node):
+    nodeCopy = getattr(slicer, node.GetClassName())()
+    nodeCopy.CopyContent(node) # deep copy, independent from the node in the scene
+    return nodeCopy
+
+  #------------------------------------------------------------------------------
+  def getNormalizedPath(self, filePath):
+    return os.path.normpath(os.path.abspath(filePath))
+
+  #------------------------------------------------------------------------------
+  def getCachedAsset(self, filePath):
+    """
+    Get cached asset of a file, if the file was not modified since it was cached.
+    :param filePath: normalized path to file (string)
+    :return cached asset, or None if not available (dict)
+    """
+    cachedAsset = self.assets.get(filePath)
+    if cachedAsset is None:
+      return None
+    modifiedTime, asset = cachedAsset
+    if (not os.path.exists(filePath)) or (os.path.getmtime(filePath) != modifiedTime):
+      del self.assets[filePath]
+      return None
+    return asset
+
+  #------------------------------------------------------------------------------
+  def storeAsset(self, filePath, asset):
+    try:
+      self.assets[filePath] = (os.path.getmtime(filePath), asset)
+    except OSError:
+      logging.warning('Asset could not be cached: ' + filePath)
@@ -0,0 +1,376 @@
+from __main__ import vtk, qt, slicer
+import logging
+import os
+import io
+import json
+import gzip
+import shutil
+import hashlib
+import tarfile
+import tempfile
+import concurrent.futures
+
+#------------------------------------------------------------------------------
+#
+# DatabaseArchive
+#
+#------------------------------------------------------------------------------
+class DatabaseArchive():
+  """
+  Exports participants and recordings of the database to a single archive file and imports
+  archives into an existing database.
+
+  The archive is an uncompressed tar file, so that it can be written and read as a stream.
+  Each file of the database is compressed separately (gzip) by a pool of worker threads,
+  except files that are already compressed (e.g. .sqbr recordings), which are stored as they
+  are. A manifest with the SHA-256 checksum of each file and the participant and recording
+  info is stored as the last member of the archive.
+
+  On import, participants are matched to existing participants by ID and personal details,
+  and recordings by ID, date, time and exercise. New IDs are allocated for participants and
+  recordings that conflict with different existing ones. Files whose checksum matches the
+  existing file are skipped, so importing the same archive twice does not write anything.
+  Existing files are never overwritten: files with a different checksum are skipped and
+  reported as conflicts in the import summary. Members are read in archive order, and the
+  info file of a new recording is only written once all its files have been extracted.
+
+  Usage:
+    archive = DatabaseArchive(recordingManager)
+    archive.exportArchive('/path/to/Backup.tar', {'00001': None, '00002': ['R00003']})
+    summary = archive.importArchive('/path/to/Backup.tar')
+  """
+
+  # Name of manifest member in archive
+  MANIFEST_MEMBER_NAME = 'manifest.json'
+
+  # Prefix of data members in archive
+  DATA_MEMBER_PREFIX = 'data/'
+
+  # Extensions of files that are already compressed and are stored without compression
+  COMPRESSED_FILE_EXTENSIONS = ['.sqbr', '.npz', '.zip', '.gz', '.png', '.jpg', '.mp4', '.parquet', '.h5']
+
+  # Participant info keys used to match participants of different databases
+  PARTICIPANT_MATCH_KEYS = ['name', 'surname', 'birthdate', 'email']
+
+  # Recording info keys used to match recordings of different databases
+  RECORDING_MATCH_KEYS = ['date', 'time', 'exercise']
+
+  # Size of blocks read from files
+  BLOCK_SIZE = 1024 * 1024
+
+  #------------------------------------------------------------------------------
+  def __init__(self, recordingManager):
+    self.recordingManager = recordingManager
+    self.numWorkers = max(1, min(8, os.cpu_count() or 1))
+
+  #------------------------------------------------------------------------------
+  #
+  # Export
+  #
+  #------------------------------------------------------------------------------
+  def exportArchive(self, archiveFilePath, selection = None):
+    """
+    Export participants and recordings to archive file.
+    :param archiveFilePath: path to output archive (string)
+    :param selection: list of recording IDs to export for each participant ID, or None to export all
+      recordings of a participant. If None, all participants are exported (dict)
+    :return number of exported files, or None if export failed (int)
+    """
+    rootDirectory = self.recordingManager.getRootDirectory()
+    if selection is None:
+      selection = {participantInfo['id']: None for participantInfo in self.recordingManager.readRootDirectory()}
+
+    # Files to export and info for manifest
+    manifest = {'version': 1, 'participants': list(), 'recordings': dict(), 'files': list()}
+    relativeFilePaths = list()
+    for participantID, recordingID_list in selection.items():
+      participantInfo = self.recordingManager.getParticipantInfoFromID(participantID)
+      if participantInfo is None:
+        logging.error('Participant ' + participantID + ' could not be exported')
+        continue
+      manifest['participants'].append(participantInfo)
+      relativeFilePaths.append(os.path.join(participantID, 'Participant_Info.json'))
+      recordingInfo_list = self.recordingManager.readParticipantDirectory(participantID)
+      if recordingID_list is not None:
+        recordingInfo_list = [recordingInfo for recordingInfo in recordingInfo_list if recordingInfo['id'] in recordingID_list]
+      manifest['recordings'][participantID] = recordingInfo_list
+      for recordingInfo in recordingInfo_list:
+        relativeFilePaths.extend(self.getRelativeFilePathsInDirectory(rootDirectory, os.path.join(participantID, recordingInfo['id'])))
+
+    # Compress files in parallel and add them to archive as they are completed
+    temporaryDirectory = tempfile.mkdtemp(prefix = 'TrainUS_Export_')
+    try:
+      with tarfile.open(archiveFilePath, 'w') as archiveFile:
+        with concurrent.futures.ThreadPoolExecutor(max_workers = self.numWorkers) as executor:
+          futures = [executor.submit(self.compressFile, rootDirectory, relativeFilePath, temporaryDirectory) for relativeFilePath in relativeFilePaths]
+          for future in concurrent.futures.as_completed(futures):
+            fileEntry, compressedFilePath = future.result()
+            archiveFile.add(compressedFilePath, arcname = fileEntry['member'])
+            if compressedFilePath != os.path.join(rootDirectory, fileEntry['path']):
+              os.remove(compressedFilePath)
+            manifest['files'].append(fileEntry)
+
+        # Manifest
+        manifest['files'].sort(key = lambda fileEntry: fileEntry['path'])
+        manifestData = json.dumps(manifest, indent = 2).encode('utf-8')
+        manifestMember = tarfile.TarInfo(self.MANIFEST_MEMBER_NAME)
+        manifestMember.size = len(manifestData)
+        archiveFile.addfile(manifestMember, io.BytesIO(manifestData))
+    except (OSError, tarfile.TarError):
+      logging.error('Database archive could not be exported to ' + archiveFilePath)
+      return None
+    finally:
+      shutil.rmtree(temporaryDirectory, ignore_errors = True)
+    logging.info('Exported {} files to database archive {}'.format(len(manifest['files']), archiveFilePath))
+    return len(manifest['files'])
+
+  #------------------------------------------------------------------------------
+  def getRelativeFilePathsInDirectory(self, rootDirectory, relativeDirectory):
+    """
+    Get files in a directory and its subdirectories, skipping hidden files.
+    :param rootDirectory: root directory (string)
+    :param relativeDirectory: directory relative to root directory (string)
+    :return file paths relative to root directory (list)
+    """
+    relativeFilePaths = list()
+    for directory, subdirectoryNames, fileNames in os.walk(os.path.join(rootDirectory, relativeDirectory)):
+      subdirectoryNames[:] = [name for name in subdirectoryNames if not name.startswith('.')]
+      for fileName in fileNames:
+        if not fileName.startswith('.'):
+          relativeFilePaths.append(os.path.relpath(os.path.join(directory, fileName), rootDirectory))
+    return relativeFilePaths
+
+  #------------------------------------------------------------------------------
+  def compressFile(self, rootDirectory, relativeFilePath, temporaryDirectory):
+    """
+    Compute checksum of a file and compress it into a temporary file. Runs in worker threads.
+    :param rootDirectory: root directory (string)
+    :param relativeFilePath: file path relative to root directory (string)
+    :param temporaryDirectory: directory for compressed files (string)
+    :return manifest entry (dict) and path of the file to add to the archive (string)
+    """
+    filePath = os.path.join(rootDirectory, relativeFilePath)
+    archivePath = relativeFilePath.replace(os.sep, '/')
+    sha256 = hashlib.sha256()
+    if os.path.splitext(filePath)[1].lower() in self.COMPRESSED_FILE_EXTENSIONS:
+      # Store already compressed files as they are
+      with open(filePath, 'rb') as inputFile:
+        for block in iter(lambda: inputFile.read(self.BLOCK_SIZE), b''):
+          sha256.update(block)
+      compression = 'none'
+      member = self.DATA_MEMBER_PREFIX + archivePath
+      outputFilePath = filePath
+    else:
+      compression = 'gzip'
+      member = self.DATA_MEMBER_PREFIX + archivePath + '.gz'
+      outputFilePath = os.path.join(temporaryDirectory, hashlib.sha1(archivePath.encode('utf-8')).hexdigest() + '.gz')
+      with open(filePath, 'rb') as inputFile, gzip.open(outputFilePath, 'wb', compresslevel = 6) as outputFile:
+        for block in iter(lambda: inputFile.read(self.BLOCK_SIZE), b''):
+          sha256.update(block)
+          outputFile.write(block)
+    fileEntry = {'path': archivePath, 'member': member, 'size': os.path.getsize(filePath), 'sha256': sha256.hexdigest(), 'compression': compression}
+    return fileEntry, outputFilePath
+
+  #------------------------------------------------------------------------------
+  #
+  # Import
+  #
+  #------------------------------------------------------------------------------
+  def importArchive(self, archiveFilePath):
+    """
+    Import participants and recordings from archive file into the database.
+    :param archiveFilePath: path to input archive (string)
+    :return number of imported participants, recordings, written files and skipped files, and paths of
+      conflicting files that differ from the existing ones (dict), or None if import failed
+    """
+    summary = {'participants': 0, 'recordings': 0, 'writtenFiles': 0, 'skippedFiles': 0, 'conflictingFiles': list()}
+    newRecordings = dict() # database recording folder -> (participant ID, recording ID, info) of recordings created by the import
+    failedRecordingDirectories = set() # archived recording folders with files that could not be extracted
+    try:
+      with tarfile.open(archiveFilePath, 'r') as archiveFile:
+        manifest = json.load(archiveFile.extractfile(self.MANIFEST_MEMBER_NAME))
+
+        # Map archived participant and recording folders to folders in the database
+        directoryMap = dict()
+        for participantInfo in manifest['participants']:
+          archivedParticipantID = participantInfo['id']
+          participantID = self.importParticipant(participantInfo)
+          if participantID is None:
+            continue
+          summary['participants'] += 1
+          directoryMap[archivedParticipantID] = participantID
+          for recordingInfo in manifest['recordings'].get(archivedParticipantID, list()):
+            recordingID, newRecordingInfo = self.importRecording(participantID, recordingInfo)
+            if recordingID is None:
+              continue
+            recordingDirectory = participantID + '/' + recordingID
+            directoryMap[archivedParticipantID + '/' + recordingInfo['id']] = recordingDirectory
+            if newRecordingInfo is not None:
+              newRecordings[recordingDirectory] = (participantID, recordingID, newRecordingInfo)
+            else:
+              summary['recordings'] += 1
+
+        # Extract files not present in the database, reading archive members in order
+        fileEntriesByMember = {fileEntry['member']: fileEntry for fileEntry in manifest['files']}
+        for member in archiveFile.getmembers():
+          fileEntry = fileEntriesByMember.get(member.name)
+          if fileEntry is None:
+            continue # manifest
+          if os.path.basename(fileEntry['path']) in ['Participant_Info.json', 'Recording_Info.json']:
+            continue # written by importParticipant and after extraction with the new IDs
+          filePath = self.getImportedFilePath(fileEntry['path'], directoryMap)
+          if filePath is None:
+            continue
+          if os.path.exists(filePath):
+            if self.isFileUpToDate(filePath, fileEntry):
+              summary['skippedFiles'] += 1
+            else:
+              logging.warning('Archived file differs from existing file and was not imported: ' + filePath)
+              summary['conflictingFiles'].append(filePath)
+            continue
+          if self.extractFile(archiveFile, member, fileEntry, filePath):
+            summary['writtenFiles'] += 1
+          else:
+            failedRecordingDirectories.add('/'.join(fileEntry['path'].split('/')[:2]))
+
+        # Info files of new recordings are written last, so that recordings are only added with all their files
+        for archivedRecordingDirectory, recordingDirectory in directoryMap.items():
+          if recordingDirectory not in newRecordings:
+            continue
+          participantID, recordingID, newRecordingInfo = newRecordings.pop(recordingDirectory)
+          if archivedRecordingDirectory in failedRecordingDirectories:
+            logging.error('Recording {} could not be imported'.format(archivedRecordingDirectory))
+            self.removeNewRecording(participantID, recordingID)
+            continue
+          self.recordingManager.writeRecordingInfoFile(self.recordingManager.getRecordingInfoFilePath(participantID, recordingID), newRecordingInfo)
+          summary['recordings'] += 1
+    except (OSError, KeyError, ValueError, EOFError, tarfile.TarError):
+      logging.error('Database archive could not be imported from ' + archiveFilePath)
+      for participantID, recordingID, newRecordingInfo in newRecordings.values():
+        self.removeNewRecording(participantID, recordingID)
+      return None
+    logging.info('Imported database archive {}: {}'.format(archiveFilePath, summary))
+    return summary
+
+  #------------------------------------------------------------------------------
+  def importParticipant(self, participantInfo):
+    """
+    Find participant in the database matching an archived participant, or create a new one.
+    :param participantInfo: archived participant info (dict)
+    :return participant ID in the database (string)
+    """
+    existingParticipantInfo_list = self.recordingManager.readRootDirectory()
+
+    # Participant with same ID and details, or with same details and a different ID
+    matchingParticipantInfo_list = [existingParticipantInfo for existingParticipantInfo in existingParticipantInfo_list
+      if self.isMatchingInfo(existingParticipantInfo, participantInfo, self.PARTICIPANT_MATCH_KEYS)]
+    matchingParticipantInfo_list.sort(key = lambda existingParticipantInfo: existingParticipantInfo['id'] != participantInfo['id'])
+    if matchingParticipantInfo_list:
+      return matchingParticipantInfo_list[0]['id']
+
+    # New participant
+    participantID = self.recordingManager.idAllocator.allocateID(self.recordingManager.getRootDirectory(), prefix = '', numDigits = 5)
+    if participantID is None:
+      return None
+    newParticipantInfo = dict(participantInfo)
+    newParticipantInfo['id'] = participantID
+    self.recordingManager.writeParticipantInfoFile(self.recordingManager.getParticipantInfoFilePath(participantID), newParticipantInfo)
+    return participantID
+
+  #------------------------------------------------------------------------------
+  def importRecording(self, participantID, recordingInfo):
+    """
+    Find recording of a participant in the database matching an archived recording, or create a new one.
+    The info file of a new recording is not written, so that it is only added to the database once its
+    files are imported.
+    :param participantID: participant ID in the database (string)
+    :param recordingInfo: archived recording info (dict)
+    :return recording ID in the database (string) and info to write for a new recording, None for an existing one (dict)
+    """
+    existingRecordingInfo_list = self.recordingManager.readParticipantDirectory(participantID)
+    matchingRecordingInfo_list = [existingRecordingInfo for existingRecordingInfo in existingRecordingInfo_list
+      if self.isMatchingInfo(existingRecordingInfo, recordingInfo, self.RECORDING_MATCH_KEYS)]
+    matchingRecordingInfo_list.sort(key = lambda existingRecordingInfo: existingRecordingInfo['id'] != recordingInfo['id'])
+    if matchingRecordingInfo_list:
+      return matchingRecordingInfo_list[0]['id'], None
+
+    # New recording
+    participantDirectory = os.path.join(self.recordingManager.getRootDirectory(), participantID)
+    recordingID = self.recordingManager.idAllocator.allocateID(participantDirectory, prefix = 'R', numDigits = 5)
+    if recordingID is None:
+      return None, None
+    newRecordingInfo = dict(recordingInfo)
+    newRecordingInfo['id'] = recordingID
+    return recordingID, newRecordingInfo
+
+  #------------------------------------------------------------------------------
+  def removeNewRecording(self, participantID, recordingID):
+    """
+    Remove folder of a recording created by the import whose files could not be imported.
+    :param participantID: participant ID in the database (string)
+    :param recordingID: recording ID in the database (string)
+    """
+    shutil.rmtree(os.path.join(self.recordingManager.getRootDirectory(), participantID, recordingID), ignore_errors = True)
+
+  #------------------------------------------------------------------------------
+  def isMatchingInfo(self, info, otherInfo, keys):
+    return all(str(info.get(key, '')).strip().lower() == str(otherInfo.get(key, '')).strip().lower() for key in keys)
+
+  #------------------------------------------------------------------------------
+  def getImportedFilePath(self, archivePath, directoryMap):
+    """
+    Get path in the database of an archived file, replacing participant and recording IDs.
+    :param archivePath: file path in archive, '<participantID>/<recordingID>/<fileName>' (string)
+    :param directoryMap: database folder of each archived participant and recording folder (dict)
+    :return file path in the database, or None if its folder was not imported (string)
+    """
+    pathParts = archivePath.split('/')
+    if (len(pathParts) < 3) or ('..' in pathParts):
+      return None
+    recordingDirectory = directoryMap.get(pathParts[0] + '/' + pathParts[1])
+    if recordingDirectory is None:
+      return None
+    return os.path.join(self.recordingManager.getRootDirectory(), *(recordingDirectory.split('/') + pathParts[2:]))
+
+  #------------------------------------------------------------------------------
+  def isFileUpToDate(self, filePath, fileEntry):
+    """
+    Check if an existing file matches the checksum of an archived file.
+    :param filePath: file path in the database (string)
+    :param fileEntry: manifest entry of archived file (dict)
+    :return result (bool)
+    """
+    if os.path.getsize(filePath) != fileEntry['size']:
+      return False
+    sha256 = hashlib.sha256()
+    with open(filePath, 'rb') as inputFile:
+      for block in iter(lambda: inputFile.read(self.BLOCK_SIZE), b''):
+        sha256.update(block)
+    return sha256.hexdigest() == fileEntry['sha256']
+
+  #------------------------------------------------------------------------------
+  def extractFile(self, archiveFile, member, fileEntry, filePath):
+    """
+    Extract and decompress archived file, verifying its checksum.
+    :param archiveFile: open archive (tarfile.TarFile)
+    :param member: archive member of the file (tarfile.TarInfo)
+    :param fileEntry: manifest entry of archived file (dict)
+    :param filePath: output file path in the database (string)
+    :return True on success, False otherwise (bool)
+    """
+    os.makedirs(os.path.dirname(filePath), exist_ok = True)
+    temporaryFilePath = filePath + '.importing'
+    sha256 = hashlib.sha256()
+    memberFile = archiveFile.extractfile(member)
+    if fileEntry['compression'] == 'gzip':
+      memberFile = gzip.GzipFile(fileobj = memberFile)
+    with open(temporaryFilePath, 'wb') as outputFile:
+      for block in iter(lambda: memberFile.read(self.BLOCK_SIZE), b''):
+        sha256.update(block)
+        outputFile.write(block)
+    if sha256.hexdigest() != fileEntry['sha256']:
+      logging.error('Checksum of archived file does not match: ' + fileEntry['path'])
+      os.remove(temporaryFilePath)
+      return False
+    os.rename(temporaryFilePath, filePath) # file does not exist, existing files are never replaced
+    return True
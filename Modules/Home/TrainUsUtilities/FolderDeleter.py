@@ -0,0 +1,131 @@
+from __main__ import vtk, qt, slicer
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+#------------------------------------------------------------------------------
+#
+# FolderDeleter
+#
+#------------------------------------------------------------------------------
+class FolderDeleter():
+  """
+  Deletes participant and recording folders without blocking the GUI.
+
+  The folder is first renamed to a hidden tombstone folder in the same directory. The rename
+  is atomic, so the participant or recording disappears from the database at once. Tombstones
+  are then removed by a background worker thread. Failures are reported in the log when the
+  worker finishes, and tombstones that could not be removed (e.g. files still open) are removed
+  again the next time the root directory is set.
+
+  Usage:
+    deleter = FolderDeleter()
+    deleter.deleteTombstones(rootDirectory) # at startup
+    deleter.deleteFolder(recordingDirectory)
+  """
+
+  # Prefix of tombstone folders. Hidden folders are not listed as participants or recordings
+  TOMBSTONE_PREFIX = '.TrainUS_Deleted_'
+
+  #------------------------------------------------------------------------------
+  def __init__(self):
+    # Tombstones waiting to be removed by the worker, and removal failures
+    self.tombstoneQueue = queue.Queue()
+    self.failureQueue = queue.Queue()
+    self.workerThread = None
+    self.workerLock = threading.Lock()
+
+    # Timer to report failures on the main thread
+    self.reportTimer = qt.QTimer()
+    self.reportTimer.setInterval(500)
+    self.reportTimer.connect('timeout()', self.reportFailures)
+
+  #------------------------------------------------------------------------------
+  def deleteFolder(self, folderPath):
+    """
+    Rename folder to a tombstone and remove it in the background.
+    :param folderPath: path to folder (string)
+    :return True if the folder was renamed, False otherwise (bool)
+    """
+    if not os.path.isdir(folderPath):
+      return True
+    tombstonePath = os.path.join(os.path.dirname(folderPath),
+      '{}{}_{}'.format(self.TOMBSTONE_PREFIX, os.path.basename(folderPath), time.strftime('%Y%m%d%H%M%S')))
+    try:
+      os.rename(folderPath, tombstonePath)
+    except OSError as error:
+      logging.error('Folder could not be deleted: {} ({})'.format(folderPath, error))
+      return False
+    self.enqueueTombstone(tombstonePath)
+    return True
+
+  #------------------------------------------------------------------------------
+  def deleteTombstones(self, rootDirectory):
+    """
+    Remove tombstones left in the root directory and participant folders, e.g. after a failed
+    removal or if the application was closed before the worker finished.
+    :param rootDirectory: root directory of the database (string)
+    """
+    try:
+      directories = [rootDirectory] + [entry.path for entry in os.scandir(rootDirectory) if entry.is_dir() and not entry.name.startswith('.')]
+    except OSError:
+      return
+    for directory in directories:
+      try:
+        tombstonePaths = [entry.path for entry in os.scandir(directory) if entry.is_dir() and entry.name.startswith(self.TOMBSTONE_PREFIX)]
+      except OSError:
+        continue
+      for tombstonePath in tombstonePaths:
+        self.enqueueTombstone(tombstonePath)
+
+  #------------------------------------------------------------------------------
+  def enqueueTombstone(self, tombstonePath):
+    """
+    Add tombstone to the queue of the worker, starting the worker if it is not running.
+    :param tombstonePath: path to tombstone folder (string)
+    """
+    with self.workerLock:
+      self.tombstoneQueue.put(tombstonePath)
+      if self.workerThread is None:
+        self.workerThread = threading.Thread(target = self.removeTombstones, name = 'FolderDeleter', daemon = True)
+        self.workerThread.start()
+    if not self.reportTimer.isActive():
+      self.reportTimer.start()
+
+  #------------------------------------------------------------------------------
+  def removeTombstones(self):
+    """
+    Remove queued tombstones. Runs in the worker thread until the queue is empty.
+    """
+    while True:
+      with self.workerLock:
+        try:
+          tombstonePath = self.tombstoneQueue.get_nowait()
+        except queue.Empty:
+          self.workerThread = None
+          return
+      if not os.path.isdir(tombstonePath):
+        continue # already removed, e.g. queued twice
+      errors = list()
+      shutil.rmtree(tombstonePath, onerror = lambda function, path, excinfo: errors.append('{}: {}'.format(path, excinfo[1])))
+      if errors:
+        self.failureQueue.put((tombstonePath, errors))
+
+  #------------------------------------------------------------------------------
+  def isBusy(self):
+    return self.workerThread is not None
+
+  #------------------------------------------------------------------------------
+  def reportFailures(self):
+    """
+    Log removal failures reported by the worker. Runs on the main thread.
+    """
+    while not self.failureQueue.empty():
+      tombstonePath, errors = self.failureQueue.get()
+      logging.error('Deleted folder could not be completely removed, it will be removed again on next startup: {}\n  {}'.format(
+        tombstonePath, '\n  '.join(errors[:10])))
+    if not self.isBusy() and self.failureQueue.empty():
+      self.reportTimer.stop()
@@ -0,0 +1,143 @@
+from __main__ import vtk, qt, slicer
+import logging
+import os
+import re
+
+#------------------------------------------------------------------------------
+#
+# IDAllocator
+#
+#------------------------------------------------------------------------------
+class IDAllocator():
+  """
+  Allocates unique IDs for the folders of a directory (participants in the root directory,
+  recordings in a participant directory) without listing the directory.
+
+  The next ID is stored in a counter file inside the directory, which is read and replaced
+  atomically while holding an exclusive lock on a lock file, so that several stations can
+  create folders in a shared directory at the same time. The folder of the new ID is created
+  while the lock is held. If the folder already exists (e.g. the counter file was deleted),
+  the next ID is tried.
+
+  Usage:
+    allocator = IDAllocator()
+    newRecordingID = allocator.allocateID(participantDirectory, prefix = 'R')
+  """
+
+  # Counter and lock files stored in each directory
+  COUNTER_FILE_NAME = '.TrainUS_NextID'
+  LOCK_FILE_NAME = '.TrainUS_NextID.lock'
+
+  #------------------------------------------------------------------------------
+  def allocateID(self, directory, prefix = '', numDigits = 5):
+    """
+    Allocate new ID and create its folder in the directory.
+    :param directory: directory where the new folder is created (string)
+    :param prefix: prefix of the ID (string)
+    :param numDigits: number of digits of the ID, with leading zeros (int)
+    :return new ID, or None if the folder could not be created (string)
+    """
+    try:
+      os.makedirs(directory, exist_ok = True)
+      with open(os.path.join(directory, self.LOCK_FILE_NAME), 'a+') as lockFile:
+        self.lockFile(lockFile)
+        try:
+          return self.allocateIDWithLock(directory, prefix, numDigits)
+        finally:
+          self.unlockFile(lockFile)
+    except OSError:
+      logging.error('New ID could not be allocated in directory ' + directory)
+      return None
+
+  #------------------------------------------------------------------------------
+  def allocateIDWithLock(self, directory, prefix, numDigits):
+    """
+    Read counter, create folder of the first available ID and write updated counter.
+    """
+    counterFilePath = os.path.join(directory, self.COUNTER_FILE_NAME)
+    nextIndex = self.readCounterFile(counterFilePath)
+    if nextIndex is None:
+      nextIndex = self.getNextIndexFromFolders(directory, prefix)
+    while True:
+      newID = prefix + str(nextIndex).zfill(numDigits)
+      nextIndex += 1
+      try:
+        os.makedirs(os.path.join(directory, newID))
+        break
+      except FileExistsError:
+        continue
+    self.writeCounterFile(counterFilePath, nextIndex)
+    return newID
+
+  #------------------------------------------------------------------------------
+  def readCounterFile(self, counterFilePath):
+    """
+    Read next index from counter file.
+    :param counterFilePath: path to counter file (string)
+    :return next index, or None if the file does not exist or is not valid (int)
+    """
+    try:
+      with open(counterFilePath, 'r') as counterFile:
+        return int(counterFile.read().strip())
+    except (OSError, ValueError):
+      return None
+
+  #------------------------------------------------------------------------------
+  def writeCounterFile(self, counterFilePath, nextIndex):
+    """
+    Write next index to counter file. A temporary file is replaced atomically so that the
+    counter file is never left partially written.
+    :param counterFilePath: path to counter file (string)
+    :param nextIndex: next index (int)
+    """
+    temporaryFilePath = counterFilePath + '.tmp'
+    with open(temporaryFilePath, 'w') as temporaryFile:
+      temporaryFile.write(str(nextIndex))
+      temporaryFile.flush()
+      os.fsync(temporaryFile.fileno())
+    os.replace(temporaryFilePath, counterFilePath)
+
+  #------------------------------------------------------------------------------
+  def getNextIndexFromFolders(self, directory, prefix):
+    """
+    Get next index from the names of the existing folders. Only used to initialize the counter.
+    :param directory: directory (string)
+    :param prefix: prefix of the IDs (string)
+    :return next index (int)
+    """
+    pattern = re.compile('^' + re.escape(prefix) + r'(\d+)$')
+    maxIndex = 0
+    for name in os.listdir(directory):
+      match = pattern.match(name)
+      if match and os.path.isdir(os.path.join(directory, name)):
+        maxIndex = max(maxIndex, int(match.group(1)))
+    return maxIndex + 1
+
+  #------------------------------------------------------------------------------
+  def lockFile(self, fileObject):
+    """
+    Acquire exclusive lock on a file, waiting until it is available.
+    :param fileObject: open file (file)
+    """
+    if os.name == 'nt':
+      import msvcrt
+      fileObject.seek(0)
+      # LK_LOCK retries for 10 seconds before failing
+      msvcrt.locking(fileObject.fileno(), msvcrt.LK_LOCK, 1)
+    else:
+      import fcntl
+      fcntl.lockf(fileObject.fileno(), fcntl.LOCK_EX)
+
+  #------------------------------------------------------------------------------
+  def unlockFile(self, fileObject):
+    """
+    Release lock acquired with lockFile.
+    :param fileObject: open file (file)
+    """
+    if os.name == 'nt':
+      import msvcrt
+      fileObject.seek(0)
+      msvcrt.locking(fileObject.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+      import fcntl
+      fcntl.lockf(fileObject.fileno(), fcntl.LOCK_UN)
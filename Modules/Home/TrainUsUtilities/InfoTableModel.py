@@ -0,0 +1,195 @@
+from __main__ import vtk, qt, slicer
+import logging
+import difflib
+
+#------------------------------------------------------------------------------
+#
+# InfoTableModel
+#
+#------------------------------------------------------------------------------
+class InfoTableModel(qt.QAbstractTableModel):
+  """
+  Table model of participant or recording info dictionaries, displayed in QTableView widgets
+  through a sort proxy. Subclasses define the info key displayed in each column.
+
+  The model stores the list of info and returns cell contents on demand, so the view only
+  requests the rows that are visible. When the list is updated, the differences with the
+  previous list are computed and only inserted, removed and modified rows are notified to the
+  view, which keeps the current selection and scroll position. A map from ID to row is kept to
+  find the row of an item without scanning the table.
+
+  Usage:
+    model = ParticipantTableModel()
+    proxyModel = model.createProxyModel()
+    tableView.setModel(proxyModel)
+    model.setInfoList(participantInfo_list)
+    participantID = model.getIDFromProxyIndex(proxyModel, tableView.currentIndex())
+  """
+
+  # Info key displayed in each column
+  COLUMN_KEYS = ['id']
+
+  #------------------------------------------------------------------------------
+  def __init__(self, parent = None):
+    qt.QAbstractTableModel.__init__(self, parent)
+    self.info_list = list()
+    self.rowFromID = dict()
+    self.headerLabels = list(self.COLUMN_KEYS)
+
+  #------------------------------------------------------------------------------
+  #
+  # QAbstractTableModel interface
+  #
+  #------------------------------------------------------------------------------
+  def rowCount(self, parent = qt.QModelIndex()):
+    if parent.isValid():
+      return 0
+    return len(self.info_list)
+
+  #------------------------------------------------------------------------------
+  def columnCount(self, parent = qt.QModelIndex()):
+    if parent.isValid():
+      return 0
+    return len(self.COLUMN_KEYS)
+
+  #------------------------------------------------------------------------------
+  def data(self, index, role = qt.Qt.DisplayRole):
+    if not index.isValid():
+      return None
+    if role in [qt.Qt.DisplayRole, qt.Qt.ToolTipRole]:
+      return self.getDisplayText(index.row(), index.column())
+    if role == qt.Qt.UserRole:
+      return self.getSortValue(index.row(), index.column())
+    return None
+
+  #------------------------------------------------------------------------------
+  def headerData(self, section, orientation, role = qt.Qt.DisplayRole):
+    if (orientation != qt.Qt.Horizontal) or (role != qt.Qt.DisplayRole) or (section >= len(self.headerLabels)):
+      return None
+    return self.headerLabels[section]
+
+  #------------------------------------------------------------------------------
+  def getDisplayText(self, row, column):
+    """
+    Get text displayed in a cell. Reimplement in subclasses to format values.
+    :param row: row (int)
+    :param column: column (int)
+    :return text (string)
+    """
+    return str(self.info_list[row].get(self.COLUMN_KEYS[column], ''))
+
+  #------------------------------------------------------------------------------
+  def getSortValue(self, row, column):
+    """
+    Get value used by the proxy model to sort a column. Reimplement in subclasses to sort numbers.
+    :param row: row (int)
+    :param column: column (int)
+    :return value (string or float)
+    """
+    return self.getDisplayText(row, column).lower()
+
+  #------------------------------------------------------------------------------
+  #
+  # Update contents
+  #
+  #------------------------------------------------------------------------------
+  def setHeaderLabels(self, headerLabels):
+    """
+    Set text of horizontal header, e.g. when the language changes.
+    :param headerLabels: text of each column (list)
+    """
+    self.headerLabels = list(headerLabels)
+    self.headerDataChanged(qt.Qt.Horizontal, 0, len(self.headerLabels) - 1)
+
+  #------------------------------------------------------------------------------
+  def setInfoList(self, info_list):
+    """
+    Update table, notifying the view only of rows that were inserted, removed or modified.
+    :param info_list: participant or recording info (list)
+    """
+    oldIDs = [info['id'] for info in self.info_list]
+    newIDs = [info['id'] for info in info_list]
+    matcher = difflib.SequenceMatcher(None, oldIDs, newIDs, autojunk = False)
+
+    # Apply insertions and removals from the last row, so that previous row numbers remain valid
+    modifiedRows = list()
+    for tag, oldStart, oldEnd, newStart, newEnd in reversed(matcher.get_opcodes()):
+      if tag == 'equal':
+        for offset in range(oldEnd - oldStart):
+          if self.info_list[oldStart + offset] != info_list[newStart + offset]:
+            self.info_list[oldStart + offset] = info_list[newStart + offset]
+            modifiedRows.append(newStart + offset)
+        continue
+      if oldEnd > oldStart:
+        self.beginRemoveRows(qt.QModelIndex(), oldStart, oldEnd - 1)
+        del self.info_list[oldStart:oldEnd]
+        self.endRemoveRows()
+      if newEnd > newStart:
+        self.beginInsertRows(qt.QModelIndex(), oldStart, oldStart + newEnd - newStart - 1)
+        self.info_list[oldStart:oldStart] = info_list[newStart:newEnd]
+        self.endInsertRows()
+    self.rowFromID = {itemID: row for row, itemID in enumerate(newIDs)}
+
+    # Notify modified rows
+    for row in modifiedRows:
+      self.emitRowChanged(row)
+
+  #------------------------------------------------------------------------------
+  def emitRowChanged(self, row):
+    self.dataChanged(self.index(row, 0), self.index(row, len(self.COLUMN_KEYS) - 1))
+
+  #------------------------------------------------------------------------------
+  #
+  # Access rows
+  #
+  #------------------------------------------------------------------------------
+  def getRowFromID(self, itemID):
+    """
+    Get row of a participant or recording.
+    :param itemID: participant or recording ID (string)
+    :return row, or -1 if it is not in the table (int)
+    """
+    return self.rowFromID.get(itemID, -1)
+
+  #------------------------------------------------------------------------------
+  def getIDFromRow(self, row):
+    if (row < 0) or (row >= len(self.info_list)):
+      return ''
+    return self.info_list[row]['id']
+
+  #------------------------------------------------------------------------------
+  def createProxyModel(self):
+    """
+    Create proxy model to sort the table by any column in the view.
+    :return proxy model (qt.QSortFilterProxyModel)
+    """
+    proxyModel = qt.QSortFilterProxyModel()
+    proxyModel.setSourceModel(self)
+    proxyModel.setSortRole(qt.Qt.UserRole)
+    proxyModel.setDynamicSortFilter(True)
+    return proxyModel
+
+  #------------------------------------------------------------------------------
+  def getIDFromProxyIndex(self, proxyModel, proxyIndex):
+    """
+    Get participant or recording displayed in a cell of the view.
+    :param proxyModel: proxy model set in the view (qt.QSortFilterProxyModel)
+    :param proxyIndex: index of cell in the view (qt.QModelIndex)
+    :return ID, empty if index is not valid (string)
+    """
+    if not proxyIndex.isValid():
+      return ''
+    return self.getIDFromRow(proxyModel.mapToSource(proxyIndex).row())
+
+  #------------------------------------------------------------------------------
+  def getProxyRowFromID(self, proxyModel, itemID):
+    """
+    Get row of a participant or recording in the view.
+    :param proxyModel: proxy model set in the view (qt.QSortFilterProxyModel)
+    :param itemID: participant or recording ID (string)
+    :return row, or -1 if it is not in the table (int)
+    """
+    row = self.getRowFromID(itemID)
+    if row < 0:
+      return -1
+    return proxyModel.mapFromSource(self.index(row, 0)).row()
@@ -0,0 +1,244 @@
+from __main__ import vtk, qt, slicer
+import logging
+import numpy as np
+from vtk.util import numpy_support
+
+#------------------------------------------------------------------------------
+#
+# LearningCurveAnalytics
+#
+#------------------------------------------------------------------------------
+class LearningCurveAnalytics():
+  """
+  Computes and plots learning curves of an overall metric across the sessions of one or several
+  participants, from the metric values cached in the catalog.
+
+  Recordings of each participant are ordered by date and time and numbered as sessions. Values
+  are arranged in a (participants x sessions) matrix padded with NaN, so that the trend of each
+  participant (least squares line), the moving average of each participant and the percentiles
+  of the cohort at each session are computed with vectorized NumPy operations.
+
+  Usage:
+    analytics = LearningCurveAnalytics()
+    curves = analytics.computeLearningCurves(participantIDs, sessionKeys, values, windowSize = 5)
+    plotChartNode = analytics.createLearningCurvePlotChart(curves, 'Path length', highlightedParticipantID)
+  """
+
+  # Percentiles of the cohort displayed in plots
+  PERCENTILES = [25, 50, 75]
+
+  #------------------------------------------------------------------------------
+  def __init__(self):
+    # Plot nodes
+    self.tableNode = None
+    self.plotSeriesNodes = list()
+    self.plotChartNode = None
+    self.plotArrays = dict() # numpy arrays referenced by table columns
+
+  #------------------------------------------------------------------------------
+  #
+  # Compute learning curves
+  #
+  #------------------------------------------------------------------------------
+  def getMetricValues(self, recordings, metricName, exerciseName = None):
+    """
+    Get values of an overall metric from recordings with details.
+    :param recordings: (participant ID, recording ID, date, time, exercise, details) tuples (list)
+    :param metricName: overall metric name (string)
+    :param exerciseName: only use recordings of this exercise if not None (string)
+    :return participant IDs, session keys ('<date> <time> <recordingID>') and values (numpy arrays)
+    """
+    participantIDs = list()
+    sessionKeys = list()
+    values = list()
+    for participantID, recordingID, date, time, exercise, details in recordings:
+      if (details is None) or ((exerciseName is not None) and (exercise != exerciseName)):
+        continue
+      value = details.get('overallMetrics', dict()).get(metricName)
+      if value is None:
+        continue
+      participantIDs.append(participantID)
+      sessionKeys.append('{} {} {}'.format(date, time, recordingID))
+      values.append(value)
+    return np.array(participantIDs, dtype = str), np.array(sessionKeys, dtype = str), np.array(values, dtype = np.float64)
+
+  #------------------------------------------------------------------------------
+  def getMetricNames(self, recordings, exerciseName = None):
+    """
+    Get names of the overall metrics available in recordings with details.
+    :param recordings: (participant ID, recording ID, date, time, exercise, details) tuples (list)
+    :param exerciseName: only use recordings of this exercise if not None (string)
+    :return sorted metric names (list)
+    """
+    metricNames = set()
+    for participantID, recordingID, date, time, exercise, details in recordings:
+      if details and ((exerciseName is None) or (exercise == exerciseName)):
+        metricNames.update(details.get('overallMetrics', dict()).keys())
+    return sorted(metricNames)
+
+  #------------------------------------------------------------------------------
+  def computeLearningCurves(self, participantIDs, sessionKeys, values, windowSize = 5):
+    """
+    Compute learning curves of a metric.
+    :param participantIDs: participant ID of each value (numpy array)
+    :param sessionKeys: sortable session key of each value, e.g. date and time (numpy array)
+    :param values: metric values (numpy array)
+    :param windowSize: number of sessions of the moving average (int)
+    :return learning curves (dict):
+      - 'participantIDs': participant of each row, sorted (numpy array)
+      - 'sessions': session numbers, starting at 1 (numpy array)
+      - 'values': (participants x sessions) values, NaN where the participant has fewer sessions
+      - 'movingAverage': (participants x sessions) trailing moving average of values
+      - 'slopes', 'intercepts': trend line of each participant, value = intercept + slope * session
+      - 'percentiles': (percentiles x sessions) percentiles of the cohort at each session
+      - 'mean': mean of the cohort at each session
+    """
+    if len(values) == 0:
+      return None
+
+    # Sort by participant and session, and number sessions of each participant
+    order = np.lexsort((sessionKeys, participantIDs))
+    uniqueParticipantIDs, participantIndices, sessionCounts = np.unique(participantIDs[order], return_inverse = True, return_counts = True)
+    groupStarts = np.concatenate(([0], np.cumsum(sessionCounts)[:-1]))
+    sessionIndices = np.arange(len(order)) - np.repeat(groupStarts, sessionCounts)
+    numParticipants = len(uniqueParticipantIDs)
+    numSessions = int(sessionCounts.max())
+
+    # Values matrix
+    valueMatrix = np.full((numParticipants, numSessions), np.nan)
+    valueMatrix[participantIndices, sessionIndices] = values[order]
+    validMatrix = ~np.isnan(valueMatrix)
+
+    # Trailing moving average from cumulative sums, ignoring missing sessions
+    windowSize = max(1, int(windowSize))
+    cumulativeSums = np.concatenate((np.zeros((numParticipants, 1)), np.cumsum(np.where(validMatrix, valueMatrix, 0.0), axis = 1)), axis = 1)
+    cumulativeCounts = np.concatenate((np.zeros((numParticipants, 1)), np.cumsum(validMatrix, axis = 1)), axis = 1)
+    windowEnds = np.arange(1, numSessions + 1)
+    windowStarts = np.maximum(windowEnds - windowSize, 0)
+    windowCounts = cumulativeCounts[:, windowEnds] - cumulativeCounts[:, windowStarts]
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+      movingAverage = (cumulativeSums[:, windowEnds] - cumulativeSums[:, windowStarts]) / windowCounts
+    movingAverage[~validMatrix] = np.nan
+
+    # Least squares trend of each participant
+    sessionNumbers = sessionIndices.astype(np.float64) + 1.0
+    sortedValues = values[order]
+    n = sessionCounts.astype(np.float64)
+    sumX = np.bincount(participantIndices, weights = sessionNumbers, minlength = numParticipants)
+    sumY = np.bincount(participantIndices, weights = sortedValues, minlength = numParticipants)
+    sumXX = np.bincount(participantIndices, weights = sessionNumbers * sessionNumbers, minlength = numParticipants)
+    sumXY = np.bincount(participantIndices, weights = sessionNumbers * sortedValues, minlength = numParticipants)
+    denominator = n * sumXX - sumX * sumX
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+      slopes = np.where(denominator > 0, (n * sumXY - sumX * sumY) / denominator, 0.0)
+    intercepts = (sumY - slopes * sumX) / n
+
+    # Cohort statistics at each session
+    percentiles = np.nanpercentile(valueMatrix, self.PERCENTILES, axis = 0)
+    mean = np.nanmean(valueMatrix, axis = 0)
+
+    return {
+      'participantIDs': uniqueParticipantIDs,
+      'sessions': np.arange(1, numSessions + 1, dtype = np.float64),
+      'values': valueMatrix,
+      'movingAverage': movingAverage,
+      'slopes': slopes,
+      'intercepts': intercepts,
+      'percentiles': percentiles,
+      'mean': mean
+    }
+
+  #------------------------------------------------------------------------------
+  #
+  # Plot learning curves
+  #
+  #------------------------------------------------------------------------------
+  def createLearningCurvePlotChart(self, curves, metricName, highlightedParticipantID = ''):
+    """
+    Create plot chart of learning curves. For a single participant, the values, moving average and
+    trend line are displayed. For a cohort, the percentiles of the cohort and the values and moving
+    average of the highlighted participant are displayed.
+    :param curves: learning curves returned by computeLearningCurves (dict)
+    :param metricName: metric name, used as title (string)
+    :param highlightedParticipantID: participant displayed over cohort statistics (string)
+    :return plot chart node (vtkMRMLPlotChartNode)
+    """
+    self.removeNodesFromScene()
+    if curves is None:
+      return None
+
+    # Columns of the table
+    columns = [('Session', curves['sessions'])]
+    participantRows = np.flatnonzero(curves['participantIDs'] == highlightedParticipantID)
+    if len(curves['participantIDs']) == 1:
+      participantRows = np.array([0])
+    else:
+      for percentile, percentileValues in zip(self.PERCENTILES, curves['percentiles']):
+        columns.append(('Percentile {}'.format(percentile), percentileValues))
+    if len(participantRows) > 0:
+      row = participantRows[0]
+      columns.append(('Value', curves['values'][row]))
+      columns.append(('Moving average', curves['movingAverage'][row]))
+      if len(curves['participantIDs']) == 1:
+        columns.append(('Trend', curves['intercepts'][row] + curves['slopes'][row] * curves['sessions']))
+
+    # Table (data is not copied, arrays are kept alive)
+    self.tableNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLTableNode')
+    self.tableNode.SetName('LearningCurves')
+    self.tableNode.SetLocked(True) # lock table to avoid modifications
+    self.tableNode.SetHideFromEditors(True)
+    table = self.tableNode.GetTable()
+    for columnName, columnValues in columns:
+      self.plotArrays[columnName] = np.ascontiguousarray(columnValues, dtype = np.float64)
+      array = numpy_support.numpy_to_vtk(self.plotArrays[columnName], deep = False)
+      array.SetName(columnName)
+      table.AddColumn(array)
+
+    # Plot chart
+    self.plotChartNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLPlotChartNode')
+    self.plotChartNode.SetName('LearningCurveChart')
+    self.plotChartNode.SetTitle(metricName)
+    self.plotChartNode.SetXAxisTitle('Session')
+    self.plotChartNode.SetAxisLabelFontSize(20)
+    self.plotChartNode.GridVisibilityOff()
+
+    # Plot series
+    seriesStyles = {
+      'Percentile 25': ([0.7, 0.7, 0.7], 2, slicer.vtkMRMLPlotSeriesNode.LineStyleDash),
+      'Percentile 50': ([0.4, 0.4, 0.4], 3, slicer.vtkMRMLPlotSeriesNode.LineStyleSolid),
+      'Percentile 75': ([0.7, 0.7, 0.7], 2, slicer.vtkMRMLPlotSeriesNode.LineStyleDash),
+      'Value': ([0.2, 0.4, 0.8], 1, slicer.vtkMRMLPlotSeriesNode.LineStyleNone),
+      'Moving average': ([0.2, 0.4, 0.8], 3, slicer.vtkMRMLPlotSeriesNode.LineStyleSolid),
+      'Trend': ([0.9, 0.4, 0.1], 2, slicer.vtkMRMLPlotSeriesNode.LineStyleDash)
+    }
+    for columnName, columnValues in columns[1:]:
+      color, lineWidth, lineStyle = seriesStyles[columnName]
+      plotSeriesNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLPlotSeriesNode')
+      plotSeriesNode.SetName(columnName)
+      plotSeriesNode.SetAndObserveTableNodeID(self.tableNode.GetID())
+      plotSeriesNode.SetXColumnName('Session')
+      plotSeriesNode.SetYColumnName(columnName)
+      plotSeriesNode.SetPlotType(slicer.vtkMRMLPlotSeriesNode.PlotTypeScatter)
+      plotSeriesNode.SetMarkerStyle(slicer.vtkMRMLPlotSeriesNode.MarkerStyleCircle if columnName == 'Value' else slicer.vtkMRMLPlotSeriesNode.MarkerStyleNone)
+      plotSeriesNode.SetLineStyle(lineStyle)
+      plotSeriesNode.SetLineWidth(lineWidth)
+      plotSeriesNode.SetColor(color)
+      self.plotSeriesNodes.append(plotSeriesNode)
+      self.plotChartNode.AddAndObservePlotSeriesNodeID(plotSeriesNode.GetID())
+    return self.plotChartNode
+
+  #------------------------------------------------------------------------------
+  def removeNodesFromScene(self):
+    """
+    Removes table, plot series and plot chart nodes from Slicer scene.
+    """
+    for plotSeriesNode in self.plotSeriesNodes:
+      slicer.mrmlScene.RemoveNode(plotSeriesNode)
+    self.plotSeriesNodes = list()
+    if self.tableNode:
+      slicer.mrmlScene.RemoveNode(self.tableNode)
+      self.tableNode = None
+    self.plotArrays = dict()
+    if self.plotChartNode:
+      slicer.mrmlScene.RemoveNode(self.plotChartNode)
+      self.plotChartNode = None
@@ -0,0 +1,263 @@
+from __main__ import vtk, qt, slicer
+import logging
+import os
+import json
+import hashlib
+import numpy as np
+
+#------------------------------------------------------------------------------
+#
+# MetricResultsCache
+#
+#------------------------------------------------------------------------------
+class MetricResultsCache():
+  """
+  Stores computed metric results in the recording folder, so that they are reused when a
+  recording is evaluated again.
+
+  Results are stored with a key computed from all the inputs of the metric computation
+  (e.g. tracking data after trimming, calibration, target and metric script files). Cached
+  results are only returned if the key matches, so metrics are recomputed as soon as any
+  input changes.
+
+    - Metrics.npz: real-time metrics, with 'timestamps' and one 'metric_<MetricName>' array
+      per metric.
+    - Metrics.json: keys of the cached results and overall metric table.
+
+  Usage:
+    cache = MetricResultsCache()
+    key = cache.computeKey(timestamps, transforms, targetPosition, cache.hashFiles(scriptFilePaths))
+    timestamps, metrics = cache.loadRealTimeMetrics(recordingDirectory, key)
+    if timestamps is None:
+      ... compute metrics ...
+      cache.saveRealTimeMetrics(recordingDirectory, key, timestamps, metrics)
+  """
+
+  # Files stored in recording folder
+  METRICS_ARRAY_FILE_NAME = 'Metrics.npz'
+  METRICS_INFO_FILE_NAME = 'Metrics.json'
+
+  #------------------------------------------------------------------------------
+  def computeKey(self, *inputs):
+    """
+    Compute key from the inputs of a metric computation.
+    :param inputs: numpy arrays, dicts or lists of arrays, strings or numbers
+    :return key (string)
+    """
+    sha1 = hashlib.sha1()
+    for inputValue in inputs:
+      self.updateHash(sha1, inputValue)
+    return sha1.hexdigest()
+
+  #------------------------------------------------------------------------------
+  def updateHash(self, sha1, inputValue):
+    if isinstance(inputValue, dict):
+      for key in sorted(inputValue.keys()):
+        self.updateHash(sha1, key)
+        self.updateHash(sha1, inputValue[key])
+    elif isinstance(inputValue, (list, tuple)):
+      sha1.update('list{}'.format(len(inputValue)).encode())
+      for item in inputValue:
+        self.updateHash(sha1, item)
+    elif isinstance(inputValue, np.ndarray):
+      array = np.ascontiguousarray(inputValue)
+      sha1.update('{}{}'.format(array.dtype.str, array.shape).encode())
+      sha1.update(array.tobytes())
+    else:
+      sha1.update(repr(inputValue).encode())
+
+  #------------------------------------------------------------------------------
+  def hashFiles(self, filePaths):
+    """
+    Compute hash of the contents of several files, e.g. metric scripts.
+    :param filePaths: file paths (list)
+    :return hash (string)
+    """
+    sha1 = hashlib.sha1()
+    for filePath in filePaths:
+      sha1.update(os.path.basename(filePath).encode())
+      try:
+        with open(filePath, 'rb') as inputFile:
+          sha1.update(inputFile.read())
+      except OSError:
+        logging.error('Cannot read file to compute metric results key: ' + filePath)
+    return sha1.hexdigest()
+
+  #------------------------------------------------------------------------------
+  #
+  # Real-time metrics
+  #
+  #------------------------------------------------------------------------------
+  def loadRealTimeMetrics(self, recordingDirectory, key):
+    """
+    Load cached real-time metrics.
+    :param recordingDirectory: recording folder, None if recording is not saved (string)
+    :param key: key of the metric computation inputs (string)
+    :return timestamps (numpy array) and metric values for each metric name (dict), or None if not cached
+    """
+    if (recordingDirectory is None) or (self.readInfoFile(recordingDirectory).get('realTime', {}).get('key') != key):
+      return None, None
+    timestamps, metrics = self.readMetricArrays(os.path.join(recordingDirectory, self.METRICS_ARRAY_FILE_NAME))
+    if timestamps is None:
+      return None, None
+    logging.debug('MetricResultsCache: real-time metrics loaded from ' + recordingDirectory)
+    return timestamps, metrics
+
+  #------------------------------------------------------------------------------
+  def saveRealTimeMetrics(self, recordingDirectory, key, timestamps, metrics):
+    """
+    Save real-time metrics to cache.
+    :param recordingDirectory: recording folder, None if recording is not saved (string)
+    :param key: key of the metric computation inputs (string)
+    :param timestamps: sample timestamps (list or numpy array)
+    :param metrics: metric values for each metric name (dict)
+    """
+    if recordingDirectory is None:
+      return
+    if not self.writeMetricArrays(os.path.join(recordingDirectory, self.METRICS_ARRAY_FILE_NAME), timestamps, metrics):
+      return
+    metricsInfo = self.readInfoFile(recordingDirectory)
+    metricsInfo['realTime'] = {'key': key, 'metrics': list(metrics.keys())}
+    self.writeInfoFile(recordingDirectory, metricsInfo)
+
+  #------------------------------------------------------------------------------
+  def readMetricArrays(self, filePath):
+    """
+    Read real-time metrics from NPZ file.
+    :param filePath: path to metrics file (string)
+    :return timestamps (numpy array) and metric values for each metric name (dict)
+    """
+    timestamps = None
+    metrics = dict()
+    if not os.path.exists(filePath):
+      return timestamps, metrics
+    try:
+      with np.load(filePath) as inputFile:
+        timestamps = inputFile['timestamps']
+        for arrayName in inputFile.files:
+          if arrayName.startswith('metric_'):
+            metrics[arrayName[len('metric_'):]] = inputFile[arrayName]
+    except:
+      logging.error('Cannot read metrics file at ' + filePath)
+    return timestamps, metrics
+
+  #------------------------------------------------------------------------------
+  def writeMetricArrays(self, filePath, timestamps, metrics):
+    """
+    Write real-time metrics to NPZ file.
+    :param filePath: path to metrics file (string)
+    :param timestamps: sample timestamps (list or numpy array)
+    :param metrics: metric values for each metric name (dict)
+    :return True on success, False otherwise (bool)
+    """
+    arrays = {'timestamps': np.asarray(timestamps, dtype = np.float64)}
+    for metricName, metricValues in metrics.items():
+      arrays['metric_' + metricName] = np.asarray(metricValues, dtype = np.float64)
+    try:
+      np.savez_compressed(filePath, **arrays)
+    except:
+      logging.error('Cannot write metrics file at ' + filePath)
+      return False
+    return True
+
+  #------------------------------------------------------------------------------
+  #
+  # Overall metrics
+  #
+  #------------------------------------------------------------------------------
+  def loadOverallMetrics(self, recordingDirectory, key):
+    """
+    Load cached overall metric table.
+    :param recordingDirectory: recording folder, None if recording is not saved (string)
+    :param key: key of the metric computation inputs (string)
+    :return column names (list) and rows (list of lists), or None if not cached
+    """
+    if recordingDirectory is None:
+      return None, None
+    overallMetrics = self.readInfoFile(recordingDirectory).get('overall', {})
+    if overallMetrics.get('key') != key:
+      return None, None
+    logging.debug('MetricResultsCache: overall metrics loaded from ' + recordingDirectory)
+    return overallMetrics['columns'], overallMetrics['rows']
+
+  #------------------------------------------------------------------------------
+  def saveOverallMetrics(self, recordingDirectory, key, columnNames, rows):
+    """
+    Save overall metric table to cache.
+    :param recordingDirectory: recording folder, None if recording is not saved (string)
+    :param key: key of the metric computation inputs (string)
+    :param columnNames: column names (list)
+    :param rows: values of each row as strings (list of lists)
+    """
+    if recordingDirectory is None:
+      return
+    metricsInfo = self.readInfoFile(recordingDirectory)
+    metricsInfo['overall'] = {'key': key, 'columns': columnNames, 'rows': rows}
+    self.writeInfoFile(recordingDirectory, metricsInfo)
+
+  #------------------------------------------------------------------------------
+  def getTableContents(self, tableNode):
+    """
+    Get contents of table node as strings.
+    :param tableNode: table node (vtkMRMLTableNode)
+    :return column names (list) and rows (list of lists)
+    """
+    table = tableNode.GetTable()
+    columnNames = [table.GetColumnName(columnID) for columnID in range(table.GetNumberOfColumns())]
+    rows = list()
+    for rowID in range(table.GetNumberOfRows()):
+      rows.append([table.GetValue(rowID, columnID).ToString() for columnID in range(table.GetNumberOfColumns())])
+    return columnNames, rows
+
+  #------------------------------------------------------------------------------
+  def setTableContents(self, tableNode, columnNames, rows):
+    """
+    Fill table node with string columns.
+    :param tableNode: table node (vtkMRMLTableNode)
+    :param columnNames: column names (list)
+    :param rows: values of each row as strings (list of lists)
+    """
+    tableNode.RemoveAllColumns()
+    table = tableNode.GetTable()
+    for columnID, columnName in enumerate(columnNames):
+      array = vtk.vtkStringArray()
+      array.SetName(columnName)
+      for row in rows:
+        array.InsertNextValue(row[columnID])
+      table.AddColumn(array)
+    tableNode.Modified()
+
+  #------------------------------------------------------------------------------
+  #
+  # Info file
+  #
+  #------------------------------------------------------------------------------
+  def readInfoFile(self, recordingDirectory):
+    """
+    Read keys and overall metrics from JSON file.
+    :param recordingDirectory: recording folder (string)
+    :return metrics info, empty if file does not exist (dict)
+    """
+    filePath = os.path.join(recordingDirectory, self.METRICS_INFO_FILE_NAME)
+    if not os.path.exists(filePath):
+      return dict()
+    try:
+      with open(filePath, 'r') as inputFile:
+        return json.load(inputFile)
+    except:
+      logging.error('Cannot read metrics info file at ' + filePath)
+      return dict()
+
+  #------------------------------------------------------------------------------
+  def writeInfoFile(self, recordingDirectory, metricsInfo):
+    """
+    Write keys and overall metrics to JSON file.
+    :param recordingDirectory: recording folder (string)
+    :param metricsInfo: metrics info (dict)
+    """
+    filePath = os.path.join(recordingDirectory, self.METRICS_INFO_FILE_NAME)
+    try:
+      with open(filePath, 'w') as outputFile:
+        json.dump(metricsInfo, outputFile, indent = 4)
+    except:
+      logging.error('Cannot write metrics info file at ' + filePath)
@@ -0,0 +1,160 @@
+from __main__ import vtk, qt, slicer
+import logging
+import math
+
+#------------------------------------------------------------------------------
+#
+# ModelLevelOfDetailSwitcher
+#
+#------------------------------------------------------------------------------
+class ModelLevelOfDetailSwitcher():
+  """
+  Switches the mesh of model nodes between full resolution and decimated levels of detail,
+  depending on the size of the model in the 3D views. The size is estimated from the bounds of
+  the model and the distance to the camera of each visible 3D view, and the most detailed level
+  required by any view is used. Levels are updated when cameras move and when models are moved
+  by their parent transform (e.g. tracked probe).
+
+  Only models whose mesh is not used for computations (e.g. collision detection) should be added,
+  since the mesh of the node is replaced by the decimated one.
+
+  Usage:
+    switcher = ModelLevelOfDetailSwitcher()
+    switcher.addModel(modelNode, assetCache.getModelLevelsOfDetail(modelFilePath))
+    switcher.removeAllModels()
+  """
+
+  # Minimum size of the model in the view (fraction of view height) to use each level, most detailed first
+  SCREEN_SIZE_THRESHOLDS = [0.3, 0.1]
+
+  #------------------------------------------------------------------------------
+  def __init__(self):
+    # Models: [model node, meshes (full resolution first), current level, transform observer ID]
+    self.models = list()
+
+    # Observers of camera nodes and of the scene
+    self.cameraObserverIDs = dict() # camera node -> observer ID
+    self.sceneObserverID = None
+
+  #------------------------------------------------------------------------------
+  def addModel(self, modelNode, levelsOfDetail):
+    """
+    Switch level of detail of a model. The current mesh of the model is used as full resolution.
+    :param modelNode: model node, ignored if None (vtkMRMLModelNode)
+    :param levelsOfDetail: decimated meshes, most detailed first (list of vtkPolyData)
+    """
+    if (modelNode is None) or (modelNode.GetPolyData() is None) or (not levelsOfDetail):
+      return
+    observerID = modelNode.AddObserver(slicer.vtkMRMLTransformableNode.TransformModifiedEvent, self.onModelTransformModified)
+    self.models.append([modelNode, [modelNode.GetPolyData()] + list(levelsOfDetail), 0, observerID])
+    if self.sceneObserverID is None:
+      self.observeCameras()
+    self.updateLevelsOfDetail()
+
+  #------------------------------------------------------------------------------
+  def removeAllModels(self):
+    """
+    Restore full resolution meshes and stop observing cameras, e.g. when exercise data is deleted.
+    """
+    for modelNode, meshes, level, observerID in self.models:
+      modelNode.RemoveObserver(observerID)
+      if level != 0:
+        modelNode.SetAndObservePolyData(meshes[0])
+    self.models = list()
+    for cameraNode, observerID in self.cameraObserverIDs.items():
+      cameraNode.RemoveObserver(observerID)
+    self.cameraObserverIDs = dict()
+    if self.sceneObserverID is not None:
+      slicer.mrmlScene.RemoveObserver(self.sceneObserverID)
+      self.sceneObserverID = None
+
+  #------------------------------------------------------------------------------
+  def observeCameras(self):
+    for cameraNode in slicer.util.getNodesByClass('vtkMRMLCameraNode'):
+      self.observeCamera(cameraNode)
+    # Cameras of 3D views created later, e.g. when the layout changes
+    self.sceneObserverID = slicer.mrmlScene.AddObserver(slicer.vtkMRMLScene.NodeAddedEvent, self.onNodeAdded)
+
+  #------------------------------------------------------------------------------
+  def observeCamera(self, cameraNode):
+    if cameraNode not in self.cameraObserverIDs:
+      self.cameraObserverIDs[cameraNode] = cameraNode.AddObserver(vtk.vtkCommand.ModifiedEvent, self.onCameraModified)
+
+  #------------------------------------------------------------------------------
+  @vtk.calldata_type(vtk.VTK_OBJECT)
+  def onNodeAdded(self, caller, event, node):
+    if node.IsA('vtkMRMLCameraNode'):
+      self.observeCamera(node)
+
+  #------------------------------------------------------------------------------
+  def onCameraModified(self, caller, event):
+    self.updateLevelsOfDetail()
+
+  #------------------------------------------------------------------------------
+  def onModelTransformModified(self, caller, event):
+    self.updateLevelsOfDetail()
+
+  #------------------------------------------------------------------------------
+  def updateLevelsOfDetail(self):
+    """
+    Set the level of detail of each model from its size in the visible 3D views.
+    """
+    cameras = self.getVisibleCameras()
+    for model in self.models:
+      modelNode, meshes, currentLevel, observerID = model
+      level = self.getLevelOfDetail(modelNode, cameras, len(meshes) - 1)
+      if level != currentLevel:
+        modelNode.SetAndObservePolyData(meshes[level])
+        model[2] = level
+
+  #------------------------------------------------------------------------------
+  def getVisibleCameras(self):
+    """
+    Get cameras of the 3D views displayed in the layout.
+    :return cameras (list of vtkCamera)
+    """
+    cameras = list()
+    camerasLogic = slicer.modules.cameras.logic()
+    for viewNode in slicer.util.getNodesByClass('vtkMRMLViewNode'):
+      if not viewNode.IsMappedInLayout():
+        continue
+      cameraNode = camerasLogic.GetViewActiveCameraNode(viewNode)
+      if cameraNode:
+        cameras.append(cameraNode.GetCamera())
+    return cameras
+
+  #------------------------------------------------------------------------------
+  def getLevelOfDetail(self, modelNode, cameras, maxLevel):
+    """
+    Get level of detail of a model: the most detailed level required by any of the cameras.
+    :param modelNode: model node (vtkMRMLModelNode)
+    :param cameras: cameras of visible 3D views (list of vtkCamera)
+    :param maxLevel: least detailed level available (int)
+    :return level, 0 for full resolution (int)
+    """
+    bounds = [0.0] * 6
+    modelNode.GetRASBounds(bounds)
+    if (not cameras) or (bounds[0] > bounds[1]):
+      return 0
+    center = [(bounds[0] + bounds[1]) / 2.0, (bounds[2] + bounds[3]) / 2.0, (bounds[4] + bounds[5]) / 2.0]
+    diameter = math.sqrt((bounds[1] - bounds[0]) ** 2 + (bounds[3] - bounds[2]) ** 2 + (bounds[5] - bounds[4]) ** 2)
+
+    # Largest size of the model in the views
+    screenSize = 0.0
+    for camera in cameras:
+      if camera.GetParallelProjection():
+        viewHeight = 2.0 * camera.GetParallelScale()
+      else:
+        distance = math.sqrt(vtk.vtkMath.Distance2BetweenPoints(camera.GetPosition(), center))
+        if distance <= diameter / 2.0:
+          return 0 # camera inside or close to the model
+        viewHeight = 2.0 * distance * math.tan(math.radians(camera.GetViewAngle()) / 2.0)
+      if viewHeight > 0.0:
+        screenSize = max(screenSize, diameter / viewHeight)
+
+    # Number of thresholds the size is below
+    level = 0
+    for threshold in self.SCREEN_SIZE_THRESHOLDS:
+      if screenSize < threshold:
+        level += 1
+    return min(level, maxLevel)
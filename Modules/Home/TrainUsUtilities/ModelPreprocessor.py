@@ -0,0 +1,143 @@
+from __main__ import vtk, qt, slicer
+import logging
+import os
+import hashlib
+
+#------------------------------------------------------------------------------
+#
+# ModelPreprocessor
+#
+#------------------------------------------------------------------------------
+class ModelPreprocessor():
+  """
+  Converts STL models to compressed VTP files with precomputed normals, plus decimated levels of
+  detail, so that models are only parsed, merged and processed once.
+
+  Preprocessed files are written to a cache folder and are regenerated when the STL file is
+  newer. Points are converted from the LPS coordinate system of STL files to RAS, so that
+  preprocessed models can be read directly into model nodes without coordinate conversion.
+
+  Usage:
+    modelPreprocessor = ModelPreprocessor()
+    filePaths = modelPreprocessor.getPreprocessedModelFilePaths(stlFilePath) # full resolution first
+    polyData = modelPreprocessor.readPolyData(filePaths[0])
+  """
+
+  # Target reduction of the number of triangles of each level of detail
+  LEVEL_OF_DETAIL_REDUCTIONS = [0.6, 0.9]
+
+  #------------------------------------------------------------------------------
+  def __init__(self, cacheDirectory = None):
+    # Folder of preprocessed models
+    if cacheDirectory is None:
+      cacheDirectory = os.path.join(slicer.app.cachePath, 'TrainUS', 'Models')
+    self.cacheDirectory = cacheDirectory
+
+  #------------------------------------------------------------------------------
+  def getPreprocessedModelFilePaths(self, modelFilePath):
+    """
+    Get preprocessed files of a model, preprocessing the model if the files are missing or outdated.
+    :param modelFilePath: path to STL file (string)
+    :return paths to VTP files, full resolution first followed by levels of detail (list)
+    """
+    filePaths = self.getCacheFilePaths(modelFilePath)
+    modelModifiedTime = os.path.getmtime(modelFilePath)
+    if not all(os.path.exists(filePath) and (os.path.getmtime(filePath) >= modelModifiedTime) for filePath in filePaths):
+      self.preprocessModel(modelFilePath, filePaths)
+    return filePaths
+
+  #------------------------------------------------------------------------------
+  def getCacheFilePaths(self, modelFilePath):
+    """
+    Get paths of the preprocessed files of a model. Models with the same name in different folders
+    (e.g. probe model of each exercise) are distinguished by a hash of their path.
+    :param modelFilePath: path to STL file (string)
+    :return paths to VTP files, full resolution first followed by levels of detail (list)
+    """
+    modelFilePath = os.path.normpath(os.path.abspath(modelFilePath))
+    modelName = os.path.splitext(os.path.basename(modelFilePath))[0]
+    pathHash = hashlib.md5(modelFilePath.encode('utf-8')).hexdigest()[:8]
+    baseFilePath = os.path.join(self.cacheDirectory, '{}_{}'.format(modelName, pathHash))
+    filePaths = [baseFilePath + '.vtp']
+    for level in range(1, len(self.LEVEL_OF_DETAIL_REDUCTIONS) + 1):
+      filePaths.append('{}_LOD{}.vtp'.format(baseFilePath, level))
+    return filePaths
+
+  #------------------------------------------------------------------------------
+  def preprocessModel(self, modelFilePath, outputFilePaths):
+    """
+    Convert STL model to VTP files with normals: full resolution and levels of detail.
+    :param modelFilePath: path to STL file (string)
+    :param outputFilePaths: paths to VTP files, full resolution first followed by levels of detail (list)
+    """
+    logging.info('Preprocessing model: ' + modelFilePath)
+    if not os.path.exists(self.cacheDirectory):
+      os.makedirs(self.cacheDirectory)
+
+    # Read STL file
+    reader = vtk.vtkSTLReader()
+    reader.SetFileName(modelFilePath)
+    reader.Update()
+    if reader.GetOutput().GetNumberOfPoints() == 0:
+      raise RuntimeError('Model file could not be read: ' + modelFilePath)
+
+    # Merge points and convert from LPS to RAS
+    cleanFilter = vtk.vtkCleanPolyData()
+    cleanFilter.SetInputConnection(reader.GetOutputPort())
+    lpsToRas = vtk.vtkTransform()
+    lpsToRas.Scale(-1.0, -1.0, 1.0)
+    transformFilter = vtk.vtkTransformPolyDataFilter()
+    transformFilter.SetTransform(lpsToRas)
+    transformFilter.SetInputConnection(cleanFilter.GetOutputPort())
+    triangleFilter = vtk.vtkTriangleFilter()
+    triangleFilter.SetInputConnection(transformFilter.GetOutputPort())
+    triangleFilter.Update()
+    polyData = triangleFilter.GetOutput()
+
+    # Full resolution
+    self.writePolyData(self.computeNormals(polyData), outputFilePaths[0])
+
+    # Levels of detail
+    for reduction, outputFilePath in zip(self.LEVEL_OF_DETAIL_REDUCTIONS, outputFilePaths[1:]):
+      decimation = vtk.vtkQuadricDecimation()
+      decimation.SetInputData(polyData)
+      decimation.SetTargetReduction(reduction)
+      decimation.VolumePreservationOn()
+      decimation.Update()
+      self.writePolyData(self.computeNormals(decimation.GetOutput()), outputFilePath)
+
+  #------------------------------------------------------------------------------
+  def computeNormals(self, polyData):
+    normalsFilter = vtk.vtkPolyDataNormals()
+    normalsFilter.SetInputData(polyData)
+    normalsFilter.ComputePointNormalsOn()
+    normalsFilter.SplittingOff()
+    normalsFilter.Update()
+    return normalsFilter.GetOutput()
+
+  #------------------------------------------------------------------------------
+  def writePolyData(self, polyData, filePath):
+    writer = vtk.vtkXMLPolyDataWriter()
+    writer.SetFileName(filePath)
+    writer.SetInputData(polyData)
+    writer.SetDataModeToAppended()
+    writer.EncodeAppendedDataOff()
+    writer.SetCompressorTypeToZLib()
+    if not writer.Write():
+      raise RuntimeError('Preprocessed model could not be written: ' + filePath)
+
+  #------------------------------------------------------------------------------
+  def readPolyData(self, filePath):
+    """
+    Read preprocessed model file.
+    :param filePath: path to VTP file (string)
+    :return model (vtkPolyData)
+    """
+    reader = vtk.vtkXMLPolyDataReader()
+    reader.SetFileName(filePath)
+    reader.Update()
+    if reader.GetOutput().GetNumberOfPoints() == 0:
+      raise RuntimeError('Preprocessed model could not be read: ' + filePath)
+    polyData = vtk.vtkPolyData()
+    polyData.ShallowCopy(reader.GetOutput())
+    return polyData
@@ -0,0 +1,138 @@
+from __main__ import vtk, qt, slicer
+import logging
+import unicodedata
+
+#------------------------------------------------------------------------------
+#
+# ParticipantSearchIndex
+#
+#------------------------------------------------------------------------------
+class ParticipantSearchIndex():
+  """
+  N-gram index of participants for instant search by name, surname, email and ID.
+
+  Text is normalized by removing accents and case (e.g. 'José' matches 'jose'). Every
+  substring of up to three characters of the normalized text is indexed, so that
+  short queries are answered with a single lookup and longer queries by intersecting
+  the participants of their trigrams and verifying the candidates. The index is built
+  once and updated when participants are added, modified or removed.
+
+  Usage:
+    index = ParticipantSearchIndex()
+    index.build(participantInfo_list)
+    participantID_set = index.search('jose garc')
+  """
+
+  # Participant info fields included in the index
+  SEARCH_FIELDS = ['name', 'surname', 'email', 'id']
+
+  # Maximum length of indexed substrings
+  MAX_NGRAM_LENGTH = 3
+
+  #------------------------------------------------------------------------------
+  def __init__(self):
+    self.searchText_dict = dict() # normalized text of each participant ID
+    self.ngramIndex = dict() # participant IDs containing each n-gram
+    self.isBuilt = False
+
+  #------------------------------------------------------------------------------
+  def normalizeText(self, text):
+    """
+    Remove accents and case from text.
+    :param text: input text (string)
+    :return normalized text (string)
+    """
+    decomposedText = unicodedata.normalize('NFKD', text)
+    return ''.join(character for character in decomposedText if not unicodedata.combining(character)).casefold()
+
+  #------------------------------------------------------------------------------
+  def getNgrams(self, text):
+    """
+    Get all substrings of text with length up to MAX_NGRAM_LENGTH.
+    :param text: normalized text (string)
+    :return n-grams (set)
+    """
+    ngrams = set()
+    for length in range(1, self.MAX_NGRAM_LENGTH + 1):
+      for start in range(len(text) - length + 1):
+        ngrams.add(text[start:start + length])
+    return ngrams
+
+  #------------------------------------------------------------------------------
+  def build(self, participantInfo_list):
+    """
+    Build index from the list of all participants.
+    :param participantInfo_list: participant info (list)
+    """
+    self.clear()
+    for participantInfo in participantInfo_list:
+      self.addParticipant(participantInfo)
+    self.isBuilt = True
+
+  #------------------------------------------------------------------------------
+  def clear(self):
+    self.searchText_dict = dict()
+    self.ngramIndex = dict()
+    self.isBuilt = False
+
+  #------------------------------------------------------------------------------
+  def addParticipant(self, participantInfo):
+    """
+    Add participant to the index, replacing previous entry if any.
+    :param participantInfo: participant info (dict)
+    """
+    participantID = participantInfo['id']
+    self.removeParticipant(participantID)
+    fields = [str(participantInfo.get(field, '')) for field in self.SEARCH_FIELDS]
+    searchText = self.normalizeText(' '.join(fields))
+    self.searchText_dict[participantID] = searchText
+    for ngram in self.getNgrams(searchText):
+      self.ngramIndex.setdefault(ngram, set()).add(participantID)
+
+  #------------------------------------------------------------------------------
+  def removeParticipant(self, participantID):
+    """
+    Remove participant from the index.
+    :param participantID: participant ID (string)
+    """
+    searchText = self.searchText_dict.pop(participantID, None)
+    if searchText is None:
+      return
+    for ngram in self.getNgrams(searchText):
+      participantID_set = self.ngramIndex.get(ngram)
+      if participantID_set is not None:
+        participantID_set.discard(participantID)
+        if not participantID_set:
+          del self.ngramIndex[ngram]
+
+  #------------------------------------------------------------------------------
+  def search(self, searchText):
+    """
+    Get participants matching all words of the search text.
+    :param searchText: search text (string)
+    :return IDs of matching participants (set)
+    """
+    words = self.normalizeText(searchText).split()
+    if not words:
+      return set(self.searchText_dict.keys())
+
+    # Candidates from index, rarest n-grams first
+    wordNgrams = list()
+    for word in words:
+      if len(word) <= self.MAX_NGRAM_LENGTH:
+        wordNgrams.append(word)
+      else:
+        wordNgrams.extend(word[start:start + self.MAX_NGRAM_LENGTH] for start in range(len(word) - self.MAX_NGRAM_LENGTH + 1))
+    participantID_sets = [self.ngramIndex.get(ngram, set()) for ngram in set(wordNgrams)]
+    participantID_sets.sort(key = len)
+    candidates = set(participantID_sets[0])
+    for participantID_set in participantID_sets[1:]:
+      if not candidates:
+        break
+      candidates &= participantID_set
+
+    # Verify candidates for words longer than n-grams
+    longWords = [word for word in words if len(word) > self.MAX_NGRAM_LENGTH]
+    if longWords:
+      candidates = set(participantID for participantID in candidates if all(word in self.searchText_dict[participantID] for word in longWords))
+    return candidates
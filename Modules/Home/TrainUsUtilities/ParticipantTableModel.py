@@ -0,0 +1,21 @@
+from __main__ import vtk, qt, slicer
+import logging
+from .InfoTableModel import InfoTableModel
+
+#------------------------------------------------------------------------------
+#
+# ParticipantTableModel
+#
+#------------------------------------------------------------------------------
+class ParticipantTableModel(InfoTableModel):
+  """
+  Table model of participants, see InfoTableModel.
+  """
+
+  # Participant info key displayed in each column
+  COLUMN_KEYS = ['id', 'name', 'surname', 'birthdate', 'email']
+
+  #------------------------------------------------------------------------------
+  def __init__(self, parent = None):
+    InfoTableModel.__init__(self, parent)
+    self.headerLabels = ['ID', 'Name', 'Surname', 'Birth Date', 'Email']
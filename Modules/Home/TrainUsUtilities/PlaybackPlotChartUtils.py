@@ -1,6 +1,8 @@
-from __main__ import vtk, slicer
+from __main__ import vtk, qt, slicer
 import logging
+import numpy as np
 from itertools import groupby
+from vtk.util import numpy_support
 
 #------------------------------------------------------------------------------
 #
@@ -42,6 +44,19 @@ class PlaybackPlotChartUtils:
 
       - Update cursor position for each new sample in the recording:
           >> myPlaybackPlotChartUtils.updateCursorPosition(currentTimestamp)
+
+      - Or, during playback, schedule the update so that it is limited to the display refresh
+        rate and skipped when the plot is not visible. The timestamp is only read when the
+        cursor is actually updated:
+          >> myPlaybackPlotChartUtils.scheduleCursorUpdate(getCurrentTimestampFunction)
+
+  (**) To compare a metric across several recordings, register the metric data of each recording
+       and create an overlay plot chart, aligning recordings by normalized time or by dynamic
+       time warping (DTW) with respect to the first registered recording:
+
+          >> myPlaybackPlotChartUtils.addOverlayRecording('R00001', timestampValues, {'Angle': angleValues})
+          >> myPlaybackPlotChartUtils.addOverlayRecording('R00002', otherTimestampValues, {'Angle': otherAngleValues})
+          >> myPlaybackPlotChartUtils.createOverlayPlotChart('Angle', alignment = 'dtw')
   """
 
   #------------------------------------------------------------------------------
@@ -49,8 +64,8 @@ class PlaybackPlotChartUtils:
     # Dictionary to store metric values
     self.metricData_dict = {}
 
-    # List to store timestamp values
-    self.metricTimestamps_list = {}
+    # Array to store timestamp values
+    self.metricTimestamps_list = np.array([])
 
     # List to store metric names
     self.metricNames_list = []
@@ -59,16 +74,46 @@ class PlaybackPlotChartUtils:
     self.metricTableNode = None
     self.cursorTableNode = None  
 
+    # NumPy arrays referenced by metric table columns (must be kept alive, data is not copied)
+    self.metricTableArrays = []
+
     # Plot series nodes
     self.metricPlotSeries_dict = {}
     self.cursorPlotSeries_dict = {}
 
     # Plot chart node
     self.plotChartNode = None
+    self.selectedMetricName = None
+
+    # Level of detail: min/max pyramid, decimated table and arrays for each metric
+    self.metricPyramid_dict = {}
+    self.metricLODTableNode_dict = {}
+    self.metricLODArrays_dict = {}
+    self.metricLODIndices_dict = {}
+
+    # Overlay of several recordings: metric data, table and plot series nodes
+    self.overlayData_dict = {}
+    self.overlayTableNode_dict = {}
+    self.overlayArrays_dict = {}
+    self.overlayPlotSeries_dict = {}
+    self.overlayPlotChartNode = None
+    self.overlayNumSamples = 200
+    self.overlayColors = [[1,0,0], [0,0,1], [0,0.6,0], [1,0.5,0], [0.6,0,0.8], [0,0.7,0.7], [0.6,0.4,0.2], [1,0,0.6], [0.4,0.4,0.4], [0.7,0.7,0]]
+
+    # Plot view used to get visible range (refined on zoom)
+    self.plotView = None
+    self.defaultPlotViewWidth = 1000
 
     # Cursor
     self.cursorEnabled = False
 
+    # Coalesced cursor updates (at most one update per display refresh)
+    self.cursorTimestampGetter = None
+    self.cursorUpdateTimer = qt.QTimer()
+    self.cursorUpdateTimer.setSingleShot(True)
+    self.cursorUpdateTimer.setInterval(16)
+    self.cursorUpdateTimer.connect('timeout()', self.onCursorUpdateTimerTimeout)
+
   #------------------------------------------------------------------------------
   def getPlotChart(self):
     return self.plotChartNode
@@ -78,10 +123,11 @@ class PlaybackPlotChartUtils:
     """
     Register new metric to be displayed in plot chart.    
     :param metricName: metric name (string)
-    :param metricValues: list of metric values (list)
+    :param metricValues: metric values (list or numpy array)
     """
-    # Add new metric to dictionary
-    self.metricData_dict[metricName] = list(metricValues)
+    # Add new metric to dictionary (NumPy arrays of type float64 are not copied)
+    self.metricData_dict[metricName] = np.asarray(metricValues, dtype = np.float64)
+    self.metricPyramid_dict.pop(metricName, None)
 
     # Update list of metric names
     self.metricNames_list = self.getListOfMetrics()
@@ -90,11 +136,10 @@ class PlaybackPlotChartUtils:
   def addMetricTimestamps(self, timestampValues):
     """
     Register timestamps corresponding to metric values.    
-    :param timestampValues: list of timestamps (list)
+    :param timestampValues: timestamps (list or numpy array)
     """
-    # Update list of metric timestamps
-    self.metricTimestamps_list.clear() # delete content
-    self.metricTimestamps_list = list(timestampValues)
+    # Update metric timestamps
+    self.metricTimestamps_list = np.asarray(timestampValues, dtype = np.float64)
 
   #------------------------------------------------------------------------------
   def getListOfMetrics(self):
@@ -126,9 +171,6 @@ class PlaybackPlotChartUtils:
 
   #------------------------------------------------------------------------------
   def createMetricTable(self):
-    # Get number of metrics
-    numMetrics = len(self.metricNames_list)
-
     # Get number of samples in recording
     numSamples = self.getNumberOfSamples()
 
@@ -146,26 +188,15 @@ class PlaybackPlotChartUtils:
     # Get table from node
     table = self.metricTableNode.GetTable()    
 
-    # Add one column for timestamp and one column for each metric
-    array = vtk.vtkFloatArray()
-    array.SetName('timestamp')
-    table.AddColumn(array)
+    # Add one column for timestamp and one column for each metric. Columns share memory with
+    # the NumPy arrays, which are stored to keep them alive while the table exists.
+    self.metricTableArrays = [np.ascontiguousarray(self.metricTimestamps_list[:numSamples])]
     for metricName in self.metricNames_list:
-      array = vtk.vtkFloatArray()
-      array.SetName(metricName)
+      self.metricTableArrays.append(np.ascontiguousarray(self.metricData_dict[metricName]))
+    for columnName, columnValues in zip(['timestamp'] + self.metricNames_list, self.metricTableArrays):
+      array = numpy_support.numpy_to_vtk(columnValues, deep = False)
+      array.SetName(columnName)
       table.AddColumn(array)
-
-    # Fill table
-    table.SetNumberOfRows(numSamples)
-    ## Add timestamps
-    timestampValues = self.metricTimestamps_list
-    for sampleID in range(numSamples):
-      table.SetValue(sampleID, 0, timestampValues[sampleID])
-    ## Add metric values
-    for metricID in range(numMetrics):
-      metricValues = self.metricData_dict[self.metricNames_list[metricID]]
-      for sampleID in range(numSamples):
-        table.SetValue(sampleID, metricID+1, metricValues[sampleID])
     table.Modified()
 
   #------------------------------------------------------------------------------
@@ -200,11 +231,11 @@ class PlaybackPlotChartUtils:
     table.SetNumberOfRows(1)
     ## Add minimum timestamp value
     timestampValues = self.metricTimestamps_list
-    table.SetValue(0, 0, min(timestampValues[:]))
+    table.SetValue(0, 0, np.min(timestampValues))
     ## Add metric values
     for metricID in range(numMetrics):
       metricValues = self.metricData_dict[self.metricNames_list[metricID]]
-      table.SetValue(0, metricID+1, max(metricValues[:]))
+      table.SetValue(0, metricID+1, np.max(metricValues))
     table.Modified()
 
   #------------------------------------------------------------------------------
@@ -219,13 +250,14 @@ class PlaybackPlotChartUtils:
       for key in self.metricPlotSeries_dict.keys():
         slicer.mrmlScene.RemoveNode(self.metricPlotSeries_dict[key])
       self.metricPlotSeries_dict = {}
+    self.removeMetricLODTables()
 
     # Create plot series
     self.metricPlotSeries_dict = {}
     for metricName in self.metricNames_list:
       plotSeriesNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLPlotSeriesNode')
       plotSeriesNode.SetName(metricName)
-      plotSeriesNode.SetAndObserveTableNodeID(self.metricTableNode.GetID())
+      plotSeriesNode.SetAndObserveTableNodeID(self.createMetricLODTable(metricName).GetID())
       plotSeriesNode.SetXColumnName('timestamp')
       plotSeriesNode.SetYColumnName(metricName)
       plotSeriesNode.SetPlotType(slicer.vtkMRMLPlotSeriesNode.PlotTypeScatter)
@@ -274,7 +306,7 @@ class PlaybackPlotChartUtils:
       return
 
     # Ensure timestamp data is available
-    if not self.metricTimestamps_list:
+    if len(self.metricTimestamps_list) == 0:
       logging.error('No timestamp data. Plot chart will not be created.')
       return
 
@@ -317,6 +349,10 @@ class PlaybackPlotChartUtils:
     self.plotChartNode.AddAndObservePlotSeriesNodeID(self.metricPlotSeries_dict[firstMetricName].GetID())
     if self.cursorEnabled:
       self.plotChartNode.AddAndObservePlotSeriesNodeID(self.cursorPlotSeries_dict[firstMetricName].GetID())
+    self.selectedMetricName = firstMetricName
+
+    # Refine plotted points when plot view is zoomed
+    self.connectPlotView()
 
   #------------------------------------------------------------------------------
   def updatePlotChart(self, selectedMetricName):
@@ -330,6 +366,12 @@ class PlaybackPlotChartUtils:
       if self.cursorEnabled:
         self.plotChartNode.AddAndObservePlotSeriesNodeID(self.cursorPlotSeries_dict[selectedMetricName].GetID())
       self.plotChartNode.SetTitle(selectedMetricName)
+      self.selectedMetricName = selectedMetricName
+      self.connectPlotView()
+      self.updateMetricLODTable(selectedMetricName)
+      # Refresh cursor in case updates were skipped while plot was not visible
+      if self.cursorTimestampGetter:
+        self.scheduleCursorUpdate(self.cursorTimestampGetter)
 
   #------------------------------------------------------------------------------
   def updateCursorPosition(self, itemID):
@@ -341,6 +383,42 @@ class PlaybackPlotChartUtils:
       table.SetValue(0, 0, float(itemID))
       table.Modified()
 
+  #------------------------------------------------------------------------------
+  def scheduleCursorUpdate(self, timestampGetter):
+    """
+    Request cursor update. Requests received before the update takes place are merged into one.
+    :param timestampGetter: function returning the current timestamp (function)
+    """
+    self.cursorTimestampGetter = timestampGetter
+    if not self.cursorUpdateTimer.isActive():
+      self.cursorUpdateTimer.start()
+
+  #------------------------------------------------------------------------------
+  def onCursorUpdateTimerTimeout(self):
+    """
+    Update cursor position if plot chart is visible.
+    """
+    if not self.cursorTimestampGetter or not self.isPlotChartVisible():
+      return
+    timestamp = self.cursorTimestampGetter()
+    if timestamp is not None:
+      self.updateCursorPosition(timestamp)
+
+  #------------------------------------------------------------------------------
+  def isPlotChartVisible(self):
+    """
+    Check if plot chart is displayed in a visible plot view.
+    :return result (bool)
+    """
+    if not self.plotChartNode:
+      return False
+    try:
+      plotWidget = slicer.app.layoutManager().plotWidget(0)
+      plotViewNode = plotWidget.mrmlPlotViewNode()
+      return plotWidget.isVisible() and (plotViewNode.GetPlotChartNodeID() == self.plotChartNode.GetID())
+    except:
+      return False
+
   #------------------------------------------------------------------------------
   def removeAssociatedNodesFromScene(self):
     """
@@ -350,6 +428,7 @@ class PlaybackPlotChartUtils:
     if self.metricTableNode:
       slicer.mrmlScene.RemoveNode(self.metricTableNode)
       self.metricTableNode = None
+      self.metricTableArrays = []
     if self.cursorTableNode:
       slicer.mrmlScene.RemoveNode(self.cursorTableNode)
       self.cursorTableNode = None
@@ -364,10 +443,408 @@ class PlaybackPlotChartUtils:
         slicer.mrmlScene.RemoveNode(self.cursorPlotSeries_dict[key])
       self.cursorPlotSeries_dict = {}
 
+    self.removeMetricLODTables()
+    self.removeOverlayNodesFromScene()
+
     # Delete plot chart node
     if self.plotChartNode:
       slicer.mrmlScene.RemoveNode(self.plotChartNode)
       self.plotChartNode = None
+    self.selectedMetricName = None
+    self.disconnectPlotView()
+    self.cursorUpdateTimer.stop()
+    self.cursorTimestampGetter = None
+
+  #------------------------------------------------------------------------------
+  #
+  # Level of detail
+  #
+  #------------------------------------------------------------------------------
+  def getMetricPyramid(self, metricName):
+    """
+    Get min/max pyramid of a metric, computed once and cached.
+    :param metricName: metric name (string)
+    :return list of (min indices, max indices) arrays for each level (list)
+    """
+    if metricName not in self.metricPyramid_dict:
+      self.metricPyramid_dict[metricName] = self.computeMinMaxPyramid(self.metricData_dict[metricName])
+    return self.metricPyramid_dict[metricName]
+
+  #------------------------------------------------------------------------------
+  def computeMinMaxPyramid(self, values):
+    """
+    Compute min/max pyramid of an array of values. Level k stores, for each bin of 2^(k+1) samples,
+    the indices of the minimum and maximum values, so that spikes are preserved at every level.
+    :param values: metric values (numpy array)
+    :return list of (min indices, max indices) arrays for each level (list)
+    """
+    pyramid = []
+    minIndices = np.arange(len(values))
+    maxIndices = minIndices
+    while len(minIndices) > 1:
+      # Pad odd number of bins by repeating last bin
+      if len(minIndices) % 2:
+        minIndices = np.append(minIndices, minIndices[-1])
+        maxIndices = np.append(maxIndices, maxIndices[-1])
+      evenMin, oddMin = minIndices[0::2], minIndices[1::2]
+      evenMax, oddMax = maxIndices[0::2], maxIndices[1::2]
+      minIndices = np.where(values[evenMin] <= values[oddMin], evenMin, oddMin)
+      maxIndices = np.where(values[evenMax] >= values[oddMax], evenMax, oddMax)
+      pyramid.append((minIndices, maxIndices))
+    return pyramid
+
+  #------------------------------------------------------------------------------
+  def getDecimatedIndices(self, metricName, firstIndex, lastIndex, numPixels):
+    """
+    Get indices of metric samples to plot within a range.
+    :param metricName: metric name (string)
+    :param firstIndex: first sample index in range (int)
+    :param lastIndex: sample index after the range (int)
+    :param numPixels: number of horizontal pixels available for the range (int)
+    :return sorted sample indices (numpy array)
+    """
+    if lastIndex - firstIndex <= 2 * numPixels:
+      return np.arange(firstIndex, lastIndex)
+    return self.decimateIndices(self.getMetricPyramid(metricName), firstIndex, lastIndex, numPixels)
+
+  #------------------------------------------------------------------------------
+  def decimateIndices(self, pyramid, firstIndex, lastIndex, numPixels):
+    """
+    Get indices of samples to plot within a range, about two per pixel (minimum and maximum of each bin).
+    :param pyramid: min/max pyramid of the values (list)
+    :param firstIndex: first sample index in range (int)
+    :param lastIndex: sample index after the range (int)
+    :param numPixels: number of horizontal pixels available for the range (int)
+    :return sorted sample indices (numpy array)
+    """
+    numSamples = lastIndex - firstIndex
+    if (numSamples <= 2 * numPixels) or not pyramid:
+      return np.arange(firstIndex, lastIndex)
+
+    # Select level with at most numPixels bins in range
+    level = min(int(np.ceil(np.log2(numSamples / numPixels))), len(pyramid))
+    minIndices, maxIndices = pyramid[level - 1]
+    binSize = 2 ** level
+    firstBin = firstIndex // binSize
+    lastBin = (lastIndex - 1) // binSize + 1
+    indices = np.concatenate((minIndices[firstBin:lastBin], maxIndices[firstBin:lastBin], [firstIndex, lastIndex - 1]))
+    indices = indices[(indices >= firstIndex) & (indices < lastIndex)]
+    return np.unique(indices)
+
+  #------------------------------------------------------------------------------
+  def getVisibleRange(self):
+    """
+    Get time range and width in pixels of the plot view.
+    :return minimum time (float), maximum time (float), width (int). Time range is None if not available.
+    """
+    try:
+      axis = self.plotView.chart().GetAxis(vtk.vtkAxis.BOTTOM)
+      return axis.GetMinimum(), axis.GetMaximum(), max(self.plotView.width, 1)
+    except:
+      return None, None, self.defaultPlotViewWidth
+
+  #------------------------------------------------------------------------------
+  def createMetricLODTable(self, metricName):
+    """
+    Create table containing the decimated samples of a metric that are displayed in the plot.
+    :param metricName: metric name (string)
+    :return table node (vtkMRMLTableNode)
+    """
+    tableNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLTableNode')
+    tableNode.SetName('Metrics_' + metricName)
+    tableNode.SetLocked(True) # lock table to avoid modifications
+    tableNode.SetHideFromEditors(True)
+    self.metricLODTableNode_dict[metricName] = tableNode
+    self.updateMetricLODTable(metricName)
+    return tableNode
+
+  #------------------------------------------------------------------------------
+  def updateMetricLODTable(self, metricName):
+    """
+    Update decimated samples of a metric for the visible range of the plot view. Samples outside the
+    visible range are kept at coarse resolution, so the plot bounds do not change.
+    :param metricName: metric name (string)
+    """
+    if metricName not in self.metricLODTableNode_dict:
+      return
+    timestamps = self.metricTimestamps_list
+    numSamples = min(len(timestamps), len(self.metricData_dict[metricName]))
+
+    # Coarse samples for whole recording
+    minTime, maxTime, numPixels = self.getVisibleRange()
+    indices = self.getDecimatedIndices(metricName, 0, numSamples, numPixels)
+
+    # Fine samples for visible range, extended by half the range at each side for panning
+    if (minTime is not None) and (maxTime > minTime):
+      margin = 0.5 * (maxTime - minTime)
+      firstIndex = int(np.searchsorted(timestamps[:numSamples], minTime - margin, side = 'left'))
+      lastIndex = int(np.searchsorted(timestamps[:numSamples], maxTime + margin, side = 'right'))
+      if (firstIndex > 0) or (lastIndex < numSamples):
+        fineIndices = self.getDecimatedIndices(metricName, firstIndex, lastIndex, 2 * numPixels)
+        indices = indices[(indices < firstIndex) | (indices >= lastIndex)]
+        indices = np.union1d(indices, fineIndices)
+
+    # Skip update if samples did not change
+    previousIndices = self.metricLODIndices_dict.get(metricName, None)
+    if (previousIndices is not None) and np.array_equal(previousIndices, indices):
+      return
+    self.metricLODIndices_dict[metricName] = indices
+
+    # Update table columns (data is not copied, arrays are kept alive)
+    tableNode = self.metricLODTableNode_dict[metricName]
+    self.metricLODArrays_dict[metricName] = [timestamps[indices], self.metricData_dict[metricName][indices]]
+    tableNode.RemoveAllColumns()
+    table = tableNode.GetTable()
+    for columnName, columnValues in zip(['timestamp', metricName], self.metricLODArrays_dict[metricName]):
+      array = numpy_support.numpy_to_vtk(columnValues, deep = False)
+      array.SetName(columnName)
+      table.AddColumn(array)
+    table.Modified()
+
+  #------------------------------------------------------------------------------
+  def removeMetricLODTables(self):
+    """
+    Remove decimated metric tables from scene.
+    """
+    for tableNode in self.metricLODTableNode_dict.values():
+      slicer.mrmlScene.RemoveNode(tableNode)
+    self.metricLODTableNode_dict = {}
+    self.metricLODArrays_dict = {}
+    self.metricLODIndices_dict = {}
+
+  #------------------------------------------------------------------------------
+  def connectPlotView(self):
+    """
+    Observe changes in the visible range of the plot view in the current layout.
+    """
+    if self.plotView:
+      return
+    try:
+      plotWidget = slicer.app.layoutManager().plotWidget(0)
+      self.plotView = plotWidget.plotView()
+      self.plotView.connect('extentChanged()', self.onPlotViewExtentChanged)
+    except:
+      self.plotView = None
+
+  #------------------------------------------------------------------------------
+  def disconnectPlotView(self):
+    """
+    Stop observing the plot view.
+    """
+    if self.plotView:
+      try:
+        self.plotView.disconnect('extentChanged()', self.onPlotViewExtentChanged)
+      except:
+        pass
+    self.plotView = None
+
+  #------------------------------------------------------------------------------
+  def onPlotViewExtentChanged(self):
+    """
+    Refine plotted samples of the selected metric after zoom or pan.
+    """
+    if self.selectedMetricName:
+      self.updateMetricLODTable(self.selectedMetricName)
+
+  #------------------------------------------------------------------------------
+  #
+  # Overlay of several recordings
+  #
+  #------------------------------------------------------------------------------
+  def addOverlayRecording(self, recordingLabel, timestampValues, metrics):
+    """
+    Register metric data of a recording to be displayed in the overlay plot chart.
+    :param recordingLabel: label identifying the recording in the plot (string)
+    :param timestampValues: timestamps (list or numpy array)
+    :param metrics: metric values for each metric name (dict)
+    """
+    overlayData = {}
+    overlayData['timestamps'] = np.asarray(timestampValues, dtype = np.float64)
+    overlayData['metrics'] = {}
+    for metricName, metricValues in metrics.items():
+      overlayData['metrics'][metricName] = np.asarray(metricValues, dtype = np.float64)
+    overlayData['pyramids'] = {}
+    self.overlayData_dict[recordingLabel] = overlayData
+
+  #------------------------------------------------------------------------------
+  def clearOverlayRecordings(self):
+    """
+    Remove registered overlay recordings and associated nodes.
+    """
+    self.overlayData_dict = {}
+    self.removeOverlayNodesFromScene()
+
+  #------------------------------------------------------------------------------
+  def getOverlayRecordingLabels(self):
+    return list(self.overlayData_dict.keys())
+
+  #------------------------------------------------------------------------------
+  def getNormalizedTime(self, timestamps):
+    """
+    Map timestamps to the [0, 1] range.
+    :param timestamps: timestamps (numpy array)
+    :return normalized time (numpy array)
+    """
+    duration = timestamps[-1] - timestamps[0]
+    if duration <= 0:
+      return np.zeros(len(timestamps))
+    return (timestamps - timestamps[0]) / duration
+
+  #------------------------------------------------------------------------------
+  def resampleMetric(self, normalizedTime, metricValues):
+    """
+    Resample metric at uniformly spaced normalized time values.
+    :param normalizedTime: normalized time of each sample (numpy array)
+    :param metricValues: metric values (numpy array)
+    :return resampled normalized time and metric values (numpy arrays)
+    """
+    resampledTime = np.linspace(0.0, 1.0, self.overlayNumSamples)
+    return resampledTime, np.interp(resampledTime, normalizedTime, metricValues)
+
+  #------------------------------------------------------------------------------
+  def computeDTWTimeWarping(self, referenceValues, values, windowFraction = 0.2):
+    """
+    Compute dynamic time warping between two uniformly resampled signals of the same length,
+    constrained to a band around the diagonal.
+    :param referenceValues: reference signal (numpy array)
+    :param values: signal to align (numpy array)
+    :param windowFraction: width of the band as a fraction of the signal length (float)
+    :return normalized reference time assigned to each sample of the signal to align (numpy array)
+    """
+    numSamples = len(values)
+    window = max(int(windowFraction * numSamples), 1)
+    cost = np.full((numSamples + 1, numSamples + 1), np.inf)
+    cost[0, 0] = 0.0
+    for i in range(1, numSamples + 1):
+      firstJ = max(1, i - window)
+      lastJ = min(numSamples, i + window)
+      distances = np.abs(referenceValues[i-1] - values[firstJ-1:lastJ])
+      # Diagonal and vertical steps can be computed for the whole row, horizontal steps are accumulated
+      rowCost = distances + np.minimum(cost[i-1, firstJ-1:lastJ], cost[i-1, firstJ:lastJ+1])
+      for j in range(firstJ, lastJ + 1):
+        cost[i, j] = min(rowCost[j - firstJ], distances[j - firstJ] + cost[i, j-1])
+
+    # Backtrack warping path
+    referenceIndices = [[] for j in range(numSamples)]
+    i, j = numSamples, numSamples
+    while (i > 0) and (j > 0):
+      referenceIndices[j-1].append(i-1)
+      steps = [cost[i-1, j-1], cost[i-1, j], cost[i, j-1]]
+      step = int(np.argmin(steps))
+      if step == 0:
+        i, j = i - 1, j - 1
+      elif step == 1:
+        i = i - 1
+      else:
+        j = j - 1
+    warpedIndices = np.array([np.mean(indices) if indices else 0.0 for indices in referenceIndices])
+    return warpedIndices / max(numSamples - 1, 1)
+
+  #------------------------------------------------------------------------------
+  def getAlignedOverlayTime(self, metricName, alignment):
+    """
+    Get aligned time axis of each overlay recording.
+    :param metricName: metric name (string)
+    :param alignment: 'normalized' or 'dtw' (string)
+    :return aligned time of each sample for each recording label (dict)
+    """
+    alignedTime_dict = {}
+    referenceValues = None
+    for recordingLabel, overlayData in self.overlayData_dict.items():
+      if metricName not in overlayData['metrics']:
+        continue
+      normalizedTime = self.getNormalizedTime(overlayData['timestamps'])
+      if alignment != 'dtw':
+        alignedTime_dict[recordingLabel] = normalizedTime
+        continue
+
+      # First recording is the reference
+      resampledTime, resampledValues = self.resampleMetric(normalizedTime, overlayData['metrics'][metricName])
+      if referenceValues is None:
+        referenceValues = resampledValues
+        alignedTime_dict[recordingLabel] = normalizedTime
+        continue
+      warpedTime = self.computeDTWTimeWarping(referenceValues, resampledValues)
+      alignedTime_dict[recordingLabel] = np.interp(normalizedTime, resampledTime, warpedTime)
+    return alignedTime_dict
+
+  #------------------------------------------------------------------------------
+  def createOverlayPlotChart(self, metricName, alignment = 'normalized'):
+    """
+    Create plot chart displaying a metric of all registered overlay recordings, with decimated series.
+    :param metricName: metric name (string)
+    :param alignment: 'normalized' or 'dtw' (string)
+    :return plot chart node (vtkMRMLPlotChartNode)
+    """
+    self.removeOverlayNodesFromScene()
+    alignedTime_dict = self.getAlignedOverlayTime(metricName, alignment)
+    if not alignedTime_dict:
+      logging.error('No overlay recordings contain metric ' + metricName + '. Plot chart will not be created.')
+      return None
+
+    # Create plot chart
+    self.overlayPlotChartNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLPlotChartNode')
+    self.overlayPlotChartNode.SetName('OverlayChart')
+    self.overlayPlotChartNode.SetTitle(metricName)
+    self.overlayPlotChartNode.SetXAxisTitle('Normalized time' if alignment != 'dtw' else 'Normalized time (DTW aligned)')
+    self.overlayPlotChartNode.SetAxisLabelFontSize(20)
+    self.overlayPlotChartNode.GridVisibilityOff()
+
+    # Create decimated plot series for each recording
+    numPixels = self.getVisibleRange()[2]
+    for recordingID, (recordingLabel, alignedTime) in enumerate(alignedTime_dict.items()):
+      overlayData = self.overlayData_dict[recordingLabel]
+      metricValues = overlayData['metrics'][metricName]
+      if metricName not in overlayData['pyramids']:
+        overlayData['pyramids'][metricName] = self.computeMinMaxPyramid(metricValues)
+      indices = self.decimateIndices(overlayData['pyramids'][metricName], 0, len(metricValues), numPixels)
+
+      # Table (data is not copied, arrays are kept alive)
+      tableNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLTableNode')
+      tableNode.SetName('Overlay_' + recordingLabel)
+      tableNode.SetLocked(True) # lock table to avoid modifications
+      tableNode.SetHideFromEditors(True)
+      self.overlayArrays_dict[recordingLabel] = [np.ascontiguousarray(alignedTime[indices]), metricValues[indices]]
+      table = tableNode.GetTable()
+      for columnName, columnValues in zip(['time', metricName], self.overlayArrays_dict[recordingLabel]):
+        array = numpy_support.numpy_to_vtk(columnValues, deep = False)
+        array.SetName(columnName)
+        table.AddColumn(array)
+      self.overlayTableNode_dict[recordingLabel] = tableNode
+
+      # Plot series
+      plotSeriesNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLPlotSeriesNode')
+      plotSeriesNode.SetName(recordingLabel)
+      plotSeriesNode.SetAndObserveTableNodeID(tableNode.GetID())
+      plotSeriesNode.SetXColumnName('time')
+      plotSeriesNode.SetYColumnName(metricName)
+      plotSeriesNode.SetPlotType(slicer.vtkMRMLPlotSeriesNode.PlotTypeScatter)
+      plotSeriesNode.SetMarkerStyle(slicer.vtkMRMLPlotSeriesNode.MarkerStyleNone)
+      plotSeriesNode.SetLineWidth(4 if recordingID == 0 else 2)
+      plotSeriesNode.SetColor(self.overlayColors[recordingID % len(self.overlayColors)])
+      self.overlayPlotSeries_dict[recordingLabel] = plotSeriesNode
+      self.overlayPlotChartNode.AddAndObservePlotSeriesNodeID(plotSeriesNode.GetID())
+    return self.overlayPlotChartNode
+
+  #------------------------------------------------------------------------------
+  def getOverlayPlotChart(self):
+    return self.overlayPlotChartNode
+
+  #------------------------------------------------------------------------------
+  def removeOverlayNodesFromScene(self):
+    """
+    Removes overlay table, plot series and plot chart nodes from Slicer scene.
+    """
+    for plotSeriesNode in self.overlayPlotSeries_dict.values():
+      slicer.mrmlScene.RemoveNode(plotSeriesNode)
+    self.overlayPlotSeries_dict = {}
+    for tableNode in self.overlayTableNode_dict.values():
+      slicer.mrmlScene.RemoveNode(tableNode)
+    self.overlayTableNode_dict = {}
+    self.overlayArrays_dict = {}
+    if self.overlayPlotChartNode:
+      slicer.mrmlScene.RemoveNode(self.overlayPlotChartNode)
+      self.overlayPlotChartNode = None
 
   #------------------------------------------------------------------------------
   def allValuesEqual(self, iterable):
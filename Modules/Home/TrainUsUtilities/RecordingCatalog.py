@@ -0,0 +1,302 @@
+from __main__ import vtk, qt, slicer
+import logging
+import os
+import json
+import sqlite3
+
+#------------------------------------------------------------------------------
+#
+# RecordingCatalog
+#
+#------------------------------------------------------------------------------
+class RecordingCatalog():
+  """
+  SQLite index of the participants and recordings stored in the root directory. The
+  JSON info files remain the source of truth: the catalog is updated every time an
+  info file is written or a folder is deleted, and can be rebuilt from the files at
+  any time. Listing, search and sort queries are answered from the catalog without
+  reading the root directory. The modification time of each info file is stored so
+  that only changed files need to be read again to synchronize the catalog. Details of
+  recordings computed in the background (see RecordingDetailsLoader) are also stored, so
+  that they are displayed at once the next time.
+
+  Usage:
+    catalog = RecordingCatalog()
+    catalog.open(rootDirectory)
+    catalog.upsertParticipants([(participantInfo, infoFileMTime)])
+    participantInfo_list = catalog.getParticipants(searchText = 'smith', sortColumn = 'surname')
+  """
+
+  # Catalog file name in root directory
+  CATALOG_FILE_NAME = 'TrainUS_Catalog.sqlite'
+
+  # Increase when table definitions change, so that the catalog is rebuilt
+  SCHEMA_VERSION = 3
+
+  # Columns that can be used to sort query results
+  PARTICIPANT_SORT_COLUMNS = ['id', 'name', 'surname', 'birthdate', 'email']
+  RECORDING_SORT_COLUMNS = ['id', 'date', 'time', 'exercise', 'duration']
+
+  #------------------------------------------------------------------------------
+  def __init__(self):
+    self.connection = None
+    self.catalogFilePath = None
+
+  #------------------------------------------------------------------------------
+  def isOpen(self):
+    return self.connection is not None
+
+  #------------------------------------------------------------------------------
+  def open(self, rootDirectory):
+    """
+    Open catalog of a root directory, creating it if needed.
+    :param rootDirectory: root directory of the database (string)
+    :return True if the catalog is new or outdated and must be rebuilt (bool)
+    """
+    self.close()
+    self.catalogFilePath = os.path.join(rootDirectory, self.CATALOG_FILE_NAME)
+    try:
+      self.connection = sqlite3.connect(self.catalogFilePath)
+      # Rollback journal, since write-ahead logging requires shared memory and is not safe when the
+      # root directory is on a network share. Catalogs created in WAL mode are converted back.
+      self.connection.execute('PRAGMA journal_mode=DELETE')
+      schemaVersion = self.connection.execute('PRAGMA user_version').fetchone()[0]
+    except sqlite3.Error:
+      logging.error('Catalog could not be opened: ' + self.catalogFilePath)
+      self.close()
+      return False
+    if schemaVersion == self.SCHEMA_VERSION:
+      return False
+    self.createTables()
+    return True
+
+  #------------------------------------------------------------------------------
+  def close(self):
+    if self.connection:
+      self.connection.close()
+    self.connection = None
+
+  #------------------------------------------------------------------------------
+  def createTables(self):
+    """
+    (Re)create catalog tables and indexes.
+    """
+    with self.connection:
+      self.connection.execute('DROP TABLE IF EXISTS participants')
+      self.connection.execute('DROP TABLE IF EXISTS recordings')
+      self.connection.execute('DROP TABLE IF EXISTS recordingDetails')
+      self.connection.execute(
+        'CREATE TABLE participants ('
+        'id TEXT PRIMARY KEY, name TEXT, surname TEXT, birthdate TEXT, email TEXT, searchText TEXT, info TEXT, infoFileMTime REAL)')
+      self.connection.execute(
+        'CREATE TABLE recordings ('
+        'participantID TEXT, id TEXT, date TEXT, time TEXT, exercise TEXT, duration REAL, info TEXT, infoFileMTime REAL, '
+        'PRIMARY KEY (participantID, id))')
+      self.connection.execute(
+        'CREATE TABLE recordingDetails (participantID TEXT, id TEXT, details TEXT, PRIMARY KEY (participantID, id))')
+      self.connection.execute('CREATE INDEX participantsSurname ON participants (surname, name)')
+      self.connection.execute('CREATE INDEX recordingsExercise ON recordings (participantID, exercise)')
+      self.connection.execute('CREATE INDEX recordingsDate ON recordings (participantID, date, time)')
+      self.connection.execute('PRAGMA user_version = {}'.format(self.SCHEMA_VERSION))
+
+  #------------------------------------------------------------------------------
+  def clear(self):
+    """
+    Remove all participants and recordings from catalog.
+    """
+    self.execute('DELETE FROM recordingDetails', ())
+    self.execute('DELETE FROM recordings', ())
+    self.execute('DELETE FROM participants', ())
+
+  #------------------------------------------------------------------------------
+  def getParticipantRow(self, participantInfo, infoFileMTime):
+    searchText = '{} {}'.format(participantInfo.get('name', ''), participantInfo.get('surname', '')).lower()
+    return (participantInfo['id'], participantInfo.get('name', ''), participantInfo.get('surname', ''),
+      participantInfo.get('birthdate', ''), participantInfo.get('email', ''), searchText, json.dumps(participantInfo), infoFileMTime)
+
+  #------------------------------------------------------------------------------
+  def getRecordingRow(self, participantID, recordingInfo, infoFileMTime):
+    try:
+      duration = float(recordingInfo.get('duration', 0.0))
+    except ValueError:
+      duration = 0.0
+    return (participantID, recordingInfo['id'], recordingInfo.get('date', ''), recordingInfo.get('time', ''),
+      recordingInfo.get('exercise', ''), duration, json.dumps(recordingInfo), infoFileMTime)
+
+  #------------------------------------------------------------------------------
+  #
+  # Update catalog
+  #
+  #------------------------------------------------------------------------------
+  def upsertParticipants(self, participantEntries):
+    """
+    Add or update participants in a single transaction.
+    :param participantEntries: (participant info, info file modification time) pairs (list)
+    """
+    rows = [self.getParticipantRow(participantInfo, infoFileMTime) for participantInfo, infoFileMTime in participantEntries]
+    self.executeMany('INSERT OR REPLACE INTO participants VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+  #------------------------------------------------------------------------------
+  def upsertRecordings(self, participantID, recordingEntries):
+    """
+    Add or update recordings of a participant in a single transaction.
+    :param participantID: participant ID (string)
+    :param recordingEntries: (recording info, info file modification time) pairs (list)
+    """
+    rows = [self.getRecordingRow(participantID, recordingInfo, infoFileMTime) for recordingInfo, infoFileMTime in recordingEntries]
+    self.executeMany('INSERT OR REPLACE INTO recordings VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+  #------------------------------------------------------------------------------
+  def deleteParticipant(self, participantID):
+    """
+    Delete participant and all its recordings.
+    :param participantID: participant ID (string)
+    """
+    self.execute('DELETE FROM recordingDetails WHERE participantID = ?', (participantID,))
+    self.execute('DELETE FROM recordings WHERE participantID = ?', (participantID,))
+    self.execute('DELETE FROM participants WHERE id = ?', (participantID,))
+
+  #------------------------------------------------------------------------------
+  def deleteRecording(self, participantID, recordingID):
+    """
+    Delete recording.
+    :param participantID: participant ID (string)
+    :param recordingID: recording ID (string)
+    """
+    self.execute('DELETE FROM recordingDetails WHERE participantID = ? AND id = ?', (participantID, recordingID))
+    self.execute('DELETE FROM recordings WHERE participantID = ? AND id = ?', (participantID, recordingID))
+
+  #------------------------------------------------------------------------------
+  def upsertRecordingDetails(self, participantID, recordingID, details):
+    """
+    Add or update details of a recording computed in the background.
+    :param participantID: participant ID (string)
+    :param recordingID: recording ID (string)
+    :param details: recording details (dict)
+    """
+    self.execute('INSERT OR REPLACE INTO recordingDetails VALUES (?, ?, ?)', (participantID, recordingID, json.dumps(details)))
+
+  #------------------------------------------------------------------------------
+  def execute(self, query, parameters):
+    self.executeMany(query, [parameters])
+
+  #------------------------------------------------------------------------------
+  def executeMany(self, query, parameters_list):
+    if not self.isOpen() or not parameters_list:
+      return
+    try:
+      with self.connection:
+        self.connection.executemany(query, parameters_list)
+    except sqlite3.Error:
+      logging.error('Catalog could not be updated: ' + self.catalogFilePath)
+
+  #------------------------------------------------------------------------------
+  #
+  # Query catalog
+  #
+  #------------------------------------------------------------------------------
+  def getParticipants(self, searchText = '', sortColumn = 'id', descending = False):
+    """
+    Get participants whose name or surname contain the search text.
+    :param searchText: filter text, case insensitive (string)
+    :param sortColumn: column to sort results by (string)
+    :param descending: sort in descending order (bool)
+    :return list of participant info (list)
+    """
+    if sortColumn not in self.PARTICIPANT_SORT_COLUMNS:
+      sortColumn = 'id'
+    query = 'SELECT info FROM participants'
+    parameters = ()
+    if searchText:
+      query += " WHERE searchText LIKE ? ESCAPE '\\'"
+      parameters = ('%' + self.escapeLikePattern(searchText.lower()) + '%',)
+    query += ' ORDER BY {} COLLATE NOCASE {}, id'.format(sortColumn, 'DESC' if descending else 'ASC')
+    return self.queryInfo(query, parameters)
+
+  #------------------------------------------------------------------------------
+  def getRecordings(self, participantID, exerciseName = None, sortColumn = 'id', descending = False):
+    """
+    Get recordings of a participant.
+    :param participantID: participant ID (string)
+    :param exerciseName: only return recordings of this exercise if not None (string)
+    :param sortColumn: column to sort results by (string)
+    :param descending: sort in descending order (bool)
+    :return list of recording info (list)
+    """
+    if sortColumn not in self.RECORDING_SORT_COLUMNS:
+      sortColumn = 'id'
+    query = 'SELECT info FROM recordings WHERE participantID = ?'
+    parameters = (participantID,)
+    if exerciseName is not None:
+      query += ' AND exercise = ?'
+      parameters += (exerciseName,)
+    query += ' ORDER BY {} {}, id'.format(sortColumn, 'DESC' if descending else 'ASC')
+    return self.queryInfo(query, parameters)
+
+  #------------------------------------------------------------------------------
+  def getParticipantInfoFileMTimes(self):
+    """
+    Get modification time of the info file of each participant when it was added to the catalog.
+    :return modification time for each participant ID (dict)
+    """
+    return dict(self.queryRows('SELECT id, infoFileMTime FROM participants', ()))
+
+  #------------------------------------------------------------------------------
+  def getRecordingInfoFileMTimes(self, participantID):
+    """
+    Get modification time of the info file of each recording of a participant when it was added to the catalog.
+    :param participantID: participant ID (string)
+    :return modification time for each recording ID (dict)
+    """
+    return dict(self.queryRows('SELECT id, infoFileMTime FROM recordings WHERE participantID = ?', (participantID,)))
+
+  #------------------------------------------------------------------------------
+  def getRecordingDetails(self, participantID):
+    """
+    Get details of the recordings of a participant computed in the background.
+    :param participantID: participant ID (string)
+    :return details for each recording ID (dict)
+    """
+    rows = self.queryRows('SELECT id, details FROM recordingDetails WHERE participantID = ?', (participantID,))
+    return {recordingID: json.loads(details) for recordingID, details in rows}
+
+  #------------------------------------------------------------------------------
+  def getRecordingsWithDetails(self, participantID = None):
+    """
+    Get recordings with their details computed in the background, of a participant or of all participants.
+    :param participantID: participant ID, or None for all participants (string)
+    :return (participant ID, recording ID, date, time, exercise, details or None) tuples (list)
+    """
+    query = ('SELECT recordings.participantID, recordings.id, recordings.date, recordings.time, recordings.exercise, recordingDetails.details '
+      'FROM recordings LEFT JOIN recordingDetails '
+      'ON recordings.participantID = recordingDetails.participantID AND recordings.id = recordingDetails.id')
+    parameters = ()
+    if participantID is not None:
+      query += ' WHERE recordings.participantID = ?'
+      parameters = (participantID,)
+    rows = self.queryRows(query, parameters)
+    return [row[:5] + ((json.loads(row[5]) if row[5] else None),) for row in rows]
+
+  #------------------------------------------------------------------------------
+  def getNumberOfParticipants(self):
+    if not self.isOpen():
+      return 0
+    return self.connection.execute('SELECT COUNT(*) FROM participants').fetchone()[0]
+
+  #------------------------------------------------------------------------------
+  def queryInfo(self, query, parameters):
+    return [json.loads(row[0]) for row in self.queryRows(query, parameters)]
+
+  #------------------------------------------------------------------------------
+  def queryRows(self, query, parameters):
+    if not self.isOpen():
+      return list()
+    try:
+      return self.connection.execute(query, parameters).fetchall()
+    except sqlite3.Error:
+      logging.error('Catalog could not be queried: ' + self.catalogFilePath)
+      return list()
+
+  #------------------------------------------------------------------------------
+  def escapeLikePattern(self, text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
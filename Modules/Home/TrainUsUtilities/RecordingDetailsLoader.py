@@ -0,0 +1,264 @@
+from __main__ import vtk, qt, slicer
+import logging
+import os
+import json
+import queue
+import threading
+import numpy as np
+
+from .MetricResultsCache import MetricResultsCache
+
+#------------------------------------------------------------------------------
+#
+# RecordingDetailsLoader
+#
+#------------------------------------------------------------------------------
+class RecordingDetailsLoader():
+  """
+  Computes details of recordings that are not stored in the recording info file (file size,
+  number of frames, trimmed duration, overall metric values and score) in a background worker
+  thread.
+
+  Details are read from the files stored in the recording folder: number of frames from the
+  tracking data file (NPZ, HDF5 or Parquet, see RecordingManager.writeTrackingDataFile), trimmed duration from the real-time metrics of the metric results cache
+  (computed on the trimmed recording), and overall metrics and score from the cached overall
+  metric table, which are also used by the learning curve analytics. A signature of the folder
+  contents (total size and latest modification time) is computed first, and the files are only
+  read if the signature differs from the one of the previous details.
+
+  Results are delivered on the main thread by a timer, through the callback set in
+  resultCallback(participantID, recordingID, details).
+
+  Usage:
+    loader = RecordingDetailsLoader()
+    loader.resultCallback = onRecordingDetailsLoaded
+    loader.requestDetails(participantID, recordingID, recordingDirectory, previousDetails)
+  """
+
+  # Keys of recording details
+  DETAIL_KEYS = ['fileSize', 'numFrames', 'trimmedDuration', 'score', 'overallMetrics']
+
+  # Suffixes of tracking data files in the supported formats, in order of preference
+  TRACKING_DATA_FILE_SUFFIXES = ['_Tracking.npz', '_Tracking.h5', '_Tracking.parquet']
+
+  #------------------------------------------------------------------------------
+  def __init__(self):
+    # Requests waiting for the worker, and results waiting for the main thread
+    self.requestQueue = queue.Queue()
+    self.resultQueue = queue.Queue()
+    self.pendingRequests = set()
+    self.workerThread = None
+    self.workerLock = threading.Lock()
+
+    # Callback called on the main thread for each result
+    self.resultCallback = None
+
+    # Timer to deliver results on the main thread
+    self.resultTimer = qt.QTimer()
+    self.resultTimer.setInterval(100)
+    self.resultTimer.connect('timeout()', self.deliverResults)
+
+  #------------------------------------------------------------------------------
+  def requestDetails(self, participantID, recordingID, recordingDirectory, previousDetails = None):
+    """
+    Request details of a recording. Requests for a recording that is already waiting are ignored.
+    :param participantID: participant ID (string)
+    :param recordingID: recording ID (string)
+    :param recordingDirectory: recording folder (string)
+    :param previousDetails: details computed previously, reused if the folder did not change (dict)
+    """
+    with self.workerLock:
+      if (participantID, recordingID) in self.pendingRequests:
+        return
+      self.pendingRequests.add((participantID, recordingID))
+      self.requestQueue.put((participantID, recordingID, recordingDirectory, previousDetails))
+      if self.workerThread is None:
+        self.workerThread = threading.Thread(target = self.processRequests, name = 'RecordingDetailsLoader', daemon = True)
+        self.workerThread.start()
+    if not self.resultTimer.isActive():
+      self.resultTimer.start()
+
+  #------------------------------------------------------------------------------
+  def cancelRequests(self):
+    """
+    Discard requests that were not processed yet, e.g. when another participant is selected.
+    """
+    with self.workerLock:
+      while not self.requestQueue.empty():
+        participantID, recordingID, recordingDirectory, previousDetails = self.requestQueue.get_nowait()
+        self.pendingRequests.discard((participantID, recordingID))
+
+  #------------------------------------------------------------------------------
+  def processRequests(self):
+    """
+    Compute details of queued recordings. Runs in the worker thread until the queue is empty.
+    """
+    while True:
+      with self.workerLock:
+        try:
+          participantID, recordingID, recordingDirectory, previousDetails = self.requestQueue.get_nowait()
+        except queue.Empty:
+          self.workerThread = None
+          return
+      details = None
+      errorMessage = None
+      try:
+        details = self.computeDetails(recordingDirectory, previousDetails)
+      except FileNotFoundError:
+        pass # recording deleted
+      except Exception as error:
+        errorMessage = str(error)
+      self.resultQueue.put((participantID, recordingID, details, errorMessage))
+
+  #------------------------------------------------------------------------------
+  def deliverResults(self):
+    """
+    Pass computed details to the result callback. Runs on the main thread.
+    """
+    while not self.resultQueue.empty():
+      participantID, recordingID, details, errorMessage = self.resultQueue.get()
+      with self.workerLock:
+        self.pendingRequests.discard((participantID, recordingID))
+      if details is None:
+        if errorMessage:
+          logging.error('Details of recording {}/{} could not be computed: {}'.format(participantID, recordingID, errorMessage))
+        continue
+      if self.resultCallback:
+        self.resultCallback(participantID, recordingID, details)
+    if (self.workerThread is None) and self.resultQueue.empty():
+      self.resultTimer.stop()
+
+  #------------------------------------------------------------------------------
+  #
+  # Compute details
+  #
+  #------------------------------------------------------------------------------
+  def computeDetails(self, recordingDirectory, previousDetails = None):
+    """
+    Compute details of a recording from the files in its folder.
+    :param recordingDirectory: recording folder (string)
+    :param previousDetails: details computed previously, returned if the folder did not change (dict)
+    :return details, with None for values that are not available (dict)
+    """
+    fileSize, signature = self.getFolderSignature(recordingDirectory)
+    if previousDetails and (previousDetails.get('signature') == signature) and all(key in previousDetails for key in self.DETAIL_KEYS):
+      return previousDetails
+    details = {'fileSize': fileSize, 'numFrames': None, 'trimmedDuration': None, 'score': None, 'overallMetrics': dict(), 'signature': signature}
+
+    # Number of frames from tracking data file, trimmed duration from real-time metrics
+    timestamps = self.readTimestamps(self.getTrackingDataFilePath(recordingDirectory))
+    if timestamps is not None:
+      details['numFrames'] = int(len(timestamps))
+      details['trimmedDuration'] = self.getDuration(timestamps)
+    timestamps = self.readTimestamps(os.path.join(recordingDirectory, MetricResultsCache.METRICS_ARRAY_FILE_NAME))
+    if timestamps is not None:
+      details['trimmedDuration'] = self.getDuration(timestamps)
+
+    # Overall metric values and score from overall metric table
+    details['overallMetrics'] = self.readOverallMetrics(os.path.join(recordingDirectory, MetricResultsCache.METRICS_INFO_FILE_NAME))
+    details['score'] = self.getScore(details['overallMetrics'])
+    return details
+
+  #------------------------------------------------------------------------------
+  def getFolderSignature(self, recordingDirectory):
+    """
+    Get total size and a signature of the files of a recording folder.
+    :param recordingDirectory: recording folder (string)
+    :return total size in bytes (int) and signature (string)
+    """
+    totalSize = 0
+    latestMTime = 0.0
+    numFiles = 0
+    for entry in os.scandir(recordingDirectory):
+      if entry.is_file() and not entry.name.startswith('.'):
+        fileStat = entry.stat()
+        totalSize += fileStat.st_size
+        latestMTime = max(latestMTime, fileStat.st_mtime)
+        numFiles += 1
+    return totalSize, '{}:{}:{}'.format(numFiles, totalSize, latestMTime)
+
+  #------------------------------------------------------------------------------
+  def getTrackingDataFilePath(self, recordingDirectory):
+    fileNames = sorted(os.listdir(recordingDirectory))
+    for fileSuffix in self.TRACKING_DATA_FILE_SUFFIXES:
+      for fileName in fileNames:
+        if fileName.endswith(fileSuffix):
+          return os.path.join(recordingDirectory, fileName)
+    return None
+
+  #------------------------------------------------------------------------------
+  def readTimestamps(self, filePath):
+    """
+    Read timestamps array from NPZ, HDF5 or Parquet file, without loading the other arrays.
+    :param filePath: path to file, can be None (string)
+    :return timestamps, or None if not available (numpy array)
+    """
+    if (filePath is None) or not os.path.exists(filePath):
+      return None
+    fileExtension = os.path.splitext(filePath)[1].lower()
+    try:
+      if fileExtension == '.h5':
+        import h5py
+        with h5py.File(filePath, 'r') as inputFile:
+          if 'timestamps' not in inputFile:
+            return None
+          return inputFile['timestamps'][()]
+      elif fileExtension == '.parquet':
+        import pyarrow.parquet
+        if 'timestamps' not in pyarrow.parquet.read_schema(filePath).names:
+          return None
+        return pyarrow.parquet.read_table(filePath, columns = ['timestamps']).column('timestamps').to_numpy()
+    except ImportError:
+      return None # package required to read the file format is not installed
+    with np.load(filePath) as inputFile:
+      if 'timestamps' not in inputFile.files:
+        return None
+      return inputFile['timestamps']
+
+  #------------------------------------------------------------------------------
+  def getDuration(self, timestamps):
+    if len(timestamps) < 2:
+      return 0.0
+    return float(timestamps[-1]) - float(timestamps[0])
+
+  #------------------------------------------------------------------------------
+  def readOverallMetrics(self, filePath):
+    """
+    Read numeric values of the cached overall metric table. Metrics computed for several roles
+    (e.g. needle and ultrasound probe) are named '<MetricName> [<MetricRoles>]'.
+    :param filePath: path to metrics info file (string)
+    :return value for each metric name (dict)
+    """
+    metricValues = dict()
+    if not os.path.exists(filePath):
+      return metricValues
+    with open(filePath, 'r') as inputFile:
+      overallMetrics = json.load(inputFile).get('overall')
+    if not overallMetrics:
+      return metricValues
+    columnNames = overallMetrics['columns']
+    valueColumn = columnNames.index('MetricValue') if 'MetricValue' in columnNames else len(columnNames) - 1
+    rolesColumn = columnNames.index('MetricRoles') if 'MetricRoles' in columnNames else None
+    for row in overallMetrics['rows']:
+      if not row:
+        continue
+      metricName = row[0]
+      if (rolesColumn is not None) and row[rolesColumn]:
+        metricName += ' [{}]'.format(row[rolesColumn])
+      try:
+        metricValues[metricName] = float(row[valueColumn])
+      except ValueError:
+        continue # non-numeric metric
+    return metricValues
+
+  #------------------------------------------------------------------------------
+  def getScore(self, metricValues):
+    """
+    Get score from overall metrics: value of the first metric whose name contains 'score'.
+    :param metricValues: value for each metric name (dict)
+    :return score, or None if not available (float)
+    """
+    for metricName, metricValue in metricValues.items():
+      if 'score' in metricName.lower():
+        return metricValue
+    return None
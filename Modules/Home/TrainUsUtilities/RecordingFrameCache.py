@@ -0,0 +1,374 @@
+import logging
+import os
+import zlib
+import shutil
+import struct
+import zipfile
+import collections
+import numpy as np
+
+#------------------------------------------------------------------------------
+#
+# RecordingFrameCache
+#
+#------------------------------------------------------------------------------
+class RecordingFrameCache:
+  """
+  Provides on-demand access to the image frames of a recorded volume sequence (.seq.nrrd).
+
+  Frames are never loaded all at once. When the NRRD data is stored uncompressed, the
+  file (or the .sqbr archive member containing it) is memory-mapped and frames are read
+  directly from disk. Compressed data is decompressed once into a raw file in the cache
+  directory, which is then memory-mapped. Decoded frames around the playback cursor are
+  kept in a least-recently-used cache of bounded size.
+
+  Usage:
+    frameCache = RecordingFrameCache(maxCachedFrames = 64)
+    frameCache.openFromArchive(sqbrFilePath, 'Image_Reference-Sequence.seq.nrrd', cacheDirectory)
+    frameIndex = frameCache.getFrameIndexFromTimestamp(timestamp)
+    frameArray = frameCache.getFrame(frameIndex)
+    frameCache.close()
+  """
+
+  # NRRD data types
+  NRRD_TYPES = {
+    'signed char': 'i1', 'int8': 'i1', 'int8_t': 'i1',
+    'uchar': 'u1', 'unsigned char': 'u1', 'uint8': 'u1', 'uint8_t': 'u1',
+    'short': 'i2', 'short int': 'i2', 'signed short': 'i2', 'signed short int': 'i2', 'int16': 'i2', 'int16_t': 'i2',
+    'ushort': 'u2', 'unsigned short': 'u2', 'unsigned short int': 'u2', 'uint16': 'u2', 'uint16_t': 'u2',
+    'int': 'i4', 'signed int': 'i4', 'int32': 'i4', 'int32_t': 'i4',
+    'uint': 'u4', 'unsigned int': 'u4', 'uint32': 'u4', 'uint32_t': 'u4',
+    'longlong': 'i8', 'long long': 'i8', 'long long int': 'i8', 'int64': 'i8', 'int64_t': 'i8',
+    'ulonglong': 'u8', 'unsigned long long': 'u8', 'unsigned long long int': 'u8', 'uint64': 'u8', 'uint64_t': 'u8',
+    'float': 'f4', 'double': 'f8'
+  }
+
+  #------------------------------------------------------------------------------
+  def __init__(self, maxCachedFrames = 64):
+    # Memory-mapped frame data
+    self.frameData = None
+    self.frameTimestamps = None
+    self.ijkToRasMatrix = np.eye(4)
+
+    # LRU cache of decoded frames
+    self.maxCachedFrames = maxCachedFrames
+    self.cachedFrames = collections.OrderedDict()
+
+  #------------------------------------------------------------------------------
+  def isOpen(self):
+    """
+    Check if a volume sequence is currently mapped.
+    :return result (bool)
+    """
+    return self.frameData is not None
+
+  #------------------------------------------------------------------------------
+  def getNumberOfFrames(self):
+    """
+    Get number of frames in the volume sequence.
+    :return number of frames (int)
+    """
+    if not self.isOpen():
+      return 0
+    return self.frameData.shape[0]
+
+  #------------------------------------------------------------------------------
+  def getTimestamps(self):
+    """
+    Get timestamp of each frame in the volume sequence.
+    :return timestamps (numpy array)
+    """
+    return self.frameTimestamps
+
+  #------------------------------------------------------------------------------
+  def getFrameShape(self):
+    """
+    Get shape of a single frame, following Slicer array convention (k, j, i[, components]).
+    :return frame shape (tuple)
+    """
+    if not self.isOpen():
+      return None
+    return self.frameData.shape[1:]
+
+  #------------------------------------------------------------------------------
+  def getIJKToRASMatrix(self):
+    """
+    Get IJK to RAS matrix of the frames.
+    :return 4x4 matrix (numpy array)
+    """
+    return self.ijkToRasMatrix
+
+  #------------------------------------------------------------------------------
+  def openFromFile(self, filePath, cacheDirectory):
+    """
+    Map volume sequence stored in a .seq.nrrd file.
+    :param filePath: path to .seq.nrrd file (string)
+    :param cacheDirectory: folder to store decompressed data if needed (string)
+    :return success (bool)
+    """
+    self.close()
+    try:
+      with open(filePath, 'rb') as fileObject:
+        header, headerLength = self.readNrrdHeader(fileObject)
+      self.mapNrrdData(header, filePath, headerLength, os.path.dirname(filePath), cacheDirectory)
+      return True
+    except:
+      logging.error('Error mapping volume sequence file: ' + filePath)
+      self.close()
+      return False
+
+  #------------------------------------------------------------------------------
+  def openFromArchive(self, archiveFilePath, memberName, cacheDirectory):
+    """
+    Map volume sequence stored inside a .sqbr archive. If the archive member is stored
+    without compression, data are read in place, otherwise the member is extracted first.
+    :param archiveFilePath: path to .sqbr file (string)
+    :param memberName: name of the .seq.nrrd member inside the archive (string)
+    :param cacheDirectory: folder to store extracted data if needed (string)
+    :return success (bool)
+    """
+    self.close()
+    try:
+      with zipfile.ZipFile(archiveFilePath, 'r') as archive:
+        memberInfo = archive.getinfo(memberName)
+        if memberInfo.compress_type != zipfile.ZIP_STORED:
+          # Compressed member: extract it once and map extracted file
+          extractedFilePath = self.extractArchiveMember(archive, memberInfo, cacheDirectory)
+          return self.openFromFile(extractedFilePath, cacheDirectory)
+        with archive.open(memberInfo) as memberObject:
+          header, headerLength = self.readNrrdHeader(memberObject)
+
+      # Stored member: compute offset of member data inside the archive
+      with open(archiveFilePath, 'rb') as fileObject:
+        fileObject.seek(memberInfo.header_offset)
+        localHeader = fileObject.read(30)
+        fileNameLength, extraFieldLength = struct.unpack('<HH', localHeader[26:30])
+      memberOffset = memberInfo.header_offset + 30 + fileNameLength + extraFieldLength
+
+      self.mapNrrdData(header, archiveFilePath, memberOffset + headerLength, cacheDirectory, cacheDirectory)
+      return True
+    except:
+      logging.error('Error mapping volume sequence from archive: ' + archiveFilePath)
+      self.close()
+      return False
+
+  #------------------------------------------------------------------------------
+  def close(self):
+    """
+    Release memory-mapped data and cached frames.
+    """
+    self.frameData = None
+    self.frameTimestamps = None
+    self.ijkToRasMatrix = np.eye(4)
+    self.cachedFrames.clear()
+
+  #------------------------------------------------------------------------------
+  def getFrameIndexFromTimestamp(self, timestamp):
+    """
+    Get index of the frame displayed at a given time, i.e., the closest frame recorded at or before it.
+    :param timestamp: time value (float)
+    :return frame index (int)
+    """
+    if not self.isOpen():
+      return None
+    frameIndex = int(np.searchsorted(self.frameTimestamps, timestamp, side='right')) - 1
+    return min(max(frameIndex, 0), self.getNumberOfFrames() - 1)
+
+  #------------------------------------------------------------------------------
+  def getFrame(self, frameIndex):
+    """
+    Get frame data. Recently accessed frames are kept in memory.
+    :param frameIndex: frame index (int)
+    :return frame (numpy array)
+    """
+    if not self.isOpen():
+      return None
+
+    # Cached frame
+    if frameIndex in self.cachedFrames:
+      self.cachedFrames.move_to_end(frameIndex)
+      return self.cachedFrames[frameIndex]
+
+    # Read frame from disk
+    frame = np.array(self.frameData[frameIndex])
+    self.cachedFrames[frameIndex] = frame
+    while len(self.cachedFrames) > self.maxCachedFrames:
+      self.cachedFrames.popitem(last=False)
+    return frame
+
+  #------------------------------------------------------------------------------
+  def prefetchFrames(self, frameIndex, radius):
+    """
+    Read frames around a given index into the cache.
+    :param frameIndex: central frame index (int)
+    :param radius: number of frames to read at each side (int)
+    """
+    if not self.isOpen():
+      return
+    radius = min(radius, (self.maxCachedFrames - 1) // 2)
+    firstIndex = max(frameIndex - radius, 0)
+    lastIndex = min(frameIndex + radius, self.getNumberOfFrames() - 1)
+    for index in range(firstIndex, lastIndex + 1):
+      self.getFrame(index)
+    # Keep central frame as most recently used
+    self.getFrame(frameIndex)
+
+  #------------------------------------------------------------------------------
+  #
+  # NRRD parsing
+  #
+  #------------------------------------------------------------------------------
+  def readNrrdHeader(self, fileObject):
+    """
+    Read NRRD header fields.
+    :param fileObject: binary file object positioned at the start of the header
+    :return header fields (dict) and header length in bytes (int)
+    """
+    magic = fileObject.readline()
+    if not magic.startswith(b'NRRD'):
+      raise ValueError('Not a NRRD file')
+    headerLength = len(magic)
+    header = dict()
+    while True:
+      line = fileObject.readline()
+      headerLength += len(line)
+      line = line.decode('latin-1').rstrip('\r\n')
+      if not line:
+        break # end of header
+      if line.startswith('#'):
+        continue # comment
+      if ':=' in line:
+        key, value = line.split(':=', 1)
+      else:
+        key, value = line.split(':', 1)
+      header[key.strip()] = value.strip()
+    return header, headerLength
+
+  #------------------------------------------------------------------------------
+  def mapNrrdData(self, header, filePath, dataOffset, headerDirectory, cacheDirectory):
+    """
+    Create memory map of NRRD data and read frame timestamps and geometry.
+    :param header: NRRD header fields (dict)
+    :param filePath: path to file containing the header (string)
+    :param dataOffset: byte offset of data for attached data files (int)
+    :param headerDirectory: folder used to resolve detached data files (string)
+    :param cacheDirectory: folder to store decompressed data if needed (string)
+    """
+    # Data type
+    dataType = np.dtype(self.NRRD_TYPES[header['type']])
+    if dataType.itemsize > 1:
+      endianPrefix = '>' if header.get('endian', 'little') == 'big' else '<'
+      dataType = dataType.newbyteorder(endianPrefix)
+
+    # Shape. NRRD lists fastest axis first, frame axis is the slowest one.
+    sizes = [int(size) for size in header['sizes'].split()]
+    kinds = header.get('kinds', '').split()
+    if kinds and kinds[-1] != 'list':
+      raise ValueError('Frame axis is expected to be the last NRRD axis')
+    shape = tuple(reversed(sizes))
+
+    # Detached data file
+    dataFileName = header.get('data file', header.get('datafile', None))
+    if dataFileName:
+      filePath = os.path.join(headerDirectory, dataFileName)
+      dataOffset = max(int(header.get('byte skip', '0')), 0)
+
+    # Decompress data if needed
+    encoding = header.get('encoding', 'raw')
+    if encoding in ['gzip', 'gz']:
+      filePath = self.decompressData(filePath, dataOffset, cacheDirectory)
+      dataOffset = 0
+    elif encoding != 'raw':
+      raise ValueError('Unsupported NRRD encoding: ' + encoding)
+
+    # Map data
+    self.frameData = np.memmap(filePath, dtype = dataType, mode = 'r', offset = dataOffset, shape = shape)
+
+    # Frame timestamps
+    numFrames = shape[0]
+    indexValues = header.get('axis 0 index values', None)
+    if indexValues:
+      self.frameTimestamps = np.array([float(value) for value in indexValues.split()])
+    else:
+      self.frameTimestamps = np.arange(numFrames, dtype = float)
+    if len(self.frameTimestamps) != numFrames:
+      raise ValueError('Number of frame timestamps does not match number of frames')
+
+    # Frame geometry
+    self.ijkToRasMatrix = self.getIJKToRASMatrixFromHeader(header)
+
+  #------------------------------------------------------------------------------
+  def getIJKToRASMatrixFromHeader(self, header):
+    """
+    Compute IJK to RAS matrix from NRRD space fields.
+    :param header: NRRD header fields (dict)
+    :return 4x4 matrix (numpy array)
+    """
+    ijkToRasMatrix = np.eye(4)
+    if 'space directions' not in header:
+      return ijkToRasMatrix
+
+    # Spatial axis directions (skip 'none' entries of non-spatial axes)
+    directions = list()
+    for direction in header['space directions'].split():
+      if direction == 'none':
+        continue
+      directions.append(direction)
+    directions = ' '.join(directions).replace('(', ' ').replace(')', ' ').replace(',', ' ').split()
+    directions = np.array([float(value) for value in directions]).reshape(-1, 3)
+    ijkToRasMatrix[0:3, 0:directions.shape[0]] = directions.T[:, 0:3]
+
+    # Origin
+    if 'space origin' in header:
+      origin = header['space origin'].replace('(', ' ').replace(')', ' ').replace(',', ' ').split()
+      ijkToRasMatrix[0:3, 3] = [float(value) for value in origin]
+
+    # Convert LPS to RAS
+    if header.get('space', '') in ['left-posterior-superior', 'LPS']:
+      ijkToRasMatrix = np.diag([-1, -1, 1, 1]).dot(ijkToRasMatrix)
+    return ijkToRasMatrix
+
+  #------------------------------------------------------------------------------
+  def decompressData(self, filePath, dataOffset, cacheDirectory):
+    """
+    Decompress gzip-encoded NRRD data into a raw file. Data are streamed to keep memory usage low.
+    :param filePath: path to file containing compressed data (string)
+    :param dataOffset: byte offset of compressed data (int)
+    :param cacheDirectory: output folder (string)
+    :return path to decompressed file (string)
+    """
+    rawFilePath = os.path.join(cacheDirectory, os.path.basename(filePath) + '.raw')
+    if os.path.isfile(rawFilePath) and (os.path.getmtime(rawFilePath) >= os.path.getmtime(filePath)):
+      return rawFilePath # already decompressed
+    if not os.path.exists(cacheDirectory):
+      os.makedirs(cacheDirectory)
+    # Data may be followed by other content (e.g. when stored inside an archive), so stop at end of gzip stream
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    with open(filePath, 'rb') as inputFile, open(rawFilePath + '.tmp', 'wb') as outputFile:
+      inputFile.seek(dataOffset)
+      while not decompressor.eof:
+        compressedChunk = inputFile.read(16 * 1024 * 1024)
+        if not compressedChunk:
+          break
+        outputFile.write(decompressor.decompress(compressedChunk))
+    os.replace(rawFilePath + '.tmp', rawFilePath)
+    return rawFilePath
+
+  #------------------------------------------------------------------------------
+  def extractArchiveMember(self, archive, memberInfo, cacheDirectory):
+    """
+    Extract archive member into cache folder, unless already extracted.
+    :param archive: open archive (zipfile.ZipFile)
+    :param memberInfo: member to extract (zipfile.ZipInfo)
+    :param cacheDirectory: output folder (string)
+    :return path to extracted file (string)
+    """
+    extractedFilePath = os.path.join(cacheDirectory, os.path.basename(memberInfo.filename))
+    if os.path.isfile(extractedFilePath) and (os.path.getsize(extractedFilePath) == memberInfo.file_size):
+      return extractedFilePath # already extracted
+    if not os.path.exists(cacheDirectory):
+      os.makedirs(cacheDirectory)
+    with archive.open(memberInfo) as inputFile, open(extractedFilePath + '.tmp', 'wb') as outputFile:
+      shutil.copyfileobj(inputFile, outputFile, 16 * 1024 * 1024)
+    os.replace(extractedFilePath + '.tmp', extractedFilePath)
+    return extractedFilePath
@@ -3,7 +3,13 @@ import logging
 import os
 import numpy as np
 import json
-import shutil
+from .RecordingCatalog import RecordingCatalog
+from .IDAllocator import IDAllocator
+from .ParticipantSearchIndex import ParticipantSearchIndex
+from .MetricResultsCache import MetricResultsCache
+from .DatabaseArchive import DatabaseArchive
+from .FolderDeleter import FolderDeleter
+from .RecordingDetailsLoader import RecordingDetailsLoader
 
 # TrainUS parameters
 import TrainUSLib.TrainUSParameters as Parameters
@@ -20,11 +26,47 @@ class RecordingManager():
 
   Data is stored in a root directory where different subfolders are created for parti-
   cipants and recordings, with JSON files to store participant and recording details.
+  Participant and recording listings are read from a SQLite catalog in the root directory,
+  which is kept in sync with the JSON files, and cached in memory until a change is detected
+  in the root directory (by directory modification time or file system watcher).
   """
   def __init__(self):
   	# Root directory
     self.rootDirectory = ''
 
+    # Catalog of participants and recordings
+    self.catalog = RecordingCatalog()
+
+    # Allocator of unique participant/recording IDs
+    self.idAllocator = IDAllocator()
+
+    # Metric results stored in recording folders
+    self.metricResultsCache = MetricResultsCache()
+
+    # Export/import of database archives
+    self.databaseArchive = DatabaseArchive(self)
+
+    # Background deletion of participant/recording folders
+    self.folderDeleter = FolderDeleter()
+
+    # Background computation of recording details. The callback is set by the GUI to update the table
+    self.recordingDetailsLoader = RecordingDetailsLoader()
+    self.recordingDetailsLoader.resultCallback = self.onRecordingDetailsLoaded
+    self.recordingDetailsCallback = None
+
+    # In-memory cache of participants and recordings
+    self.participantInfo_cache = None
+    self.recordingInfo_cache = dict()
+    self.directoryMTimes = dict()
+
+    # Search index of participants, built on first search
+    self.participantSearchIndex = ParticipantSearchIndex()
+
+    # Watcher to detect changes made to the root directory and info files by other applications
+    self.fileSystemWatcher = qt.QFileSystemWatcher()
+    self.fileSystemWatcher.connect('directoryChanged(QString)', self.onWatchedDirectoryChanged)
+    self.fileSystemWatcher.connect('fileChanged(QString)', self.onWatchedFileChanged)
+
   #------------------------------------------------------------------------------
   #
   # Read root directory
@@ -40,6 +82,23 @@ class RecordingManager():
 
     self.rootDirectory = dataPath
 
+    # Reset cache
+    self.clearCache()
+    watchedDirectories = self.fileSystemWatcher.directories()
+    if watchedDirectories:
+      self.fileSystemWatcher.removePaths(watchedDirectories)
+    watchedFiles = self.fileSystemWatcher.files()
+    if watchedFiles:
+      self.fileSystemWatcher.removePaths(watchedFiles)
+    self.fileSystemWatcher.addPath(self.rootDirectory)
+
+    # Open catalog, rebuilding it from the info files if it is new or outdated
+    if self.catalog.open(self.rootDirectory):
+      self.rebuildCatalog()
+
+    # Retry removal of folders deleted in previous sessions
+    self.folderDeleter.deleteTombstones(self.rootDirectory)
+
   #------------------------------------------------------------------------------
   def getRootDirectory(self):
     """
@@ -60,6 +119,14 @@ class RecordingManager():
     """
     logging.debug('RecordingManager.readRootDirectory')
 
+    # Get participants from cache, synchronizing catalog first if root directory was modified
+    if self.catalog.isOpen():
+      if self.isDirectoryModified(self.rootDirectory):
+        self.synchronizeParticipants()
+      if self.participantInfo_cache is None:
+        self.participantInfo_cache = self.catalog.getParticipants()
+      return [dict(participantInfo) for participantInfo in self.participantInfo_cache]
+
     # Get list of participant IDs
     participantID_list = self.getListOfFoldersInDirectory(self.rootDirectory)
 
@@ -89,6 +156,14 @@ class RecordingManager():
     """
     logging.debug('RecordingManager.readParticipantDirectory')
 
+    # Get recordings from cache, synchronizing catalog first if participant directory was modified
+    if self.catalog.isOpen():
+      if self.isDirectoryModified(os.path.join(self.rootDirectory, participantID)):
+        self.synchronizeRecordings(participantID)
+      if participantID not in self.recordingInfo_cache:
+        self.recordingInfo_cache[participantID] = self.catalog.getRecordings(participantID)
+      return [dict(recordingInfo) for recordingInfo in self.recordingInfo_cache[participantID]]
+
     # Get participant directory
     participantDirectory = os.path.join(self.rootDirectory, participantID)
 
@@ -111,10 +186,54 @@ class RecordingManager():
 
     return recordingInfo_list  
 
+  #------------------------------------------------------------------------------
+  def searchParticipants(self, searchText = '', sortColumn = 'id', descending = False):
+    """
+    Gets participants whose name, surname, email or ID contain all words of the search text
+    (ignoring case and accents), sorted by the given column.
+
+    :param searchText: filter input text (string)
+    :param sortColumn: participant info key used to sort the results (string)
+    :param descending: sort in descending order (bool)
+
+    :return list of dictionaries containing the information of all participants matching search criteria (list)
+    """
+    logging.debug('RecordingManager.searchParticipants')
+
+    # Get all participants (synchronizes index if root directory was modified)
+    participantInfo_list = self.readRootDirectory()
+
+    # Filter participants using search index
+    if searchText.strip() != '':
+      if not self.participantSearchIndex.isBuilt:
+        self.participantSearchIndex.build(participantInfo_list)
+      participantID_set = self.participantSearchIndex.search(searchText)
+      participantInfo_list = [participantInfo for participantInfo in participantInfo_list if participantInfo['id'] in participantID_set]
+
+    # Sort (participants are sorted by ID by default)
+    if (sortColumn != 'id') or descending:
+      participantInfo_list.sort(key = lambda participantInfo: str(participantInfo.get(sortColumn, '')).lower(), reverse = descending)
+    return participantInfo_list
+
+  #------------------------------------------------------------------------------
+  def rebuildCatalog(self):
+    """
+    Rebuilds the catalog of participants and recordings from the JSON info files in the root directory.
+    Use to recover from a missing or corrupted catalog, or after modifying the root directory manually.
+    """
+    logging.debug('RecordingManager.rebuildCatalog')
+
+    self.catalog.clear()
+    self.clearCache()
+    self.synchronizeParticipants()
+    for participantID in self.catalog.getParticipantInfoFileMTimes().keys():
+      self.synchronizeRecordings(participantID)
+
   #------------------------------------------------------------------------------
   def getListOfFoldersInDirectory(self, directory):
     """
-    Gets list of folders contained in input directory.
+    Gets list of folders contained in input directory. Hidden folders (e.g. deleted folders waiting
+    to be removed) are skipped.
 
     :param directory: input directory (string)
 
@@ -126,7 +245,7 @@ class RecordingManager():
     fullpaths = map(lambda name: os.path.join(directory, name), dirfiles)
     folderList = []
     for fileID, filePath in enumerate(fullpaths):
-      if os.path.isdir(filePath): 
+      if os.path.isdir(filePath) and not dirfiles[fileID].startswith('.'):
         folderList.append(dirfiles[fileID])
     return list(folderList)
 
@@ -142,9 +261,8 @@ class RecordingManager():
     """
     logging.debug('RecordingManager.filterParticipantInfoListFromSearchText')
 
-    # Convert input search text to lower case
-    ## TODO: Convert text to account for accents and other symbols
-    searchText = searchText.lower()
+    # Convert input search text to lower case without accents
+    searchText = self.participantSearchIndex.normalizeText(searchText)
 
     # Get number of participants in input list
     numParticipants = len(participantInfo_list)
@@ -156,12 +274,184 @@ class RecordingManager():
         participantName = participantInfo_list[participantPos]['name'] # Get name
         participantSurname = participantInfo_list[participantPos]['surname'] # Get surname
         participantString = participantName + ' ' + participantSurname # Create single string with participant name and surname
-        participantString = participantString.lower() # convert to lower case
+        participantString = self.participantSearchIndex.normalizeText(participantString) # convert to lower case without accents
         if searchText in participantString: # keep participants meeting search criteria
           participantInfoFiltered_list.append(participantInfo_list[participantPos])
     return participantInfoFiltered_list  
 
   
+  #------------------------------------------------------------------------------
+  #
+  # Cache of participants and recordings
+  #
+  #------------------------------------------------------------------------------
+
+  #------------------------------------------------------------------------------
+  def clearCache(self):
+    """
+    Clears in-memory cache so that participants and recordings are read again from the catalog.
+    """
+    self.participantInfo_cache = None
+    self.recordingInfo_cache = dict()
+    self.directoryMTimes = dict()
+    self.participantSearchIndex.clear()
+
+  #------------------------------------------------------------------------------
+  def getFileMTime(self, filePath):
+    """
+    Gets modification time of a file or directory.
+
+    :param filePath: path to file or directory (string)
+
+    :return modification time, or None if the path does not exist (float)
+    """
+    try:
+      return os.stat(filePath).st_mtime
+    except OSError:
+      return None
+
+  #------------------------------------------------------------------------------
+  def isDirectoryModified(self, directory):
+    """
+    Checks if folders were added to or removed from a directory since it was last synchronized. Info
+    files modified in place are detected by the file system watcher, which invalidates the directory.
+
+    :param directory: path to directory (string)
+
+    :return True if directory was modified (bool)
+    """
+    return self.getFileMTime(directory) != self.directoryMTimes.get(directory)
+
+  #------------------------------------------------------------------------------
+  def onWatchedDirectoryChanged(self, directory):
+    """
+    Invalidates cached modification time of a watched directory so that it is synchronized when read.
+
+    :param directory: path to directory (string)
+    """
+    logging.debug('RecordingManager.onWatchedDirectoryChanged')
+
+    self.directoryMTimes.pop(directory, None)
+
+  #------------------------------------------------------------------------------
+  def onWatchedFileChanged(self, filePath):
+    """
+    Invalidates cached modification time of the directory containing the folder of a modified info
+    file, so that the file is read again when the directory is read.
+
+    :param filePath: path to participant or recording info file (string)
+    """
+    logging.debug('RecordingManager.onWatchedFileChanged')
+
+    self.directoryMTimes.pop(os.path.dirname(os.path.dirname(filePath)), None)
+
+    # Files replaced by other applications are no longer watched
+    if os.path.exists(filePath) and (filePath not in self.fileSystemWatcher.files()):
+      self.fileSystemWatcher.addPath(filePath)
+
+  #------------------------------------------------------------------------------
+  def watchInfoFiles(self, infoFilePaths):
+    """
+    Watches info files, so that modifications made by other applications are detected.
+
+    :param infoFilePaths: paths to participant or recording info files (list)
+    """
+    watchedFiles = set(self.fileSystemWatcher.files())
+    newFilePaths = [filePath for filePath in infoFilePaths if filePath not in watchedFiles]
+    if newFilePaths:
+      self.fileSystemWatcher.addPaths(newFilePaths)
+
+  #------------------------------------------------------------------------------
+  def synchronizeParticipants(self):
+    """
+    Updates catalog with participants added, modified or removed in the root directory. Only the
+    info files modified since they were added to the catalog are read. The directory is synchronized
+    again next time if a participant folder has no info file yet (e.g. folder being created).
+    """
+    logging.debug('RecordingManager.synchronizeParticipants')
+
+    self.directoryMTimes[self.rootDirectory] = self.getFileMTime(self.rootDirectory)
+    catalogMTimes = self.catalog.getParticipantInfoFileMTimes()
+    try:
+      participantID_list = self.getListOfFoldersInDirectory(self.rootDirectory)
+    except OSError:
+      logging.error('Cannot read root directory ' + self.rootDirectory)
+      return
+
+    # Added or modified participants
+    participantEntries = list()
+    infoFilePaths = list()
+    for participantID in participantID_list:
+      participantInfoFilePath = self.getParticipantInfoFilePath(participantID)
+      infoFileMTime = self.getFileMTime(participantInfoFilePath)
+      if infoFileMTime is None:
+        self.directoryMTimes.pop(self.rootDirectory, None)
+        continue
+      infoFilePaths.append(participantInfoFilePath)
+      if catalogMTimes.get(participantID) == infoFileMTime:
+        continue
+      participantInfo = self.readParticipantInfoFile(participantInfoFilePath)
+      if participantInfo is not None:
+        participantEntries.append((participantInfo, infoFileMTime))
+    self.catalog.upsertParticipants(participantEntries)
+    self.watchInfoFiles(infoFilePaths)
+    if self.participantSearchIndex.isBuilt:
+      for participantInfo, infoFileMTime in participantEntries:
+        self.participantSearchIndex.addParticipant(participantInfo)
+
+    # Removed participants
+    for participantID in set(catalogMTimes.keys()) - set(participantID_list):
+      self.catalog.deleteParticipant(participantID)
+      self.recordingInfo_cache.pop(participantID, None)
+      self.participantSearchIndex.removeParticipant(participantID)
+
+    self.participantInfo_cache = None
+
+  #------------------------------------------------------------------------------
+  def synchronizeRecordings(self, participantID):
+    """
+    Updates catalog with recordings added, modified or removed in a participant directory. Only the
+    info files modified since they were added to the catalog are read. The directory is synchronized
+    again next time if a recording folder has no info file yet (e.g. folder being created).
+
+    :param participantID: participant ID (string)
+    """
+    logging.debug('RecordingManager.synchronizeRecordings')
+
+    participantDirectory = os.path.join(self.rootDirectory, participantID)
+    self.directoryMTimes[participantDirectory] = self.getFileMTime(participantDirectory)
+    if participantDirectory not in self.fileSystemWatcher.directories():
+      self.fileSystemWatcher.addPath(participantDirectory)
+    catalogMTimes = self.catalog.getRecordingInfoFileMTimes(participantID)
+    try:
+      recordingID_list = self.getListOfFoldersInDirectory(participantDirectory)
+    except OSError:
+      recordingID_list = list()
+
+    # Added or modified recordings
+    recordingEntries = list()
+    infoFilePaths = list()
+    for recordingID in recordingID_list:
+      recordingInfoFilePath = self.getRecordingInfoFilePath(participantID, recordingID)
+      infoFileMTime = self.getFileMTime(recordingInfoFilePath)
+      if infoFileMTime is None:
+        self.directoryMTimes.pop(participantDirectory, None)
+        continue
+      infoFilePaths.append(recordingInfoFilePath)
+      if catalogMTimes.get(recordingID) == infoFileMTime:
+        continue
+      recordingInfo = self.readRecordingInfoFile(recordingInfoFilePath)
+      if recordingInfo is not None:
+        recordingEntries.append((recordingInfo, infoFileMTime))
+    self.catalog.upsertRecordings(participantID, recordingEntries)
+    self.watchInfoFiles(infoFilePaths)
+
+    # Removed recordings
+    for recordingID in set(catalogMTimes.keys()) - set(recordingID_list):
+      self.catalog.deleteRecording(participantID, recordingID)
+
+    self.recordingInfo_cache.pop(participantID, None)
+
   #------------------------------------------------------------------------------
   #
   # Read/write JSON info files
@@ -221,6 +511,13 @@ class RecordingManager():
         json.dump(participantInfo, outputFile, indent = 4)
     except:
       logging.error('Cannot write participant information into JSON file at ' + filePath)      
+      return
+
+    # Update catalog and search index
+    self.catalog.upsertParticipants([(participantInfo, self.getFileMTime(filePath))])
+    self.participantInfo_cache = None
+    if self.participantSearchIndex.isBuilt:
+      self.participantSearchIndex.addParticipant(participantInfo)
 
   #------------------------------------------------------------------------------
   def writeRecordingInfoFile(self, filePath, recordingInfo):
@@ -237,8 +534,269 @@ class RecordingManager():
         json.dump(recordingInfo, outputFile, indent = 4)
     except:
       logging.error('Cannot write recording information into JSON file at ' + filePath)
+      return
+
+    # Update catalog (file is stored in <root>/<participantID>/<recordingID>/)
+    participantID = os.path.basename(os.path.dirname(os.path.dirname(filePath)))
+    self.catalog.upsertRecordings(participantID, [(recordingInfo, self.getFileMTime(filePath))])
+    self.recordingInfo_cache.pop(participantID, None)
 
 
+  #------------------------------------------------------------------------------
+  #
+  # Read/write tracking data files
+  #
+  #------------------------------------------------------------------------------
+
+  #------------------------------------------------------------------------------
+  def getTrackingDataFilePath(self, recordingFilePath, fileFormat = 'npz'):
+    """
+    Gets path to the tracking data file stored next to a recording file.
+
+    :param recordingFilePath: path to recording .sqbr file (string)
+    :param fileFormat: file format, 'npz', 'hdf5' or 'parquet' (string)
+
+    :return path to tracking data file (string)
+    """
+    fileExtensions = {'npz': '.npz', 'hdf5': '.h5', 'parquet': '.parquet'}
+    return os.path.splitext(recordingFilePath)[0] + '_Tracking' + fileExtensions[fileFormat]
+
+  #------------------------------------------------------------------------------
+  def findTrackingDataFilePath(self, recordingFilePath):
+    """
+    Finds the tracking data file stored next to a recording file, in any of the supported formats.
+
+    :param recordingFilePath: path to recording .sqbr file (string)
+
+    :return path to tracking data file, or None if not found (string)
+    """
+    for fileFormat in ['npz', 'hdf5', 'parquet']:
+      filePath = self.getTrackingDataFilePath(recordingFilePath, fileFormat)
+      if os.path.isfile(filePath):
+        return filePath
+    return None
+
+  #------------------------------------------------------------------------------
+  def writeTrackingDataFile(self, recordingFilePath, timestamps, transforms, recordingInfo, fileFormat = 'npz'):
+    """
+    Writes tracking data of a recording into a columnar file next to the recording file, so
+    that kinematics can be analysed without loading the recording in Slicer.
+
+    Contents:
+      - 'timestamps': timestamp of each sample, shape (N,)
+      - one (N,4,4) array per transform, named 'transform_<TransformName>' in NPZ files and
+        'transforms/<TransformName>' in HDF5 files. Parquet files store one column per matrix
+        element, named '<TransformName>_<row><column>'.
+      - 'metadata': recording info as JSON string (array in NPZ, attribute in HDF5, schema
+        metadata in Parquet)
+
+    :param recordingFilePath: path to recording .sqbr file (string)
+    :param timestamps: sample timestamps (numpy array)
+    :param transforms: (N,4,4) array for each transform name (dict)
+    :param recordingInfo: recording information (dict)
+    :param fileFormat: file format, 'npz', 'hdf5' or 'parquet' (string)
+
+    :return path to tracking data file (string)
+    """
+    logging.debug('RecordingManager.writeTrackingDataFile')
+
+    if timestamps is None:
+      logging.error('No tracking data to write for recording ' + recordingFilePath)
+      return None
+
+    filePath = self.getTrackingDataFilePath(recordingFilePath, fileFormat)
+    metadata = json.dumps(recordingInfo)
+    try:
+      if fileFormat == 'hdf5':
+        import h5py
+        with h5py.File(filePath, 'w') as outputFile:
+          outputFile.create_dataset('timestamps', data = timestamps)
+          for transformName, transformArray in transforms.items():
+            outputFile.create_dataset('transforms/' + transformName, data = transformArray, compression = 'gzip')
+          outputFile.attrs['metadata'] = metadata
+      elif fileFormat == 'parquet':
+        import pyarrow
+        import pyarrow.parquet
+        columns = {'timestamps': timestamps}
+        for transformName, transformArray in transforms.items():
+          for row in range(4):
+            for column in range(4):
+              columns['{}_{}{}'.format(transformName, row, column)] = transformArray[:, row, column]
+        table = pyarrow.table(columns).replace_schema_metadata({'metadata': metadata})
+        pyarrow.parquet.write_table(table, filePath)
+      else:
+        arrays = {'timestamps': timestamps, 'metadata': np.array(metadata)}
+        for transformName, transformArray in transforms.items():
+          arrays['transform_' + transformName] = transformArray
+        np.savez_compressed(filePath, **arrays)
+    except ImportError:
+      logging.error('Python package required to write tracking data in ' + fileFormat + ' format is not installed')
+      return None
+    except:
+      logging.error('Cannot write tracking data file at ' + filePath)
+      return None
+    return filePath
+
+  #------------------------------------------------------------------------------
+  def readTrackingDataFile(self, filePath):
+    """
+    Reads tracking data from a file written by writeTrackingDataFile. Format is given by the file extension.
+
+    :param filePath: path to tracking data file (string)
+
+    :return timestamps (numpy array), (N,4,4) array for each transform name (dict), and recording info (dict)
+    """
+    logging.debug('RecordingManager.readTrackingDataFile')
+
+    timestamps = None
+    transforms = dict()
+    recordingInfo = None
+    try:
+      if filePath.endswith('.h5'):
+        import h5py
+        with h5py.File(filePath, 'r') as inputFile:
+          timestamps = inputFile['timestamps'][()]
+          for transformName in inputFile['transforms'].keys():
+            transforms[transformName] = inputFile['transforms/' + transformName][()]
+          recordingInfo = json.loads(inputFile.attrs['metadata'])
+      elif filePath.endswith('.parquet'):
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(filePath)
+        timestamps = table.column('timestamps').to_numpy()
+        for columnName in table.column_names:
+          if columnName.endswith('_00'):
+            transformName = columnName[:-len('_00')]
+            transformArray = np.zeros((len(timestamps), 4, 4))
+            for row in range(4):
+              for column in range(4):
+                transformArray[:, row, column] = table.column('{}_{}{}'.format(transformName, row, column)).to_numpy()
+            transforms[transformName] = transformArray
+        recordingInfo = json.loads(table.schema.metadata[b'metadata'])
+      else:
+        with np.load(filePath) as inputFile:
+          timestamps = inputFile['timestamps']
+          for arrayName in inputFile.files:
+            if arrayName.startswith('transform_'):
+              transforms[arrayName[len('transform_'):]] = inputFile[arrayName]
+          recordingInfo = json.loads(str(inputFile['metadata']))
+    except:
+      logging.error('Cannot read tracking data file at ' + filePath)
+    return timestamps, transforms, recordingInfo
+
+  #------------------------------------------------------------------------------
+  #
+  # Read/write metric files
+  #
+  #------------------------------------------------------------------------------
+
+  #------------------------------------------------------------------------------
+  def getRecordingMetricsFilePath(self, participantID, recordingID):
+    """
+    Get path to the file storing real-time metrics computed for a recording.
+
+    :param participantID: participant ID (string)
+    :param recordingID: recording ID (string)
+
+    :return path to metrics file (string)
+    """
+    return os.path.join(self.rootDirectory, participantID, recordingID, MetricResultsCache.METRICS_ARRAY_FILE_NAME)
+
+  #------------------------------------------------------------------------------
+  def readRecordingMetricsFile(self, filePath):
+    """
+    Reads real-time metrics stored in the recording folder by the metric results cache.
+
+    :param filePath: path to metrics file (string)
+
+    :return timestamps (numpy array) and metric values for each metric name (dict)
+    """
+    logging.debug('RecordingManager.readRecordingMetricsFile')
+
+    return self.metricResultsCache.readMetricArrays(filePath)
+
+  #------------------------------------------------------------------------------
+  #
+  # Recording details computed in the background
+  #
+  #------------------------------------------------------------------------------
+
+  #------------------------------------------------------------------------------
+  def getRecordingDetails(self, participantID):
+    """
+    Gets details of the recordings of a participant (file size, number of frames, trimmed duration
+    and score) stored in the catalog. Recordings whose details were never computed are not included.
+
+    :param participantID: participant ID (string)
+
+    :return details for each recording ID (dict)
+    """
+    logging.debug('RecordingManager.getRecordingDetails')
+
+    return self.catalog.getRecordingDetails(participantID)
+
+  #------------------------------------------------------------------------------
+  def requestRecordingDetails(self, participantID, recordingInfo_list, cancelPreviousRequests = True):
+    """
+    Requests computation of recording details in the background. Details stored in the catalog are
+    reused if the recording folder did not change. Results are stored in the catalog and passed to
+    recordingDetailsCallback(participantID, recordingID, details).
+
+    :param participantID: participant ID (string)
+    :param recordingInfo_list: recordings to compute details for (list)
+    :param cancelPreviousRequests: discard requests for other recordings that were not processed yet (bool)
+    """
+    logging.debug('RecordingManager.requestRecordingDetails')
+
+    if cancelPreviousRequests:
+      self.recordingDetailsLoader.cancelRequests()
+    details_dict = self.catalog.getRecordingDetails(participantID)
+    for recordingInfo in recordingInfo_list:
+      recordingDirectory = os.path.join(self.rootDirectory, participantID, recordingInfo['id'])
+      self.recordingDetailsLoader.requestDetails(participantID, recordingInfo['id'], recordingDirectory, details_dict.get(recordingInfo['id']))
+
+  #------------------------------------------------------------------------------
+  def getRecordingsWithDetails(self, participantID = None):
+    """
+    Gets recordings with their details stored in the catalog, of a participant or of all participants.
+    Details of recordings that were never computed, or computed without overall metrics, are requested
+    in the background.
+
+    :param participantID: participant ID, or None for all participants (string)
+
+    :return (participant ID, recording ID, date, time, exercise, details or None) tuples (list)
+    """
+    logging.debug('RecordingManager.getRecordingsWithDetails')
+
+    if participantID is None:
+      for participantInfo in self.readRootDirectory():
+        self.readParticipantDirectory(participantInfo['id']) # synchronize catalog
+    else:
+      self.readParticipantDirectory(participantID)
+    recordings = self.catalog.getRecordingsWithDetails(participantID)
+
+    # Request missing details
+    missingRecordingInfo_dict = dict()
+    for recordingParticipantID, recordingID, date, time, exercise, details in recordings:
+      if (details is None) or ('overallMetrics' not in details):
+        missingRecordingInfo_dict.setdefault(recordingParticipantID, list()).append({'id': recordingID})
+    for recordingParticipantID, recordingInfo_list in missingRecordingInfo_dict.items():
+      self.requestRecordingDetails(recordingParticipantID, recordingInfo_list, cancelPreviousRequests = False)
+    return recordings
+
+  #------------------------------------------------------------------------------
+  def onRecordingDetailsLoaded(self, participantID, recordingID, details):
+    """
+    Stores recording details computed in the background and notifies the GUI.
+
+    :param participantID: participant ID (string)
+    :param recordingID: recording ID (string)
+    :param details: recording details (dict)
+    """
+    if self.catalog.getRecordingDetails(participantID).get(recordingID) != details:
+      self.catalog.upsertRecordingDetails(participantID, recordingID, details)
+    if self.recordingDetailsCallback:
+      self.recordingDetailsCallback(participantID, recordingID, details)
+
   #------------------------------------------------------------------------------
   #
   # Get participant/recording info from ID
@@ -466,7 +1024,7 @@ class RecordingManager():
   #------------------------------------------------------------------------------
   def deleteParticipant(self, participantID):
     """
-    Delete participant from root directory.
+    Delete participant from root directory. The folder is renamed at once and removed in the background.
 
     :param participantID: participant ID (string)
     """
@@ -479,11 +1037,16 @@ class RecordingManager():
     # Participant directory
     participantDirectory = os.path.join(self.rootDirectory, participantID)
 
-    # Delete folder
-    try:
-      shutil.rmtree(participantDirectory, ignore_errors=True)
-    except:
+    # Delete folder in the background
+    if not self.folderDeleter.deleteFolder(participantDirectory):
       logging.error('ERROR: Participant folder could not be deleted.')
+      return
+
+    # Update catalog and search index
+    self.catalog.deleteParticipant(participantID)
+    self.participantInfo_cache = None
+    self.recordingInfo_cache.pop(participantID, None)
+    self.participantSearchIndex.removeParticipant(participantID)
 
   #------------------------------------------------------------------------------
   def deleteSelectedParticipant(self):
@@ -504,7 +1067,7 @@ class RecordingManager():
   #------------------------------------------------------------------------------
   def deleteRecording(self, participantID, recordingID):
     """
-    Delete recording from root directory.
+    Delete recording from root directory. The folder is renamed at once and removed in the background.
 
     :param participantID: participant ID (string)
     :param recordingID: recording ID (string)
@@ -519,11 +1082,14 @@ class RecordingManager():
     participantDirectory = os.path.join(self.rootDirectory, participantID)
     recordingDirectory = os.path.join(participantDirectory, recordingID)
 
-    # Delete folder
-    try:
-      shutil.rmtree(recordingDirectory, ignore_errors=True)
-    except:
+    # Delete folder in the background
+    if not self.folderDeleter.deleteFolder(recordingDirectory):
       logging.error('ERROR: Recording folder could not be deleted.')
+      return
+
+    # Update catalog
+    self.catalog.deleteRecording(participantID, recordingID)
+    self.recordingInfo_cache.pop(participantID, None)
 
   #------------------------------------------------------------------------------
   def deleteSelectedRecording(self):
@@ -563,30 +1129,12 @@ class RecordingManager():
     """
     logging.debug('RecordingManager.createNewParticipant')
 
-    # Get data from directory
-    participantInfo_list = self.readRootDirectory()
-
-    # Get existing participant IDs
-    numParticipants = len(participantInfo_list)
-    participantID_list = []
-    for participant in range(numParticipants):
-      participantID_list.append(participantInfo_list[participant]['id'])
-
-    # Generate new participant ID (TODO: improve to ensure uniqueness)
-    participantID_array = np.array(participantID_list).astype(int)
-    try:
-      maxParticipantID = np.max(participantID_array)
-    except:
-      maxParticipantID = 0
-    newParticipantID = str("{:05d}".format(maxParticipantID + 1)) # leading zeros, 5 digits
-
-    # Create participant folder
-    participantDirectory = os.path.join(self.rootDirectory, str(newParticipantID))
-    try:
-      os.makedirs(participantDirectory)    
-      logging.debug('Participant folder was created.')
-    except FileExistsError:
+    # Generate new participant ID and create participant folder
+    newParticipantID = self.idAllocator.allocateID(self.rootDirectory, prefix = '', numDigits = 5) # leading zeros, 5 digits
+    if newParticipantID is None:
       logging.error('New participant folder could not be created.')
+      return None
+    logging.debug('Participant folder was created.')
 
     # Create participant info dictionary
     participantInfo = {}
@@ -621,37 +1169,19 @@ class RecordingManager():
     # Get selected participant and recording
     selectedParticipantID = self.getSelectedParticipantID()
 
-    # Get existing recordings from directory
-    recordingInfo_list = self.readParticipantDirectory(selectedParticipantID)
-
-    # Get existing recording IDs
-    numRecordings = len(recordingInfo_list)
-    recordingID_list = []
-    for recording in range(numRecordings):
-      recordingID_list.append(recordingInfo_list[recording]['id'][1:])
-
-    # Generate new recording ID (TODO: improve to ensure uniqueness)
-    recordingID_array = np.array(recordingID_list).astype(int)
-    try:
-      maxRecordingID = np.max(recordingID_array)
-    except:
-      maxRecordingID = 0
-    newRecordingID = str("R{:05d}".format(maxRecordingID + 1)) # leading zeros, 5 digits
+    # Generate new recording ID and create recording folder
+    participantDirectory = os.path.join(self.rootDirectory, selectedParticipantID)
+    newRecordingID = self.idAllocator.allocateID(participantDirectory, prefix = 'R', numDigits = 5) # leading zeros, 5 digits
+    if newRecordingID is None:
+      logging.error('New recording folder could not be created.')
+      return None
+    logging.debug('Recording folder was created.')
 
     # Get current date and time
     from datetime import datetime
     dateLabel = datetime.now().strftime('%Y-%m-%d')
     timeLabel = datetime.now().strftime('%H:%M:%S')
 
-    # Create recording folder
-    participantDirectory = os.path.join(self.rootDirectory, selectedParticipantID)
-    recordingDirectory = os.path.join(participantDirectory, newRecordingID)
-    try:
-      os.makedirs(recordingDirectory)    
-      logging.debug('Recording folder was created.')
-    except FileExistsError:
-      logging.error('New recording folder could not be created.')
-
     # Create recording info dictionary
     recordingInfo = {}
     recordingInfo['id'] = newRecordingID
@@ -669,6 +1199,44 @@ class RecordingManager():
 
     return recordingInfo
 
+  #------------------------------------------------------------------------------
+  #
+  # Export/import database archives
+  #
+  #------------------------------------------------------------------------------
+
+  #------------------------------------------------------------------------------
+  def exportDatabaseArchive(self, archiveFilePath, selection = None):
+    """
+    Exports participants and recordings to a single archive file, with files compressed in parallel
+    and a manifest of checksums.
+
+    :param archiveFilePath: path to output archive (string)
+    :param selection: list of recording IDs to export for each participant ID (None to export all
+      recordings of the participant). All participants are exported if None (dict)
+
+    :return number of exported files, or None if export failed (int)
+    """
+    logging.debug('RecordingManager.exportDatabaseArchive')
+
+    return self.databaseArchive.exportArchive(archiveFilePath, selection)
+
+  #------------------------------------------------------------------------------
+  def importDatabaseArchive(self, archiveFilePath):
+    """
+    Imports participants and recordings from an archive file into the root directory. Participants and
+    recordings that already exist are merged, conflicting IDs are replaced by new ones, and files that
+    already exist are skipped. Existing files with a different checksum are reported as conflicts.
+
+    :param archiveFilePath: path to input archive (string)
+
+    :return number of imported participants, recordings, written files and skipped files, and paths of
+      conflicting files (dict), or None if import failed
+    """
+    logging.debug('RecordingManager.importDatabaseArchive')
+
+    return self.databaseArchive.importArchive(archiveFilePath)
+
   #------------------------------------------------------------------------------
   #
   # Edit existing participant info
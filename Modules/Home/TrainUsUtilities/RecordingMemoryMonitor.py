@@ -0,0 +1,451 @@
+from __main__ import vtk, qt, slicer
+import logging
+import io
+import os
+import zlib
+import shutil
+import zipfile
+import tempfile
+import numpy as np
+
+from .RecordingFrameCache import RecordingFrameCache
+
+# TrainUS parameters
+import TrainUSLib.TrainUSParameters as Parameters
+
+#------------------------------------------------------------------------------
+#
+# RecordingMemoryMonitor
+#
+#------------------------------------------------------------------------------
+class RecordingMemoryMonitor:
+  """
+  Monitors memory used by the sequences of a sequence browser node during recording.
+
+  Memory usage of each synchronized sequence is polled periodically and a warning is
+  shown when usage crosses a fraction of the memory budget. When the budget is exceeded,
+  the oldest frames of the image sequences are spilled to temporary files so that
+  recording can continue. Spilled frames stay on disk when the monitor is stopped, since
+  loading them back would exceed the budget again. They are streamed into the image
+  sequence files when the recording is saved, and are only loaded back into the sequences
+  if they fit within the memory budget.
+
+  Usage:
+    monitor = RecordingMemoryMonitor()
+    monitor.start(sequenceBrowserNode)  # when recording starts
+    monitor.stop()                      # when recording stops
+    monitor.insertSpilledFramesIntoArchive(sqbrFilePath, memberName, sequenceNode, timeRange)  # after saving
+    monitor.discardSpilledFrames()      # when recording is cleared
+  """
+
+  #------------------------------------------------------------------------------
+  def __init__(self):
+    # Sequence browser
+    self.sequenceBrowserNode = None
+
+    # Memory budget
+    self.memoryBudgetBytes = 2048 * 1024 * 1024
+    self.warningThresholds = [0.5, 0.75, 0.9]
+    self.reachedWarningThresholds = list()
+
+    # Memory usage per sequence, updated incrementally
+    self.sequenceBytes = dict()
+    self.numCountedItems = dict()
+    self.transformItemBytes = 1024
+
+    # Spilled image frames
+    self.spillChunkSize = 100
+    self.spillDirectory = None
+    self.spilledChunks = list() # [sequence node, chunk file path, bytes]
+
+    # Polling timer
+    self.pollingTimer = qt.QTimer()
+    self.pollingTimer.setInterval(1000)
+    self.pollingTimer.connect('timeout()', self.checkMemoryUsage)
+
+  #------------------------------------------------------------------------------
+  def setMemoryBudget(self, memoryBudgetMB):
+    """
+    Set memory budget for recorded sequences.
+    :param memoryBudgetMB: memory budget in megabytes (float)
+    """
+    self.memoryBudgetBytes = memoryBudgetMB * 1024 * 1024
+
+  #------------------------------------------------------------------------------
+  def getBytesPerSequence(self):
+    """
+    Get memory used by each sequence, not including spilled frames.
+    :return bytes for each sequence name (dict)
+    """
+    return dict(self.sequenceBytes)
+
+  #------------------------------------------------------------------------------
+  def getTotalBytes(self):
+    """
+    Get memory used by all sequences, not including spilled frames.
+    :return bytes (int)
+    """
+    return sum(self.sequenceBytes.values())
+
+  #------------------------------------------------------------------------------
+  def start(self, sequenceBrowserNode):
+    """
+    Start monitoring sequences of a sequence browser node.
+    :param sequenceBrowserNode: sequence browser being recorded (vtkMRMLSequenceBrowserNode)
+    """
+    self.stop()
+    self.sequenceBrowserNode = sequenceBrowserNode
+    try:
+      memoryBudgetMB = Parameters.instance.getParameterFloat(Parameters.RECORDING_MEMORY_BUDGET)
+      if memoryBudgetMB > 0:
+        self.setMemoryBudget(memoryBudgetMB)
+    except:
+      logging.error('Recording memory budget could not be read from parameter node. Using default value...')
+    self.reachedWarningThresholds = list()
+    self.sequenceBytes = dict()
+    self.numCountedItems = dict()
+    self.pollingTimer.start()
+
+  #------------------------------------------------------------------------------
+  def stop(self):
+    """
+    Stop monitoring. Spilled frames are kept on disk.
+    """
+    self.pollingTimer.stop()
+
+  #------------------------------------------------------------------------------
+  def hasSpilledFrames(self):
+    """
+    Check if image frames of the monitored sequences were spilled to disk.
+    :return result (bool)
+    """
+    return len(self.spilledChunks) > 0
+
+  #------------------------------------------------------------------------------
+  def discardSpilledFrames(self):
+    """
+    Remove spilled frames and their temporary files, e.g. when the recording is cleared.
+    """
+    self.stop()
+    self.spilledChunks = list()
+    if self.spillDirectory:
+      shutil.rmtree(self.spillDirectory, ignore_errors = True)
+      self.spillDirectory = None
+    self.sequenceBrowserNode = None
+
+  #------------------------------------------------------------------------------
+  def getSequenceNodes(self):
+    """
+    Get sequence nodes of the monitored sequence browser.
+    :return sequence nodes (list)
+    """
+    if not self.sequenceBrowserNode:
+      return list()
+    sequenceNodesCollection = vtk.vtkCollection()
+    self.sequenceBrowserNode.GetSynchronizedSequenceNodes(sequenceNodesCollection, True)
+    return [sequenceNodesCollection.GetItemAsObject(i) for i in range(sequenceNodesCollection.GetNumberOfItems())]
+
+  #------------------------------------------------------------------------------
+  def isImageSequence(self, sequenceNode):
+    """
+    Check if sequence contains image data.
+    :param sequenceNode: sequence node (vtkMRMLSequenceNode)
+    :return result (bool)
+    """
+    return 'Volume' in sequenceNode.GetDataNodeClassName()
+
+  #------------------------------------------------------------------------------
+  def getDataNodeBytes(self, sequenceNode, itemNumber):
+    """
+    Get memory used by an item of a sequence.
+    :param sequenceNode: sequence node (vtkMRMLSequenceNode)
+    :param itemNumber: item number (int)
+    :return bytes (int)
+    """
+    if not self.isImageSequence(sequenceNode):
+      return self.transformItemBytes
+    dataNode = sequenceNode.GetNthDataNode(itemNumber)
+    if not dataNode or not dataNode.GetImageData():
+      return 0
+    return dataNode.GetImageData().GetActualMemorySize() * 1024
+
+  #------------------------------------------------------------------------------
+  def updateMemoryUsage(self):
+    """
+    Update memory usage of each sequence. Only items added since the last update are inspected.
+    """
+    for sequenceNode in self.getSequenceNodes():
+      sequenceName = sequenceNode.GetName()
+      numItems = sequenceNode.GetNumberOfDataNodes()
+      numCountedItems = self.numCountedItems.get(sequenceName, 0)
+      sequenceBytes = self.sequenceBytes.get(sequenceName, 0)
+      for itemNumber in range(numCountedItems, numItems):
+        sequenceBytes += self.getDataNodeBytes(sequenceNode, itemNumber)
+      self.sequenceBytes[sequenceName] = sequenceBytes
+      self.numCountedItems[sequenceName] = numItems
+
+  #------------------------------------------------------------------------------
+  def checkMemoryUsage(self):
+    """
+    Warn when memory usage crosses a threshold and spill image frames when budget is exceeded.
+    """
+    if not self.sequenceBrowserNode:
+      return
+    self.updateMemoryUsage()
+    totalBytes = self.getTotalBytes()
+
+    # Warnings
+    for threshold in self.warningThresholds:
+      if (totalBytes >= threshold * self.memoryBudgetBytes) and (threshold not in self.reachedWarningThresholds):
+        self.reachedWarningThresholds.append(threshold)
+        message = 'Recording is using {:.0f} MB ({:.0f}% of memory budget).'.format(totalBytes / (1024 * 1024), 100 * threshold)
+        logging.warning('WARNING: ' + message)
+        slicer.util.showStatusMessage(message, 5000)
+
+    # Spill image frames
+    if totalBytes > self.memoryBudgetBytes:
+      self.spillOldestImageFrames(totalBytes - self.memoryBudgetBytes)
+
+  #------------------------------------------------------------------------------
+  def spillOldestImageFrames(self, bytesToRelease):
+    """
+    Move oldest frames of the image sequences to temporary files.
+    :param bytesToRelease: minimum number of bytes to release (int)
+    """
+    releasedBytes = 0
+    for sequenceNode in self.getSequenceNodes():
+      if not self.isImageSequence(sequenceNode) or (sequenceNode == self.sequenceBrowserNode.GetMasterSequenceNode()):
+        continue
+      while (releasedBytes < bytesToRelease) and (sequenceNode.GetNumberOfDataNodes() > 1):
+        chunkBytes = self.spillImageChunk(sequenceNode)
+        if chunkBytes == 0:
+          break
+        releasedBytes += chunkBytes
+    if releasedBytes > 0:
+      logging.debug('RecordingMemoryMonitor: {:.0f} MB of image frames spilled to disk'.format(releasedBytes / (1024 * 1024)))
+
+  #------------------------------------------------------------------------------
+  def spillImageChunk(self, sequenceNode):
+    """
+    Move a chunk of the oldest frames of an image sequence to a temporary file. The most recent
+    frame is always kept in memory. Chunks contain consecutive frames with the same shape.
+    :param sequenceNode: image sequence node (vtkMRMLSequenceNode)
+    :return bytes released (int)
+    """
+    # Spill directory
+    if not self.spillDirectory:
+      self.spillDirectory = tempfile.mkdtemp(prefix = 'TrainUS_RecordingSpill_', dir = slicer.app.temporaryPath)
+
+    # Read frames
+    numFramesToSpill = min(self.spillChunkSize, sequenceNode.GetNumberOfDataNodes() - 1)
+    indexValues = list()
+    frames = list()
+    ijkToRasMatrices = list()
+    for itemNumber in range(numFramesToSpill):
+      dataNode = sequenceNode.GetNthDataNode(itemNumber)
+      if not dataNode.GetImageData():
+        break
+      frame = slicer.util.arrayFromVolume(dataNode)
+      if frames and (frame.shape != frames[0].shape or frame.dtype != frames[0].dtype):
+        break
+      ijkToRasMatrix = vtk.vtkMatrix4x4()
+      dataNode.GetIJKToRASMatrix(ijkToRasMatrix)
+      indexValues.append(sequenceNode.GetNthIndexValue(itemNumber))
+      frames.append(frame)
+      ijkToRasMatrices.append(slicer.util.arrayFromVTKMatrix(ijkToRasMatrix))
+    if not frames:
+      return 0
+
+    # Write chunk
+    chunkFilePath = os.path.join(self.spillDirectory, '{}_{:05d}.npz'.format(sequenceNode.GetID(), len(self.spilledChunks)))
+    try:
+      np.savez(chunkFilePath, frames = np.stack(frames), indexValues = np.array(indexValues), ijkToRasMatrices = np.stack(ijkToRasMatrices))
+    except:
+      logging.error('Error writing image frames to temporary file: ' + chunkFilePath)
+      return 0
+    self.spilledChunks.append([sequenceNode, chunkFilePath, np.stack(frames).nbytes])
+
+    # Remove frames from sequence
+    releasedBytes = 0
+    for itemNumber, indexValue in enumerate(indexValues):
+      releasedBytes += self.getDataNodeBytes(sequenceNode, 0)
+      sequenceNode.RemoveDataNodeAtValue(indexValue)
+
+    # Update memory usage
+    sequenceName = sequenceNode.GetName()
+    self.sequenceBytes[sequenceName] = self.sequenceBytes.get(sequenceName, 0) - releasedBytes
+    self.numCountedItems[sequenceName] = self.numCountedItems.get(sequenceName, 0) - len(indexValues)
+    return releasedBytes
+
+  #------------------------------------------------------------------------------
+  def getSpilledChunks(self, sequenceNode, timeRange = None):
+    """
+    Read spilled frames of an image sequence chunk by chunk, oldest first.
+    :param sequenceNode: image sequence node (vtkMRMLSequenceNode)
+    :param timeRange: only frames within [min, max] time are returned if given (list)
+    :return generator of index values (numpy array), frames (numpy array) and IJK to RAS matrices (numpy array)
+    """
+    for chunkSequenceNode, chunkFilePath, chunkBytes in self.spilledChunks:
+      if chunkSequenceNode != sequenceNode:
+        continue
+      with np.load(chunkFilePath) as chunk:
+        indexValues = chunk['indexValues']
+        if timeRange:
+          timestamps = indexValues.astype(float)
+          inRange = (timestamps >= timeRange[0]) & (timestamps <= timeRange[1])
+          if not inRange.any():
+            continue
+          yield indexValues[inRange], chunk['frames'][inRange], chunk['ijkToRasMatrices'][inRange]
+        else:
+          yield indexValues, chunk['frames'], chunk['ijkToRasMatrices']
+
+  #------------------------------------------------------------------------------
+  def getSpilledSequenceNodes(self):
+    """
+    Get image sequences with spilled frames.
+    :return sequence nodes (list)
+    """
+    sequenceNodes = list()
+    for sequenceNode, chunkFilePath, chunkBytes in self.spilledChunks:
+      if sequenceNode not in sequenceNodes:
+        sequenceNodes.append(sequenceNode)
+    return sequenceNodes
+
+  #------------------------------------------------------------------------------
+  def restoreSpilledFrames(self, timeRange = None):
+    """
+    Add spilled frames back into their image sequences and remove temporary files. Frames are
+    only restored if the sequences still fit within the memory budget with them.
+    :param timeRange: only frames within [min, max] time are restored if given (list)
+    :return success (bool)
+    """
+    if not self.spilledChunks:
+      return True
+
+    # Check memory budget
+    self.sequenceBytes = dict()
+    self.numCountedItems = dict()
+    self.updateMemoryUsage()
+    spilledBytes = sum([chunkBytes for sequenceNode, chunkFilePath, chunkBytes in self.spilledChunks])
+    if self.getTotalBytes() + spilledBytes > self.memoryBudgetBytes:
+      logging.warning('Spilled image frames are not restored, since they do not fit within the recording memory budget.')
+      return False
+
+    logging.debug('RecordingMemoryMonitor: restoring spilled image frames')
+    for sequenceNode in self.getSpilledSequenceNodes():
+      try:
+        temporaryNode = slicer.mrmlScene.CreateNodeByClass(sequenceNode.GetDataNodeClassName())
+        temporaryNode.UnRegister(None)
+        for indexValues, frames, ijkToRasMatrices in self.getSpilledChunks(sequenceNode, timeRange):
+          for frame, indexValue, ijkToRasMatrix in zip(frames, indexValues, ijkToRasMatrices):
+            slicer.util.updateVolumeFromArray(temporaryNode, frame)
+            temporaryNode.SetIJKToRASMatrix(slicer.util.vtkMatrixFromArray(ijkToRasMatrix))
+            sequenceNode.SetDataNodeAtValue(temporaryNode, str(indexValue))
+      except:
+        logging.error('Error restoring spilled image frames of sequence: ' + sequenceNode.GetName())
+        return False
+
+    # Remove temporary files
+    self.spilledChunks = list()
+    if self.spillDirectory:
+      shutil.rmtree(self.spillDirectory, ignore_errors = True)
+      self.spillDirectory = None
+    return True
+
+  #------------------------------------------------------------------------------
+  def insertSpilledFramesIntoArchive(self, archiveFilePath, memberName, sequenceNode, timeRange = None):
+    """
+    Insert spilled frames of an image sequence into its volume sequence file (.seq.nrrd) inside a
+    saved sequence browser file (.sqbr). Frames are streamed from the temporary files to the new
+    archive member, so they are never loaded into memory all at once.
+    :param archiveFilePath: path to .sqbr file (string)
+    :param memberName: name of the .seq.nrrd member of the image sequence (string)
+    :param sequenceNode: image sequence node (vtkMRMLSequenceNode)
+    :param timeRange: only frames within [min, max] time are inserted if given (list)
+    :return success (bool)
+    """
+    temporaryFilePath = archiveFilePath + '.tmp'
+    try:
+      with zipfile.ZipFile(archiveFilePath, 'r') as archive, zipfile.ZipFile(temporaryFilePath, 'w', allowZip64 = True) as newArchive:
+        for memberInfo in archive.infolist():
+          if memberInfo.filename == memberName:
+            newMemberInfo = zipfile.ZipInfo(memberInfo.filename, memberInfo.date_time)
+            newMemberInfo.compress_type = memberInfo.compress_type
+            with archive.open(memberInfo) as inputFile, newArchive.open(newMemberInfo, 'w', force_zip64 = True) as outputFile:
+              self.writeVolumeSequenceWithSpilledFrames(inputFile, outputFile, sequenceNode, timeRange)
+          else:
+            with archive.open(memberInfo) as inputFile, newArchive.open(memberInfo, 'w', force_zip64 = True) as outputFile:
+              shutil.copyfileobj(inputFile, outputFile, 16 * 1024 * 1024)
+      os.replace(temporaryFilePath, archiveFilePath)
+      return True
+    except:
+      logging.error('Error writing spilled image frames to file: ' + archiveFilePath)
+      if os.path.exists(temporaryFilePath):
+        os.remove(temporaryFilePath)
+      return False
+
+  #------------------------------------------------------------------------------
+  def writeVolumeSequenceWithSpilledFrames(self, inputFile, outputFile, sequenceNode, timeRange = None):
+    """
+    Write volume sequence (NRRD) with the spilled frames of an image sequence followed by the frames of the input file.
+    :param inputFile: binary file object of the saved .seq.nrrd file
+    :param outputFile: binary file object of the new .seq.nrrd file
+    :param sequenceNode: image sequence node (vtkMRMLSequenceNode)
+    :param timeRange: only frames within [min, max] time are inserted if given (list)
+    """
+    # Read header lines
+    headerLines = [inputFile.readline()]
+    while True:
+      line = inputFile.readline()
+      if not line.rstrip(b'\r\n'):
+        break
+      headerLines.append(line)
+    header, headerLength = RecordingFrameCache().readNrrdHeader(io.BytesIO(b''.join(headerLines) + b'\n'))
+    if header.get('data file', header.get('datafile', None)):
+      raise ValueError('Detached NRRD data files are not supported')
+    encoding = header.get('encoding', 'raw')
+    if encoding not in ['raw', 'gzip', 'gz']:
+      raise ValueError('Unsupported NRRD encoding: ' + encoding)
+    if 'axis 0 index values' not in header:
+      raise ValueError('Frame timestamps not found in volume sequence')
+
+    # Frame format
+    dataType = np.dtype(RecordingFrameCache.NRRD_TYPES[header['type']])
+    if dataType.itemsize > 1:
+      dataType = dataType.newbyteorder('>' if header.get('endian', 'little') == 'big' else '<')
+    sizes = header['sizes'].split()
+    frameShape = tuple(reversed([int(size) for size in sizes[:-1]]))
+
+    # Spilled frames
+    spilledIndexValues = list()
+    for indexValues, frames, ijkToRasMatrices in self.getSpilledChunks(sequenceNode, timeRange):
+      if frames.shape[1:] != frameShape:
+        raise ValueError('Spilled image frames do not match the frame size of the volume sequence')
+      spilledIndexValues.extend([str(indexValue) for indexValue in indexValues])
+
+    # Write header with updated number of frames and timestamps
+    for line in headerLines:
+      text = line.decode('latin-1')
+      if text.startswith('sizes:'):
+        sizes[-1] = str(int(sizes[-1]) + len(spilledIndexValues))
+        line = ('sizes: ' + ' '.join(sizes) + '\n').encode('latin-1')
+      elif text.startswith('axis 0 index values:='):
+        indexValues = spilledIndexValues + header['axis 0 index values'].split()
+        line = ('axis 0 index values:=' + ' '.join(indexValues) + '\n').encode('latin-1')
+      outputFile.write(line)
+    outputFile.write(b'\n')
+
+    # Write data: spilled frames first, then saved frames
+    compressor = zlib.compressobj(wbits = 16 + zlib.MAX_WBITS) if encoding != 'raw' else None
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding != 'raw' else None
+    def writeData(data):
+      outputFile.write(compressor.compress(data) if compressor else data)
+    for indexValues, frames, ijkToRasMatrices in self.getSpilledChunks(sequenceNode, timeRange):
+      writeData(np.ascontiguousarray(frames, dtype = dataType).tobytes())
+    while not (decompressor and decompressor.eof):
+      data = inputFile.read(16 * 1024 * 1024)
+      if not data:
+        break
+      writeData(decompressor.decompress(data) if decompressor else data)
+    if compressor:
+      outputFile.write(compressor.flush())
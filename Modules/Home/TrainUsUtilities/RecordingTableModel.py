@@ -0,0 +1,85 @@
+from __main__ import vtk, qt, slicer
+import logging
+from .InfoTableModel import InfoTableModel
+
+#------------------------------------------------------------------------------
+#
+# RecordingTableModel
+#
+#------------------------------------------------------------------------------
+class RecordingTableModel(InfoTableModel):
+  """
+  Table model of recordings, see InfoTableModel. Besides the recording info, the table shows
+  details computed in the background (file size, number of frames, trimmed duration and score).
+  A placeholder is displayed until the details of a recording are set.
+  """
+
+  # Recording info or details key displayed in each column
+  COLUMN_KEYS = ['id', 'date', 'time', 'exercise', 'duration', 'fileSize', 'numFrames', 'trimmedDuration', 'score']
+  DETAIL_KEYS = ['fileSize', 'numFrames', 'trimmedDuration', 'score']
+
+  # Text displayed while details are computed, and when they are not available
+  PENDING_TEXT = '...'
+  NOT_AVAILABLE_TEXT = '-'
+
+  #------------------------------------------------------------------------------
+  def __init__(self, parent = None):
+    InfoTableModel.__init__(self, parent)
+    self.headerLabels = ['ID', 'Date', 'Time', 'Exercise', 'Duration', 'Size', 'Frames', 'Trimmed duration', 'Score']
+    self.details_dict = dict() # details of each recording ID
+
+  #------------------------------------------------------------------------------
+  def getDisplayText(self, row, column):
+    key = self.COLUMN_KEYS[column]
+    if key not in self.DETAIL_KEYS:
+      return InfoTableModel.getDisplayText(self, row, column)
+    details = self.details_dict.get(self.info_list[row]['id'])
+    if details is None:
+      return self.PENDING_TEXT
+    value = details.get(key)
+    if value is None:
+      return self.NOT_AVAILABLE_TEXT
+    if key == 'fileSize':
+      return '{:.1f} MB'.format(value / (1024 * 1024))
+    if key == 'trimmedDuration':
+      return '{:.2f}'.format(value)
+    return str(value)
+
+  #------------------------------------------------------------------------------
+  def getSortValue(self, row, column):
+    key = self.COLUMN_KEYS[column]
+    if key == 'duration':
+      try:
+        return float(self.info_list[row].get('duration', 0.0))
+      except ValueError:
+        return 0.0
+    if key not in self.DETAIL_KEYS:
+      return InfoTableModel.getSortValue(self, row, column)
+    value = self.details_dict.get(self.info_list[row]['id'], dict()).get(key)
+    try:
+      return float(value)
+    except (TypeError, ValueError):
+      return -1.0 # pending or not available
+
+  #------------------------------------------------------------------------------
+  def setDetailsDict(self, details_dict):
+    """
+    Set details of all recordings, e.g. read from the catalog when the table is updated.
+    :param details_dict: details for each recording ID (dict)
+    """
+    self.details_dict = dict(details_dict)
+    if self.info_list:
+      firstDetailColumn = self.COLUMN_KEYS.index(self.DETAIL_KEYS[0])
+      self.dataChanged(self.index(0, firstDetailColumn), self.index(len(self.info_list) - 1, len(self.COLUMN_KEYS) - 1))
+
+  #------------------------------------------------------------------------------
+  def setRecordingDetails(self, recordingID, details):
+    """
+    Set details of a recording when they are computed.
+    :param recordingID: recording ID (string)
+    :param details: recording details (dict)
+    """
+    self.details_dict[recordingID] = details
+    row = self.getRowFromID(recordingID)
+    if row >= 0:
+      self.emitRowChanged(row)
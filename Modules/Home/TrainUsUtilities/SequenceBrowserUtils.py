@@ -1,5 +1,16 @@
-from __main__ import vtk, slicer
+from __main__ import vtk, qt, slicer
 import logging
+import os
+import shutil
+import hashlib
+import zlib
+import zipfile
+import collections
+import numpy as np
+import xml.etree.ElementTree as ElementTree
+
+from .RecordingFrameCache import RecordingFrameCache
+from .RecordingMemoryMonitor import RecordingMemoryMonitor
 
 #------------------------------------------------------------------------------
 #
@@ -24,6 +35,51 @@ class SequenceBrowserUtils:
     # Observer
     self.observerID = None
 
+    # Lazy image loading
+    self.recordingFrameCache = None
+    self.lazyImageNode = None
+    self.lazyImageSequenceName = None
+    self.lazyImageObserverID = None
+    self.lazyImageFrameIndex = None
+    self.lazyImagePrefetchRadius = 8
+    self.recordingCacheMaxSizeMB = 8192
+
+    # Duplicate image frame suppression
+    self.duplicateFrameSuppressionEnabled = True
+    self.suppressedImageNode = None
+    self.suppressedImageSequenceNode = None
+    self.duplicateFrameObserverIDs = list()
+    self.lastImageFrameHash = None
+    self.lastRecordedImageIndexValue = None
+    self.numSuppressedImageFrames = 0
+
+    # Pre-roll buffer
+    self.preRollDuration = 0.0
+    self.preRollMaxNumSamples = 10000
+    self.preRollBuffer = collections.deque(maxlen = self.preRollMaxNumSamples)
+    self.preRollObservations = list()
+    self.preRollLastImageFrameHash = None
+
+    # Recording memory monitor
+    self.recordingMemoryMonitor = RecordingMemoryMonitor()
+
+    # Master sequence timestamps
+    self.masterTimestamps = None
+    self.masterTimestampsMTime = None
+
+    # Playback scheduler
+    self.playbackSchedulerEnabled = True
+    self.playbackSpeed = 1.0
+    self.playbackSpeedRange = [0.25, 8.0]
+    self.playbackObserverID = None
+    self.playbackStartWallTime = 0.0
+    self.playbackStartTimestamp = 0.0
+    self.playbackLastItem = None
+    self.playbackRateFpsBackup = None
+    self.playbackTimer = qt.QTimer()
+    self.playbackTimer.setInterval(15)
+    self.playbackTimer.connect('timeout()', self.onPlaybackTimerTimeout)
+
     # Sequences (Sequences extension)
     try:
       self.sequencesLogic = slicer.modules.sequences.logic()
@@ -140,18 +196,32 @@ class SequenceBrowserUtils:
     if not self.sequenceBrowserNode:
       return
 
-    # Get number of items
-    numItems = self.getNumberOfItemsInSequenceBrowser()
-
-    # Get list of timestamps
-    timestampsList = list()
-    for itemID in range(numItems):
-      timestampsList.append(float(self.sequenceBrowserNode.GetMasterSequenceNode().GetNthIndexValue(itemID)))
+    # Get timestamps
+    timestamps = self.getMasterTimestamps()
+    if len(timestamps) == 0:
+      return
 
     # Get closest timestamp
-    outputItemID = timestampsList.index(min(timestampsList, key=lambda x:abs(x-inputTimestamp)))
+    outputItemID = int(np.searchsorted(timestamps, inputTimestamp))
+    if (outputItemID == len(timestamps)) or ((outputItemID > 0) and (inputTimestamp - timestamps[outputItemID-1] <= timestamps[outputItemID] - inputTimestamp)):
+      outputItemID -= 1
     return outputItemID
 
+  #------------------------------------------------------------------------------
+  def getMasterTimestamps(self):
+    """
+    Get timestamps of all items in the master sequence. Values are cached until the sequence is modified.
+    :return timestamps (numpy array)
+    """
+    if not self.sequenceBrowserNode or not self.sequenceBrowserNode.GetMasterSequenceNode():
+      return np.array([])
+    masterSequenceNode = self.sequenceBrowserNode.GetMasterSequenceNode()
+    if (self.masterTimestamps is None) or (self.masterTimestampsMTime != masterSequenceNode.GetMTime()):
+      numItems = masterSequenceNode.GetNumberOfDataNodes()
+      self.masterTimestamps = np.array([float(masterSequenceNode.GetNthIndexValue(itemID)) for itemID in range(numItems)])
+      self.masterTimestampsMTime = masterSequenceNode.GetMTime()
+    return self.masterTimestamps
+
   #------------------------------------------------------------------------------
   def getTimestampFromSequenceBrowserItem(self, inputItemID):
     """
@@ -175,6 +245,41 @@ class SequenceBrowserUtils:
   def getTimestampFromItemID(self, itemID):
     return self.sequenceBrowserNode.GetMasterSequenceNode().GetNthIndexValue(itemID)
 
+  #------------------------------------------------------------------------------
+  def getTrackingDataArrays(self):
+    """
+    Get tracking data of the recording as arrays sampled at the master sequence timestamps.
+    :return timestamps (numpy array) and (N,4,4) array for each transform sequence name (dict)
+    """
+    if self.isSequenceBrowserEmpty():
+      return None, dict()
+
+    # Timestamps of master sequence
+    masterSequenceNode = self.sequenceBrowserNode.GetMasterSequenceNode()
+    numItems = masterSequenceNode.GetNumberOfDataNodes()
+    indexValues = [masterSequenceNode.GetNthIndexValue(itemID) for itemID in range(numItems)]
+    timestamps = np.array([float(indexValue) for indexValue in indexValues])
+
+    # Transform sequences
+    synchronizedSequenceNodes = vtk.vtkCollection()
+    self.sequenceBrowserNode.GetSynchronizedSequenceNodes(synchronizedSequenceNodes, True)
+    transforms = dict()
+    matrix = vtk.vtkMatrix4x4()
+    for sequenceNode in synchronizedSequenceNodes:
+      if 'Transform' not in sequenceNode.GetDataNodeClassName():
+        continue
+      proxyNode = self.sequenceBrowserNode.GetProxyNode(sequenceNode)
+      transformName = proxyNode.GetName() if proxyNode else self.getProxyNameFromSequenceName(sequenceNode.GetName())
+      transformArray = np.tile(np.eye(4), (numItems, 1, 1))
+      for itemID, indexValue in enumerate(indexValues):
+        itemNumber = sequenceNode.GetItemNumberFromIndexValue(indexValue, False)
+        if itemNumber < 0:
+          continue
+        sequenceNode.GetNthDataNode(itemNumber).GetMatrixTransformToParent(matrix)
+        transformArray[itemID] = slicer.util.arrayFromVTKMatrix(matrix)
+      transforms[transformName] = transformArray
+    return timestamps, transforms
+
   #------------------------------------------------------------------------------
   def createNewSequenceBrowser(self):
     """
@@ -199,6 +304,12 @@ class SequenceBrowserUtils:
 
       # Finish modification
       self.sequenceBrowserNode.EndModify(modifiedFlag)
+
+      # Buffer data before recording starts
+      self.startPreRollBuffering()
+
+      # Schedule playback
+      self.addPlaybackObserver()
       return True
 
     except:
@@ -215,6 +326,13 @@ class SequenceBrowserUtils:
     if not self.sequenceBrowserNode:
       return False
 
+    # Release lazily loaded image frames and buffered data
+    self.closeLazyImageFrames()
+    self.stopPreRollBuffering()
+    self.recordingMemoryMonitor.discardSpilledFrames()
+    self.removePlaybackObserver()
+    self.masterTimestamps = None
+
     # Remove sequence nodes from scene
     synchronizedSequenceNodes = vtk.vtkCollection()
     self.sequenceBrowserNode.GetSynchronizedSequenceNodes(synchronizedSequenceNodes)
@@ -236,28 +354,381 @@ class SequenceBrowserUtils:
     :param filePath: path to output file (string)
     :return success (bool)
     """
+    if self.recordingFrameCache and not self.loadLazyImageFrames():
+      logging.error('Image frames of sequence browser loaded with lazy image loading could not be loaded...')
+      return False
     try:
       slicer.util.saveNode(self.sequenceBrowserNode, filePath)
       success = True
     except:
       logging.error('Error saving sequence browser node to file...')
       success = False
+    if success and self.recordingMemoryMonitor.hasSpilledFrames():
+      success = self.saveSpilledImageFrames(filePath)
     return success
 
   #------------------------------------------------------------------------------
-  def loadSequenceBrowser(self, filePath):
+  def saveSpilledImageFrames(self, filePath):
+    """
+    Write image frames spilled to disk during recording into a saved sequence browser file.
+    Only frames within the time range of the master sequence (which may have been trimmed) are written.
+    :param filePath: path to saved sequence browser file (string)
+    :return success (bool)
+    """
+    timeRange = self.getTimeRangeInSequenceBrowser()
+    try:
+      with zipfile.ZipFile(filePath, 'r') as archive:
+        sequenceInfoList, masterSequenceName = self.readSequencesFromArchive(archive)
+    except:
+      logging.error('Error reading saved sequence browser file: ' + filePath)
+      return False
+    memberNamesBySequenceName = dict([(sequenceInfo['name'], sequenceInfo['memberName']) for sequenceInfo in sequenceInfoList])
+    for sequenceNode in self.recordingMemoryMonitor.getSpilledSequenceNodes():
+      memberName = memberNamesBySequenceName.get(sequenceNode.GetName(), None)
+      if memberName is None:
+        logging.error('Image sequence not found in saved sequence browser file: ' + sequenceNode.GetName())
+        return False
+      if not self.recordingMemoryMonitor.insertSpilledFramesIntoArchive(filePath, memberName, sequenceNode, timeRange):
+        return False
+    return True
+
+  #------------------------------------------------------------------------------
+  def loadSequenceBrowser(self, filePath, lazyImageLoading = False):
     """
     Load sequence browser node from file.    
     :param filePath: path to input file (string)
+    :param lazyImageLoading: keep image frames on disk and read them on demand (bool)
     """
+    if lazyImageLoading:
+      if self.loadSequenceBrowserWithLazyImageLoading(filePath):
+        return True
+      logging.warning('Loading sequence browser node with all image frames in memory...')
     try:
       self.sequenceBrowserNode = slicer.util.loadNodeFromFile(filePath, 'Tracked Sequence Browser')
+      self.addPlaybackObserver()
       success = True
     except:
       logging.error('Error loading sequence browser node from file...')
       success = False
     return success
 
+  #------------------------------------------------------------------------------
+  #
+  # Lazy image loading
+  #
+  #------------------------------------------------------------------------------
+  def loadSequenceBrowserWithLazyImageLoading(self, filePath):
+    """
+    Load sequence browser node from file reading tracking sequences only. Image frames
+    remain on disk and are read on demand when the selected item changes.
+    :param filePath: path to input file (string)
+    :return success (bool)
+    """
+    sequenceNodes = dict()
+    createdProxyNodes = list()
+    try:
+      cacheDirectory = self.getRecordingCacheDirectory(filePath)
+
+      # Read sequences stored in file
+      with zipfile.ZipFile(filePath, 'r') as archive:
+        sequenceInfoList, masterSequenceName = self.readSequencesFromArchive(archive)
+
+        # Load tracking sequences
+        for sequenceInfo in sequenceInfoList:
+          if sequenceInfo['isImage']:
+            continue
+          extractedFilePath = os.path.join(cacheDirectory, os.path.basename(sequenceInfo['memberName']))
+          if not os.path.isfile(extractedFilePath):
+            os.replace(archive.extract(sequenceInfo['memberName'], cacheDirectory), extractedFilePath)
+          sequenceNode = slicer.util.loadNodeFromFile(extractedFilePath, 'SequenceFile')
+          sequenceNode.SetName(sequenceInfo['name'])
+          sequenceNodes[sequenceInfo['name']] = sequenceNode
+
+      # Master sequence. If the image was the master sequence, the tracking sequence with most items is used instead.
+      if masterSequenceName not in sequenceNodes:
+        previousMasterSequenceName = masterSequenceName
+        masterSequenceName = max(sequenceNodes.keys(), key = lambda sequenceName: sequenceNodes[sequenceName].GetNumberOfDataNodes())
+        logging.info('Master sequence {} is not loaded, {} is used as master sequence'.format(previousMasterSequenceName, masterSequenceName))
+
+      # Create sequence browser node
+      self.sequenceBrowserNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLSequenceBrowserNode', slicer.mrmlScene.GenerateUniqueName(self.sequenceBrowserNodeName))
+      modifiedFlag = self.sequenceBrowserNode.StartModify()
+      self.sequenceBrowserNode.SetAndObserveMasterSequenceNodeID(sequenceNodes[masterSequenceName].GetID())
+      for sequenceName, sequenceNode in sequenceNodes.items():
+        if sequenceName != masterSequenceName:
+          self.sequenceBrowserNode.AddSynchronizedSequenceNode(sequenceNode)
+
+      # Use existing scene nodes as proxy nodes
+      existingProxyNodes = list()
+      for sequenceName, sequenceNode in sequenceNodes.items():
+        proxyNode = slicer.mrmlScene.GetFirstNodeByName(self.getProxyNameFromSequenceName(sequenceName))
+        if proxyNode:
+          self.sequenceBrowserNode.SetAndObserveProxyNode(sequenceNode, proxyNode)
+          existingProxyNodes.append(proxyNode)
+      self.sequenceBrowserNode.EndModify(modifiedFlag)
+      self.sequencesLogic.UpdateProxyNodesFromSequences(self.sequenceBrowserNode)
+      for sequenceNode in sequenceNodes.values():
+        proxyNode = self.sequenceBrowserNode.GetProxyNode(sequenceNode)
+        if proxyNode and (proxyNode not in existingProxyNodes):
+          createdProxyNodes.append(proxyNode)
+
+      # Map image frames
+      for sequenceInfo in sequenceInfoList:
+        if sequenceInfo['isImage']:
+          if not self.openLazyImageFrames(filePath, sequenceInfo, cacheDirectory):
+            raise RuntimeError('Image frames could not be mapped')
+          break
+
+      # Schedule playback
+      self.addPlaybackObserver()
+      return True
+
+    except:
+      logging.error('Error loading sequence browser node from file with lazy image loading...')
+      self.closeLazyImageFrames()
+
+      # Remove nodes added to the scene
+      for node in list(sequenceNodes.values()) + createdProxyNodes:
+        slicer.mrmlScene.RemoveNode(node)
+      if self.sequenceBrowserNode:
+        slicer.mrmlScene.RemoveNode(self.sequenceBrowserNode)
+      self.sequenceBrowserNode = None
+      return False
+
+  #------------------------------------------------------------------------------
+  def readSequencesFromArchive(self, archive):
+    """
+    Read list of sequences stored in a sequence browser file from its MRML scene.
+    :param archive: open .sqbr file (zipfile.ZipFile)
+    :return list of sequence info (list of dict) and name of master sequence (string)
+    """
+    # Parse scene
+    sceneMemberName = [name for name in archive.namelist() if name.endswith('.mrml')][0]
+    with archive.open(sceneMemberName) as sceneFile:
+      sceneElement = ElementTree.parse(sceneFile).getroot()
+    elementsByID = dict()
+    for element in sceneElement:
+      if 'id' in element.attrib:
+        elementsByID[element.attrib['id']] = element
+
+    # Sequences and their storage files
+    memberNamesByFileName = dict()
+    for memberName in archive.namelist():
+      memberNamesByFileName[os.path.basename(memberName)] = memberName
+    sequenceInfoList = list()
+    for element in sceneElement:
+      if element.tag != 'Sequence':
+        continue
+      references = self.parseNodeReferences(element.attrib.get('references', ''))
+      if 'storage' not in references:
+        continue
+      storageElement = elementsByID[references['storage'][0]]
+      fileName = os.path.basename(storageElement.attrib.get('fileName', ''))
+      if fileName not in memberNamesByFileName:
+        continue
+      sequenceInfo = dict()
+      sequenceInfo['id'] = element.attrib['id']
+      sequenceInfo['name'] = element.attrib.get('name', '')
+      sequenceInfo['memberName'] = memberNamesByFileName[fileName]
+      sequenceInfo['isImage'] = fileName.endswith('.nrrd')
+      sequenceInfoList.append(sequenceInfo)
+
+    # Master sequence
+    masterSequenceName = None
+    for element in sceneElement:
+      if element.tag != 'SequenceBrowser':
+        continue
+      references = self.parseNodeReferences(element.attrib.get('references', ''))
+      for role, nodeIDs in references.items():
+        if ('master' in role.lower()) or ('root' in role.lower()):
+          for sequenceInfo in sequenceInfoList:
+            if sequenceInfo['id'] == nodeIDs[0]:
+              masterSequenceName = sequenceInfo['name']
+    return sequenceInfoList, masterSequenceName
+
+  #------------------------------------------------------------------------------
+  def parseNodeReferences(self, referencesText):
+    """
+    Parse node references attribute of a MRML element.
+    :param referencesText: references attribute, e.g. "role1:id1 id2;role2:id3;" (string)
+    :return node IDs for each role (dict)
+    """
+    references = dict()
+    for reference in referencesText.split(';'):
+      if ':' not in reference:
+        continue
+      role, nodeIDs = reference.split(':', 1)
+      references[role.strip()] = nodeIDs.split()
+    return references
+
+  #------------------------------------------------------------------------------
+  def getProxyNameFromSequenceName(self, sequenceName):
+    """
+    Get name of proxy node associated to a sequence node.
+    :param sequenceName: sequence node name (string)
+    :return proxy node name (string)
+    """
+    if sequenceName.endswith('-Sequence'):
+      return sequenceName[:-len('-Sequence')]
+    return sequenceName
+
+  #------------------------------------------------------------------------------
+  def getRecordingCacheDirectory(self, filePath):
+    """
+    Get folder where data extracted from a recording file are cached. Folders persist across sessions,
+    so that compressed image data are only extracted and decompressed the first time a recording is
+    opened. Folders are keyed by the path and modification time of the file: data extracted from
+    previous versions of the file are removed, and least recently used folders are removed when the
+    cache exceeds its maximum size.
+    :param filePath: path to recording file (string)
+    :return path to cache folder (string)
+    """
+    filePath = os.path.normpath(os.path.abspath(filePath))
+    recordingName = os.path.splitext(os.path.basename(filePath))[0]
+    pathHash = hashlib.md5(filePath.encode('utf-8')).hexdigest()[:8]
+    folderPrefix = '{}_{}_'.format(recordingName, pathHash)
+    folderName = folderPrefix + str(os.stat(filePath).st_mtime_ns)
+    recordingCacheDirectory = os.path.join(slicer.app.cachePath, 'TrainUS', 'Recordings')
+    cacheDirectory = os.path.join(recordingCacheDirectory, folderName)
+    if not os.path.exists(cacheDirectory):
+      os.makedirs(cacheDirectory)
+    os.utime(cacheDirectory) # most recently used
+
+    # Remove data of previous versions of the file and least recently used recordings
+    for otherFolderName in os.listdir(recordingCacheDirectory):
+      if otherFolderName.startswith(folderPrefix) and (otherFolderName != folderName):
+        shutil.rmtree(os.path.join(recordingCacheDirectory, otherFolderName), ignore_errors = True)
+    self.pruneRecordingCache(recordingCacheDirectory, cacheDirectory)
+    return cacheDirectory
+
+  #------------------------------------------------------------------------------
+  def pruneRecordingCache(self, recordingCacheDirectory, keptCacheDirectory):
+    """
+    Remove least recently used folders of the recording cache until it fits within its maximum size.
+    :param recordingCacheDirectory: folder containing the cache folders of all recordings (string)
+    :param keptCacheDirectory: cache folder in use, never removed (string)
+    """
+    cacheFolders = list()
+    totalSize = 0
+    for entry in os.scandir(recordingCacheDirectory):
+      if not entry.is_dir():
+        continue
+      folderSize = sum(fileEntry.stat().st_size for fileEntry in os.scandir(entry.path) if fileEntry.is_file())
+      cacheFolders.append((entry.stat().st_mtime, entry.path, folderSize))
+      totalSize += folderSize
+    for lastUsedTime, folderPath, folderSize in sorted(cacheFolders):
+      if totalSize <= self.recordingCacheMaxSizeMB * 1024 * 1024:
+        break
+      if os.path.normpath(folderPath) == os.path.normpath(keptCacheDirectory):
+        continue
+      shutil.rmtree(folderPath, ignore_errors = True)
+      totalSize -= folderSize
+
+  #------------------------------------------------------------------------------
+  def openLazyImageFrames(self, filePath, sequenceInfo, cacheDirectory):
+    """
+    Map image frames of a recording and display them in the image proxy node.
+    :param filePath: path to recording file (string)
+    :param sequenceInfo: image sequence info (dict)
+    :param cacheDirectory: folder to store extracted data if needed (string)
+    :return success (bool)
+    """
+    self.recordingFrameCache = RecordingFrameCache()
+    if not self.recordingFrameCache.openFromArchive(filePath, sequenceInfo['memberName'], cacheDirectory):
+      self.recordingFrameCache = None
+      return False
+
+    # Image proxy node
+    self.lazyImageSequenceName = sequenceInfo['name']
+    proxyName = self.getProxyNameFromSequenceName(sequenceInfo['name'])
+    self.lazyImageNode = slicer.mrmlScene.GetFirstNodeByName(proxyName)
+    if not self.lazyImageNode:
+      frameShape = self.recordingFrameCache.getFrameShape()
+      volumeClassName = 'vtkMRMLVectorVolumeNode' if len(frameShape) > 3 else 'vtkMRMLScalarVolumeNode'
+      self.lazyImageNode = slicer.mrmlScene.AddNewNodeByClass(volumeClassName, proxyName)
+      self.lazyImageNode.CreateDefaultDisplayNodes()
+    ijkToRasMatrix = slicer.util.vtkMatrixFromArray(self.recordingFrameCache.getIJKToRASMatrix())
+    self.lazyImageNode.SetIJKToRASMatrix(ijkToRasMatrix)
+
+    # Update frame when selected item changes
+    self.lazyImageFrameIndex = None
+    self.lazyImageObserverID = self.sequenceBrowserNode.AddObserver(vtk.vtkCommand.ModifiedEvent, self.onLazyImageSequenceBrowserModified)
+    self.onLazyImageSequenceBrowserModified()
+    return True
+
+  #------------------------------------------------------------------------------
+  def onLazyImageSequenceBrowserModified(self, caller = None, event = None):
+    """
+    Display image frame corresponding to the selected item of the sequence browser.
+    """
+    if not self.recordingFrameCache or not self.lazyImageNode:
+      return
+    timestamp = self.getSelectedTimestampInSequenceBrowser()
+    if timestamp is None or timestamp == '':
+      return
+    frameIndex = self.recordingFrameCache.getFrameIndexFromTimestamp(float(timestamp))
+    if frameIndex == self.lazyImageFrameIndex:
+      return
+    self.lazyImageFrameIndex = frameIndex
+    slicer.util.updateVolumeFromArray(self.lazyImageNode, self.recordingFrameCache.getFrame(frameIndex))
+    self.recordingFrameCache.prefetchFrames(frameIndex, self.lazyImagePrefetchRadius)
+
+  #------------------------------------------------------------------------------
+  def closeLazyImageFrames(self):
+    """
+    Stop displaying lazily loaded image frames and release them. Data extracted from the recording file
+    are kept in the recording cache, so that the recording opens at once the next time.
+    """
+    if self.lazyImageObserverID and self.sequenceBrowserNode:
+      self.sequenceBrowserNode.RemoveObserver(self.lazyImageObserverID)
+    self.lazyImageObserverID = None
+    if self.recordingFrameCache:
+      self.recordingFrameCache.close()
+    self.recordingFrameCache = None
+    self.lazyImageNode = None
+    self.lazyImageSequenceName = None
+    self.lazyImageFrameIndex = None
+
+  #------------------------------------------------------------------------------
+  def loadLazyImageFrames(self):
+    """
+    Load lazily loaded image frames into an image sequence of the sequence browser, e.g. before
+    saving it. Only frames displayed within the time range of the master sequence (which may
+    have been trimmed) are loaded.
+    :return success (bool)
+    """
+    if not self.recordingFrameCache:
+      return True
+    imageSequenceNode = None
+    try:
+      imageNode = self.lazyImageNode
+      masterSequenceNode = self.sequenceBrowserNode.GetMasterSequenceNode()
+      timeRange = self.getTimeRangeInSequenceBrowser()
+
+      # Image sequence with the recorded frames
+      imageSequenceNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLSequenceNode', self.lazyImageSequenceName)
+      imageSequenceNode.SetIndexName(masterSequenceNode.GetIndexName())
+      imageSequenceNode.SetIndexUnit(masterSequenceNode.GetIndexUnit())
+      frameTimestamps = self.recordingFrameCache.getTimestamps()
+      firstFrameIndex = self.recordingFrameCache.getFrameIndexFromTimestamp(timeRange[0]) if timeRange else 0
+      for frameIndex in range(firstFrameIndex, len(frameTimestamps)):
+        frameTimestamp = frameTimestamps[frameIndex]
+        if timeRange and (frameTimestamp > timeRange[1]):
+          break
+        slicer.util.updateVolumeFromArray(imageNode, self.recordingFrameCache.getFrame(frameIndex))
+        imageSequenceNode.SetDataNodeAtValue(imageNode, str(float(frameTimestamp)))
+
+      # Release frames on disk and synchronize image sequence
+      self.closeLazyImageFrames()
+      self.sequenceBrowserNode.AddSynchronizedSequenceNode(imageSequenceNode)
+      self.sequenceBrowserNode.SetAndObserveProxyNode(imageSequenceNode, imageNode)
+      return True
+    except:
+      logging.error('Error loading image frames of sequence browser...')
+      if imageSequenceNode:
+        slicer.mrmlScene.RemoveNode(imageSequenceNode)
+      return False
+
   #------------------------------------------------------------------------------
   def trimSequenceBrowserRecording(self, minTimestamp, maxTimestamp):
     """
@@ -311,7 +782,10 @@ class SequenceBrowserUtils:
     try:
       self.sequenceBrowserNode.SetRecordMasterOnly(False)
       self.sequenceBrowserNode.SetRecording(None, True)
+      self.commitPreRollBuffer()
+      self.startDuplicateFrameSuppression()
       self.sequenceBrowserNode.SetRecordingActive(True)
+      self.recordingMemoryMonitor.start(self.sequenceBrowserNode)
       success = True
     except:
       logging.error('Error starting sequence browser recording...')
@@ -329,6 +803,8 @@ class SequenceBrowserUtils:
     # Stop recording
     try:
       self.sequenceBrowserNode.SetRecordingActive(False)
+      self.stopDuplicateFrameSuppression()
+      self.recordingMemoryMonitor.stop()
       self.sequenceBrowserNode.SetRecording(None, False)
       self.setPlaybackRealtime()
       success =  True
@@ -340,6 +816,345 @@ class SequenceBrowserUtils:
     self.recordingInProgress = not success
     return success
 
+  #------------------------------------------------------------------------------
+  #
+  # Duplicate image frame suppression
+  #
+  #------------------------------------------------------------------------------
+  def setDuplicateFrameSuppressionEnabled(self, enabled):
+    """
+    Enable or disable suppression of unchanged image frames while recording.
+    :param enabled: suppression enabled (bool)
+    """
+    self.duplicateFrameSuppressionEnabled = enabled
+
+  #------------------------------------------------------------------------------
+  def startDuplicateFrameSuppression(self):
+    """
+    Record image frames only when image content changes. Tracking data are still recorded on every
+    update, and the previous image frame is displayed for items without a new image during playback.
+    Suppression is not applied if the image is the master node, as every master item needs an image.
+
+    Image recording is enabled when an image with new content is received, and disabled again once the
+    sequence browser has recorded it, so the recording sampling mode of the browser is not changed.
+    """
+    self.stopDuplicateFrameSuppression()
+    if not self.duplicateFrameSuppressionEnabled or not self.sequenceBrowserNode:
+      return
+
+    # Find image proxy node
+    masterSequenceNode = self.sequenceBrowserNode.GetMasterSequenceNode()
+    synchronizedSequenceNodes = vtk.vtkCollection()
+    self.sequenceBrowserNode.GetSynchronizedSequenceNodes(synchronizedSequenceNodes)
+    for sequenceNode in synchronizedSequenceNodes:
+      proxyNode = self.sequenceBrowserNode.GetProxyNode(sequenceNode)
+      if proxyNode and proxyNode.IsA('vtkMRMLVolumeNode') and (sequenceNode != masterSequenceNode):
+        self.suppressedImageNode = proxyNode
+        self.suppressedImageSequenceNode = sequenceNode
+        break
+    if not self.suppressedImageNode:
+      return
+
+    # Image is recorded only when an image update with new content is received
+    self.sequenceBrowserNode.SetRecording(self.suppressedImageSequenceNode, False)
+    self.lastImageFrameHash = None
+    self.lastRecordedImageIndexValue = self.getLastIndexValue(self.suppressedImageSequenceNode)
+    self.numSuppressedImageFrames = 0
+
+    # Observe image updates (before the sequence browser processes them) and recorded image frames
+    for event in [vtk.vtkCommand.ModifiedEvent, slicer.vtkMRMLVolumeNode.ImageDataModifiedEvent]:
+      observerID = self.suppressedImageNode.AddObserver(event, self.onSuppressedImageModified, 100.0)
+      self.duplicateFrameObserverIDs.append([self.suppressedImageNode, observerID])
+    observerID = self.suppressedImageSequenceNode.AddObserver(vtk.vtkCommand.ModifiedEvent, self.onSuppressedImageSequenceModified)
+    self.duplicateFrameObserverIDs.append([self.suppressedImageSequenceNode, observerID])
+
+  #------------------------------------------------------------------------------
+  def stopDuplicateFrameSuppression(self):
+    """
+    Stop suppression of unchanged image frames.
+    """
+    for node, observerID in self.duplicateFrameObserverIDs:
+      node.RemoveObserver(observerID)
+    if self.suppressedImageNode:
+      logging.debug('Number of duplicate image frames not recorded: ' + str(self.numSuppressedImageFrames))
+    self.duplicateFrameObserverIDs = list()
+    self.suppressedImageNode = None
+    self.suppressedImageSequenceNode = None
+    self.lastImageFrameHash = None
+    self.lastRecordedImageIndexValue = None
+
+  #------------------------------------------------------------------------------
+  def onSuppressedImageModified(self, caller = None, event = None):
+    """
+    Enable image recording if image content has changed since the last received frame. Image recording
+    stays disabled for duplicate frames.
+    """
+    frameHash = self.computeImageFrameHash(self.suppressedImageNode)
+    if frameHash is None:
+      return
+    if frameHash == self.lastImageFrameHash:
+      self.numSuppressedImageFrames += 1
+      return
+    self.lastImageFrameHash = frameHash
+    self.sequenceBrowserNode.SetRecording(self.suppressedImageSequenceNode, True)
+
+  #------------------------------------------------------------------------------
+  def onSuppressedImageSequenceModified(self, caller = None, event = None):
+    """
+    Disable image recording once the sequence browser has recorded the new image frame, so that it is not
+    recorded again with the next tracking data.
+    """
+    indexValue = self.getLastIndexValue(self.suppressedImageSequenceNode)
+    if indexValue == self.lastRecordedImageIndexValue:
+      return # no new frame, e.g. oldest frames spilled to disk
+    self.lastRecordedImageIndexValue = indexValue
+    self.sequenceBrowserNode.SetRecording(self.suppressedImageSequenceNode, False)
+
+  #------------------------------------------------------------------------------
+  def getLastIndexValue(self, sequenceNode):
+    numItems = sequenceNode.GetNumberOfDataNodes()
+    if numItems == 0:
+      return None
+    return sequenceNode.GetNthIndexValue(numItems - 1)
+
+  #------------------------------------------------------------------------------
+  def computeImageFrameHash(self, imageNode):
+    """
+    Compute hash of image content (CRC32 of all voxels).
+    :param imageNode: image volume node (vtkMRMLVolumeNode)
+    :return hash (tuple)
+    """
+    if not imageNode or not imageNode.GetImageData():
+      return None
+    imageArray = np.ascontiguousarray(slicer.util.arrayFromVolume(imageNode))
+    return (imageArray.shape, imageArray.dtype.str, zlib.crc32(imageArray))
+
+  #------------------------------------------------------------------------------
+  #
+  # Pre-roll buffer
+  #
+  #------------------------------------------------------------------------------
+  def setPreRollDuration(self, duration):
+    """
+    Set duration of data kept before recording starts. Buffering is disabled if duration is zero.
+    :param duration: pre-roll duration in seconds (float)
+    """
+    self.preRollDuration = max(duration, 0.0)
+
+  #------------------------------------------------------------------------------
+  def startPreRollBuffering(self):
+    """
+    Start keeping the last seconds of synchronized node data in a ring buffer. Samples older than
+    the pre-roll duration are discarded, so memory usage is bounded.
+    """
+    self.stopPreRollBuffering()
+    if (self.preRollDuration <= 0.0) or not self.synchronizedNodes:
+      return
+    for node in self.synchronizedNodes:
+      if node.IsA('vtkMRMLVolumeNode'):
+        event = slicer.vtkMRMLVolumeNode.ImageDataModifiedEvent
+      else:
+        event = slicer.vtkMRMLTransformableNode.TransformModifiedEvent
+      observerID = node.AddObserver(event, self.onPreRollNodeModified)
+      self.preRollObservations.append([node, observerID])
+
+  #------------------------------------------------------------------------------
+  def stopPreRollBuffering(self):
+    """
+    Stop buffering and discard buffered data.
+    """
+    for node, observerID in self.preRollObservations:
+      node.RemoveObserver(observerID)
+    self.preRollObservations = list()
+    self.preRollBuffer.clear()
+    self.preRollLastImageFrameHash = None
+
+  #------------------------------------------------------------------------------
+  def onPreRollNodeModified(self, caller = None, event = None):
+    """
+    Add sample to pre-roll buffer. As in recording, transforms are stored on every update,
+    and image is stored only when its content changes.
+    """
+    timestamp = vtk.vtkTimerLog.GetUniversalTime()
+
+    # Snapshot of synchronized nodes
+    sample = dict()
+    for nodeIndex, node in enumerate(self.synchronizedNodes):
+      if node.IsA('vtkMRMLVolumeNode'):
+        if node != caller:
+          continue
+        frameHash = self.computeImageFrameHash(node)
+        if (frameHash is None) or (frameHash == self.preRollLastImageFrameHash):
+          continue
+        self.preRollLastImageFrameHash = frameHash
+        ijkToRasMatrix = vtk.vtkMatrix4x4()
+        node.GetIJKToRASMatrix(ijkToRasMatrix)
+        sample[nodeIndex] = [np.array(slicer.util.arrayFromVolume(node)), slicer.util.arrayFromVTKMatrix(ijkToRasMatrix)]
+      else:
+        sample[nodeIndex] = slicer.util.arrayFromTransformMatrix(node)
+    self.preRollBuffer.append([timestamp, sample])
+
+    # Discard samples older than pre-roll duration
+    while self.preRollBuffer and (self.preRollBuffer[0][0] < timestamp - self.preRollDuration):
+      self.preRollBuffer.popleft()
+
+  #------------------------------------------------------------------------------
+  def commitPreRollBuffer(self):
+    """
+    Add buffered samples to the sequences. Recording then continues after the last buffered sample.
+    """
+    buffer = list(self.preRollBuffer)
+    self.stopPreRollBuffering()
+    if not buffer or not self.sequenceBrowserNode or not self.isSequenceBrowserEmpty():
+      return
+
+    # Temporary nodes used to copy buffered data into the sequences
+    temporaryNodes = dict()
+    sequenceNodes = dict()
+    for nodeIndex, node in enumerate(self.synchronizedNodes):
+      temporaryNodes[nodeIndex] = slicer.mrmlScene.CreateNodeByClass(node.GetClassName())
+      temporaryNodes[nodeIndex].UnRegister(None)
+      sequenceNodes[nodeIndex] = self.sequenceBrowserNode.GetSequenceNode(node)
+
+    # Index values are relative to the first buffered sample
+    firstTimestamp = buffer[0][0]
+    modifiedFlag = self.sequenceBrowserNode.StartModify()
+    for timestamp, sample in buffer:
+      indexValue = '{:.6f}'.format(timestamp - firstTimestamp)
+      for nodeIndex, data in sample.items():
+        temporaryNode = temporaryNodes[nodeIndex]
+        if temporaryNode.IsA('vtkMRMLVolumeNode'):
+          imageArray, ijkToRasMatrix = data
+          slicer.util.updateVolumeFromArray(temporaryNode, imageArray)
+          temporaryNode.SetIJKToRASMatrix(slicer.util.vtkMatrixFromArray(ijkToRasMatrix))
+        else:
+          slicer.util.updateTransformMatrixFromArray(temporaryNode, data)
+        sequenceNodes[nodeIndex].SetDataNodeAtValue(temporaryNode, indexValue)
+    self.sequenceBrowserNode.EndModify(modifiedFlag)
+    logging.debug('Number of pre-roll samples added to recording: ' + str(len(buffer)))
+
+  #------------------------------------------------------------------------------
+  #
+  # Playback scheduler
+  #
+  #------------------------------------------------------------------------------
+  def setPlaybackSchedulerEnabled(self, enabled):
+    """
+    Enable or disable timestamp-based playback. If disabled, playback uses the fixed frame rate of the sequence browser.
+    :param enabled: scheduler enabled (bool)
+    """
+    self.playbackSchedulerEnabled = enabled
+
+  #------------------------------------------------------------------------------
+  def getPlaybackSpeed(self):
+    """
+    Get playback speed factor.
+    :return speed (float)
+    """
+    return self.playbackSpeed
+
+  #------------------------------------------------------------------------------
+  def setPlaybackSpeed(self, speed):
+    """
+    Set playback speed factor with respect to real time.
+    :param speed: speed factor between 0.25 and 8 (float)
+    """
+    self.playbackSpeed = min(max(speed, self.playbackSpeedRange[0]), self.playbackSpeedRange[1])
+    self.playbackLastItem = None # restart timing from current item
+
+  #------------------------------------------------------------------------------
+  def addPlaybackObserver(self):
+    """
+    Observe sequence browser to take over playback when it is started.
+    """
+    self.removePlaybackObserver()
+    if self.sequenceBrowserNode:
+      self.playbackObserverID = self.sequenceBrowserNode.AddObserver(vtk.vtkCommand.ModifiedEvent, self.onSequenceBrowserPlaybackModified)
+
+  #------------------------------------------------------------------------------
+  def removePlaybackObserver(self):
+    """
+    Stop scheduled playback and remove sequence browser observer.
+    """
+    self.stopScheduledPlayback()
+    if self.playbackObserverID and self.sequenceBrowserNode:
+      self.sequenceBrowserNode.RemoveObserver(self.playbackObserverID)
+    self.playbackObserverID = None
+
+  #------------------------------------------------------------------------------
+  def onSequenceBrowserPlaybackModified(self, caller = None, event = None):
+    """
+    Start or stop scheduled playback when playback is toggled in the sequence browser.
+    """
+    playbackActive = self.sequenceBrowserNode.GetPlaybackActive()
+    if playbackActive and not self.playbackTimer.isActive():
+      if self.playbackSchedulerEnabled and not self.recordingInProgress:
+        self.startScheduledPlayback()
+    elif not playbackActive and self.playbackTimer.isActive():
+      self.stopScheduledPlayback()
+
+  #------------------------------------------------------------------------------
+  def startScheduledPlayback(self):
+    """
+    Advance the sequence browser according to wall-clock time and master sequence timestamps.
+    Frames are skipped when rendering falls behind, so playback never lags.
+    """
+    self.playbackLastItem = None
+    self.playbackTimer.start()
+
+    # Prevent sequence browser from advancing items at its fixed frame rate
+    self.playbackRateFpsBackup = self.sequenceBrowserNode.GetPlaybackRateFps()
+    self.sequenceBrowserNode.SetPlaybackRateFps(1e-6)
+
+  #------------------------------------------------------------------------------
+  def stopScheduledPlayback(self):
+    """
+    Stop scheduled playback and restore sequence browser frame rate.
+    """
+    if not self.playbackTimer.isActive():
+      return
+    self.playbackTimer.stop()
+    if self.sequenceBrowserNode and self.playbackRateFpsBackup:
+      self.sequenceBrowserNode.SetPlaybackRateFps(self.playbackRateFpsBackup)
+    self.playbackRateFpsBackup = None
+
+  #------------------------------------------------------------------------------
+  def onPlaybackTimerTimeout(self):
+    """
+    Select item corresponding to current playback time.
+    """
+    timestamps = self.getMasterTimestamps()
+    if not self.sequenceBrowserNode or len(timestamps) == 0:
+      return
+    currentTime = vtk.vtkTimerLog.GetUniversalTime()
+
+    # Restart timing if item was selected by other means (e.g. seek slider)
+    selectedItem = self.sequenceBrowserNode.GetSelectedItemNumber()
+    if selectedItem != self.playbackLastItem:
+      self.playbackStartTimestamp = timestamps[min(max(selectedItem, 0), len(timestamps) - 1)]
+      self.playbackStartWallTime = currentTime
+
+    # Item at current playback time
+    playbackTimestamp = self.playbackStartTimestamp + (currentTime - self.playbackStartWallTime) * self.playbackSpeed
+    if playbackTimestamp > timestamps[-1]:
+      if self.sequenceBrowserNode.GetPlaybackLooped():
+        self.playbackStartTimestamp = timestamps[0]
+        self.playbackStartWallTime = currentTime
+        item = 0
+      else:
+        self.playbackLastItem = len(timestamps) - 1
+        self.sequenceBrowserNode.SetSelectedItemNumber(self.playbackLastItem)
+        self.sequenceBrowserNode.SetPlaybackActive(False)
+        return
+    else:
+      item = int(np.searchsorted(timestamps, playbackTimestamp, side='right')) - 1
+      item = max(item, 0)
+
+    # Update selected item
+    self.playbackLastItem = item
+    if item != selectedItem:
+      self.sequenceBrowserNode.SetSelectedItemNumber(item)
+
   #------------------------------------------------------------------------------
   def setPlaybackRealtime(self):
     """
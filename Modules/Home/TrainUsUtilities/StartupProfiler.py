@@ -0,0 +1,88 @@
+from __main__ import vtk, qt, slicer
+import logging
+import time
+from contextlib import contextmanager
+
+#------------------------------------------------------------------------------
+#
+# StartupProfiler
+#
+#------------------------------------------------------------------------------
+class StartupProfiler():
+  """
+  Measures the time spent in each step of the application startup (module setup, scene setup,
+  UI loading...) and logs a summary once the home screen is displayed. Steps can be nested, and
+  are listed in the order they started, indented by nesting level.
+
+  Steps measured after the summary was logged, such as exercise modules set up the first time
+  they are selected, are logged individually.
+
+  Usage:
+    profiler = StartupProfiler()
+    with profiler.measure('Home.setupUi'):
+      self.setupUi()
+    profiler.logSummary('Time to home screen')
+  """
+
+  #------------------------------------------------------------------------------
+  def __init__(self):
+    # Reference time, startup steps are measured from the creation of the profiler
+    self.startTime = time.perf_counter()
+
+    # Measured steps: (name, start time from reference in seconds, duration in seconds, nesting level)
+    self.steps = list()
+    self.nestingLevel = 0
+
+    # Summary is only logged once
+    self.summaryLogged = False
+
+  #------------------------------------------------------------------------------
+  @contextmanager
+  def measure(self, stepName):
+    """
+    Measure the time spent in a block of code.
+    :param stepName: name of the step, e.g. '<Module>.<function>' (string)
+    """
+    stepStartTime = time.perf_counter()
+    stepIndex = len(self.steps)
+    self.steps.append((stepName, stepStartTime - self.startTime, None, self.nestingLevel))
+    self.nestingLevel += 1
+    try:
+      yield
+    finally:
+      self.nestingLevel -= 1
+      duration = time.perf_counter() - stepStartTime
+      self.steps[stepIndex] = (stepName, stepStartTime - self.startTime, duration, self.steps[stepIndex][3])
+      if self.summaryLogged:
+        logging.info('{}: {:.0f} ms'.format(stepName, duration * 1000.0))
+
+  #------------------------------------------------------------------------------
+  def mark(self, eventName):
+    """
+    Record an event without duration, e.g. when Slicer completes its startup.
+    :param eventName: name of the event (string)
+    """
+    self.steps.append((eventName, time.perf_counter() - self.startTime, None, self.nestingLevel))
+
+  #------------------------------------------------------------------------------
+  def getElapsedTime(self):
+    """
+    Get time since the profiler was created.
+    :return elapsed time in seconds (float)
+    """
+    return time.perf_counter() - self.startTime
+
+  #------------------------------------------------------------------------------
+  def logSummary(self, title):
+    """
+    Log the measured steps and the total elapsed time. Only the first call logs the summary.
+    :param title: description of the total elapsed time, e.g. 'Time to home screen' (string)
+    """
+    if self.summaryLogged:
+      return
+    self.summaryLogged = True
+    lines = ['{}: {:.0f} ms'.format(title, self.getElapsedTime() * 1000.0)]
+    for stepName, stepStartTime, duration, nestingLevel in self.steps:
+      durationText = '{:8.0f} ms'.format(duration * 1000.0) if duration is not None else '        --'
+      lines.append('  [{:8.0f} ms] {} {}{}'.format(stepStartTime * 1000.0, durationText, '  ' * nestingLevel, stepName))
+    logging.info('\n'.join(lines))
@@ -1,6 +1,23 @@
 from .RecordingManager import *
+from .RecordingCatalog import *
+from .IDAllocator import *
+from .ParticipantSearchIndex import *
 from .DeviceManager import *
 from .SequenceBrowserUtils import *
+from .RecordingFrameCache import *
+from .RecordingMemoryMonitor import *
 from .LayoutUtils import *
 from .PlaybackPlotChartUtils import *
-from .MetricCalculationUtils import *
\ No newline at end of file
+from .MetricCalculationUtils import *
+from .MetricResultsCache import *
+from .DatabaseArchive import *
+from .FolderDeleter import *
+from .InfoTableModel import *
+from .ParticipantTableModel import *
+from .RecordingTableModel import *
+from .RecordingDetailsLoader import *
+from .LearningCurveAnalytics import *
+from .StartupProfiler import *
+from .AssetCache import *
+from .ModelPreprocessor import *
+from .ModelLevelOfDetailSwitcher import *
\ No newline at end of file
@@ -1,6 +1,9 @@
 from __main__ import vtk, qt, ctk, slicer
 import logging
 import os
+import numpy as np
+
+import TrainUsUtilities
 
 # TrainUS parameters
 import TrainUSLib.TrainUSParameters as Parameters
@@ -23,12 +26,25 @@ class Evaluation(qt.QWidget):
     self.newParticipantVisible = False
     self.editParticipantVisible = False
 
+    # Timer to search participants only after the user stops typing
+    self.participantSearchTimer = qt.QTimer()
+    self.participantSearchTimer.setSingleShot(True)
+    self.participantSearchTimer.setInterval(250)
+
+    # Timer to update learning curves once after several changes (e.g. details loaded in the background)
+    self.analyticsUpdateTimer = qt.QTimer()
+    self.analyticsUpdateTimer.setSingleShot(True)
+    self.analyticsUpdateTimer.setInterval(300)
+
   #------------------------------------------------------------------------------
   # Clean up when application is closed
   def cleanup(self):
     logging.debug('Evaluation.cleanup')
 
+    self.participantSearchTimer.stop()
+    self.analyticsUpdateTimer.stop()
     self.disconnect()
+    self.learningCurveAnalytics.removeNodesFromScene()
 
   #------------------------------------------------------------------------------
   def setupUi(self):
@@ -55,6 +71,11 @@ class Evaluation(qt.QWidget):
     self.ui.editParticipantSaveButton.enabled = True 
     self.ui.editParticipantCancelButton.enabled = True
 
+    # Participants table, displayed through a sort proxy so that only visible rows are rendered
+    self.participantsTableModel = TrainUsUtilities.ParticipantTableModel()
+    self.participantsTableProxyModel = self.participantsTableModel.createProxyModel()
+    self.ui.participantsTable.setModel(self.participantsTableProxyModel)
+
     # New participant input
     self.ui.newParticipantNameText.setText('')
     self.ui.newParticipantSurnameText.setText('')
@@ -90,7 +111,17 @@ class Evaluation(qt.QWidget):
     # Customize widgets - recordings tab
     self.ui.recordingDetailsGroupBox.visible = self.ui.recordingDetailsButton.checked
     self.ui.recordingDetailsButton.enabled = self.trainUsWidget.logic.recordingManager.isRecordingSelected()
-    
+
+    # Recordings table, with details computed in the background
+    self.recordingsTableModel = TrainUsUtilities.RecordingTableModel()
+    self.recordingsTableProxyModel = self.recordingsTableModel.createProxyModel()
+    self.ui.recordingsTable.setModel(self.recordingsTableProxyModel)
+
+    # Customize widgets - analytics tab (plot widget is created when the tab is displayed)
+    self.learningCurveAnalytics = TrainUsUtilities.LearningCurveAnalytics()
+    self.analyticsPlotWidget = None
+    self.ui.analyticsSummaryText.setText('')
+
     # Setup GUI connections
     self.setupConnections()
 
@@ -100,8 +131,9 @@ class Evaluation(qt.QWidget):
 
     # Participants tab
     self.ui.participantSearchText.textChanged.connect(self.onParticipantSearchTextChanged)
-    self.ui.participantsTable.itemSelectionChanged.connect(self.onParticipantsTableItemSelected)
-    self.ui.participantsTable.itemDoubleClicked.connect(self.onParticipantsTableItemDoubleClicked)
+    self.participantSearchTimer.timeout.connect(self.onParticipantSearchTimerTimeout)
+    self.ui.participantsTable.selectionModel().selectionChanged.connect(self.onParticipantsTableItemSelected)
+    self.ui.participantsTable.doubleClicked.connect(self.onParticipantsTableItemDoubleClicked)
     self.ui.checkRecordingsButton.clicked.connect(self.onCheckRecordingsButtonClicked)
     self.ui.newParticipantButton.clicked.connect(self.onNewParticipantButtonClicked)
     self.ui.editParticipantButton.clicked.connect(self.onEditParticipantButtonClicked)
@@ -111,11 +143,19 @@ class Evaluation(qt.QWidget):
     self.ui.editParticipantSaveButton.clicked.connect(self.onEditParticipantSaveButtonClicked)
     self.ui.editParticipantCancelButton.clicked.connect(self.onEditParticipantCancelButtonClicked)
     # Recordings tab
-    self.ui.recordingsTable.itemSelectionChanged.connect(self.onRecordingsTableItemSelected)
-    self.ui.recordingsTable.itemDoubleClicked.connect(self.onRecordingsTableItemDoubleClicked)
+    self.ui.recordingsTable.selectionModel().selectionChanged.connect(self.onRecordingsTableItemSelected)
+    self.ui.recordingsTable.doubleClicked.connect(self.onRecordingsTableItemDoubleClicked)
+    self.trainUsWidget.logic.recordingManager.recordingDetailsCallback = self.onRecordingDetailsLoaded
     self.ui.recordingDetailsButton.clicked.connect(self.onRecordingDetailsButtonClicked)
     self.ui.evaluateRecordingButton.clicked.connect(self.onEvaluateRecordingButtonClicked)
     self.ui.deleteRecordingButton.clicked.connect(self.onDeleteRecordingButtonClicked)
+    # Analytics tab
+    self.ui.tabWidget.currentChanged.connect(self.onTabChanged)
+    self.ui.analyticsScopeComboBox.currentIndexChanged.connect(self.onAnalyticsSettingsChanged)
+    self.ui.analyticsExerciseComboBox.currentIndexChanged.connect(self.onAnalyticsSettingsChanged)
+    self.ui.analyticsMetricComboBox.currentIndexChanged.connect(self.onAnalyticsSettingsChanged)
+    self.ui.analyticsWindowSpinBox.valueChanged.connect(self.onAnalyticsSettingsChanged)
+    self.analyticsUpdateTimer.timeout.connect(self.updateAnalytics)
     # Navigation bar    
     self.ui.previousPageButton.clicked.connect(self.onPreviousPageButtonClicked)
 
@@ -125,8 +165,9 @@ class Evaluation(qt.QWidget):
 
     # Participants tab
     self.ui.participantSearchText.textChanged.disconnect()
-    self.ui.participantsTable.itemSelectionChanged.disconnect()
-    self.ui.participantsTable.itemDoubleClicked.disconnect()
+    self.participantSearchTimer.timeout.disconnect()
+    self.ui.participantsTable.selectionModel().selectionChanged.disconnect()
+    self.ui.participantsTable.doubleClicked.disconnect()
     self.ui.checkRecordingsButton.clicked.disconnect()
     self.ui.newParticipantButton.clicked.disconnect()
     self.ui.editParticipantButton.clicked.disconnect()
@@ -136,11 +177,19 @@ class Evaluation(qt.QWidget):
     self.ui.editParticipantSaveButton.clicked.disconnect()
     self.ui.editParticipantCancelButton.clicked.disconnect()
     # Recordings tab
-    self.ui.recordingsTable.itemSelectionChanged.disconnect()
-    self.ui.recordingsTable.itemDoubleClicked.disconnect()
+    self.ui.recordingsTable.selectionModel().selectionChanged.disconnect()
+    self.ui.recordingsTable.doubleClicked.disconnect()
+    self.trainUsWidget.logic.recordingManager.recordingDetailsCallback = None
     self.ui.recordingDetailsButton.clicked.disconnect()
     self.ui.evaluateRecordingButton.clicked.disconnect()
     self.ui.deleteRecordingButton.clicked.disconnect()
+    # Analytics tab
+    self.ui.tabWidget.currentChanged.disconnect()
+    self.ui.analyticsScopeComboBox.currentIndexChanged.disconnect()
+    self.ui.analyticsExerciseComboBox.currentIndexChanged.disconnect()
+    self.ui.analyticsMetricComboBox.currentIndexChanged.disconnect()
+    self.ui.analyticsWindowSpinBox.valueChanged.disconnect()
+    self.analyticsUpdateTimer.timeout.disconnect()
     # Navigation bar    
     self.ui.previousPageButton.clicked.disconnect()
 
@@ -209,20 +258,22 @@ class Evaluation(qt.QWidget):
   
   #------------------------------------------------------------------------------
   def onParticipantSearchTextChanged(self, searchText):
+    # Restart timer, so that only the last search text of a burst of key presses is used
+    self.participantSearchTimer.start()
+
+  #------------------------------------------------------------------------------
+  def onParticipantSearchTimerTimeout(self):
     # Update table content
     self.homeWidget.updateParticipantsTable()
     self.homeWidget.updateRecordingsTable()
 
   #------------------------------------------------------------------------------
   def onParticipantsTableItemSelected(self):
-    # Get selected cells
+    # Get participant of selected row
     participantID = ''
-    selected = self.ui.participantsTable.selectedItems()
-    if selected:
-      for item in selected:
-        # Get data
-        if item.column() == 0: # participant ID is stored in column 0
-          participantID = item.text()
+    selectedRows = self.ui.participantsTable.selectionModel().selectedRows()
+    if selectedRows:
+      participantID = self.participantsTableModel.getIDFromProxyIndex(self.participantsTableProxyModel, selectedRows[0])
 
     # Update selected participant
     self.trainUsWidget.logic.recordingManager.setSelectedParticipantID(participantID)
@@ -230,6 +281,10 @@ class Evaluation(qt.QWidget):
     # Update recordings table
     self.homeWidget.updateRecordingsTable()
 
+    # Update learning curves of selected participant
+    if self.isAnalyticsTabVisible():
+      self.analyticsUpdateTimer.start()
+
     # Update GUI
     self.updateGUIFromMRML()
 
@@ -373,23 +428,11 @@ class Evaluation(qt.QWidget):
 
   #------------------------------------------------------------------------------
   def onRecordingsTableItemSelected(self):
-    # Get selected cells
+    # Get recording of selected row
     recordingID = ''
-    recordingDate = ''
-    recordingExercise = ''
-    recordingDuration = ''
-    selected = self.ui.recordingsTable.selectedItems()
-    if selected:
-      for item in selected:
-        # Get data
-        if item.column() == 0:
-          recordingID = item.text()
-        if item.column() == 1:
-          recordingDate = item.text()
-        if item.column() == 2:
-          recordingExercise = item.text()
-        if item.column() == 3:
-          recordingDuration = item.text()
+    selectedRows = self.ui.recordingsTable.selectionModel().selectedRows()
+    if selectedRows:
+      recordingID = self.recordingsTableModel.getIDFromProxyIndex(self.recordingsTableProxyModel, selectedRows[0])
 
     # Update selected recording
     self.trainUsWidget.logic.recordingManager.setSelectedRecordingID(recordingID)
@@ -397,6 +440,16 @@ class Evaluation(qt.QWidget):
     # Update GUI
     self.updateGUIFromMRML()
 
+  #------------------------------------------------------------------------------
+  def onRecordingDetailsLoaded(self, participantID, recordingID, details):
+    # Update row of recording if its participant is displayed
+    if participantID == self.trainUsWidget.logic.recordingManager.getSelectedParticipantID():
+      self.recordingsTableModel.setRecordingDetails(recordingID, details)
+
+    # Update learning curves once all pending details are loaded
+    if self.isAnalyticsTabVisible():
+      self.analyticsUpdateTimer.start()
+
   #------------------------------------------------------------------------------
   def onRecordingsTableItemDoubleClicked(self):
     self.onEvaluateRecordingButtonClicked()
@@ -435,10 +488,20 @@ class Evaluation(qt.QWidget):
       # Update tables    
       self.homeWidget.updateRecordingsTable()
 
+  #------------------------------------------------------------------------------
+  def onTabChanged(self, tabIndex):
+    # Update learning curves when analytics tab is displayed
+    if self.isAnalyticsTabVisible():
+      self.analyticsUpdateTimer.start()
+
+  #------------------------------------------------------------------------------
+  def onAnalyticsSettingsChanged(self):
+    self.analyticsUpdateTimer.start()
+
   #------------------------------------------------------------------------------
   def onPreviousPageButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 0) # switch to welcome page
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_WELCOME) # switch to welcome page
 
   #------------------------------------------------------------------------------
   #
@@ -542,4 +605,70 @@ class Evaluation(qt.QWidget):
       return True
     else:
       return False
-      
\ No newline at end of file
+      
+
+  #------------------------------------------------------------------------------
+  def isAnalyticsTabVisible(self):
+    return self.ui.tabWidget.currentWidget() == self.ui.analyticsTab
+
+  #------------------------------------------------------------------------------
+  def updateAnalytics(self):
+    """
+    Update learning curves plot from the overall metrics cached for the recordings of the selected
+    participant or of all participants.
+    """
+    if not self.isAnalyticsTabVisible():
+      return
+    recordingManager = self.trainUsWidget.logic.recordingManager
+    selectedParticipantID = recordingManager.getSelectedParticipantID()
+    allParticipants = (self.ui.analyticsScopeComboBox.currentIndex == 1)
+
+    # Get recordings with cached details, missing details are requested in the background
+    recordings = recordingManager.getRecordingsWithDetails(None if allParticipants else selectedParticipantID)
+    if (not allParticipants) and (not selectedParticipantID):
+      recordings = list()
+
+    # Update exercise and metric options, keeping current selection if available
+    exerciseNames = sorted(set(recording[4] for recording in recordings))
+    exerciseName = self.updateAnalyticsComboBox(self.ui.analyticsExerciseComboBox, exerciseNames)
+    metricNames = self.learningCurveAnalytics.getMetricNames(recordings, exerciseName)
+    metricName = self.updateAnalyticsComboBox(self.ui.analyticsMetricComboBox, metricNames)
+
+    # Compute learning curves
+    curves = None
+    if metricName:
+      participantIDs, sessionKeys, values = self.learningCurveAnalytics.getMetricValues(recordings, metricName, exerciseName)
+      curves = self.learningCurveAnalytics.computeLearningCurves(participantIDs, sessionKeys, values, self.ui.analyticsWindowSpinBox.value)
+
+    # Display plot
+    if not self.analyticsPlotWidget:
+      self.analyticsPlotWidget = slicer.qMRMLPlotWidget()
+      self.analyticsPlotWidget.setMRMLScene(slicer.mrmlScene)
+      self.ui.analyticsPlotFrame.layout().addWidget(self.analyticsPlotWidget)
+    plotChartNode = self.learningCurveAnalytics.createLearningCurvePlotChart(curves, metricName, selectedParticipantID)
+    self.analyticsPlotWidget.mrmlPlotViewNode().SetPlotChartNodeID(plotChartNode.GetID() if plotChartNode else None)
+
+    # Display summary
+    if curves is None:
+      self.ui.analyticsSummaryText.setText('')
+      return
+    numRecordings = int((~np.isnan(curves['values'])).sum())
+    summaryText = self.homeWidget.logic.analytics_summaryText
+    self.ui.analyticsSummaryText.setText(summaryText.format(len(curves['participantIDs']), numRecordings, float(np.mean(curves['slopes']))))
+
+  #------------------------------------------------------------------------------
+  def updateAnalyticsComboBox(self, comboBox, itemNames):
+    """
+    Set items of a combo box without triggering updates, keeping the current item if available.
+    :param comboBox: combo box (qt.QComboBox)
+    :param itemNames: items (list)
+    :return current item, or None if there are no items (string)
+    """
+    currentText = comboBox.currentText
+    wasBlocked = comboBox.blockSignals(True)
+    comboBox.clear()
+    comboBox.addItems(itemNames)
+    if currentText in itemNames:
+      comboBox.setCurrentIndex(itemNames.index(currentText))
+    comboBox.blockSignals(wasBlocked)
+    return comboBox.currentText if itemNames else None
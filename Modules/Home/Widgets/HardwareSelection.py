@@ -113,12 +113,12 @@ class HardwareSelection(qt.QWidget):
   #------------------------------------------------------------------------------
   def onPreviousPageButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 1)
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_PARTICIPANT_SELECTION)
 
   #------------------------------------------------------------------------------
   def onNextPageButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 3)
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_REVIEW_SELECTION)
 
   #------------------------------------------------------------------------------
   #
@@ -2,6 +2,11 @@ from __main__ import vtk, qt, ctk, slicer
 import logging
 import os
 
+import TrainUsUtilities
+
+# TrainUS parameters
+import TrainUSLib.TrainUSParameters as Parameters
+
 #------------------------------------------------------------------------------
 #
 # ParticipantSelection
@@ -20,11 +25,17 @@ class ParticipantSelection(qt.QWidget):
     self.newParticipantVisible = False
     self.editParticipantVisible = False
 
+    # Timer to search participants only after the user stops typing
+    self.participantSearchTimer = qt.QTimer()
+    self.participantSearchTimer.setSingleShot(True)
+    self.participantSearchTimer.setInterval(250)
+
   #------------------------------------------------------------------------------
   # Clean up when application is closed
   def cleanup(self):
     logging.debug('ParticipantSelection.cleanup')
 
+    self.participantSearchTimer.stop()
     self.disconnect()
 
   #------------------------------------------------------------------------------
@@ -53,6 +64,11 @@ class ParticipantSelection(qt.QWidget):
     self.ui.previousPageButton.enabled = True
     self.ui.nextPageButton.enabled = False
 
+    # Participants table, displayed through a sort proxy so that only visible rows are rendered
+    self.participantsTableModel = TrainUsUtilities.ParticipantTableModel()
+    self.participantsTableProxyModel = self.participantsTableModel.createProxyModel()
+    self.ui.participantsTable.setModel(self.participantsTableProxyModel)
+
     # New participant input
     self.ui.newParticipantNameText.setText('')
     self.ui.newParticipantSurnameText.setText('')
@@ -93,7 +109,8 @@ class ParticipantSelection(qt.QWidget):
     logging.debug('ParticipantSelection.setupConnections')
 
     self.ui.participantSearchText.textChanged.connect(self.onParticipantSearchTextChanged)
-    self.ui.participantsTable.itemSelectionChanged.connect(self.onParticipantSelectionTableItemSelected)
+    self.participantSearchTimer.timeout.connect(self.onParticipantSearchTimerTimeout)
+    self.ui.participantsTable.selectionModel().selectionChanged.connect(self.onParticipantSelectionTableItemSelected)
     self.ui.newParticipantButton.clicked.connect(self.onNewParticipantButtonClicked)
     self.ui.editParticipantButton.clicked.connect(self.onEditParticipantButtonClicked)
     self.ui.deleteParticipantButton.clicked.connect(self.onDeleteParticipantButtonClicked)
@@ -109,7 +126,8 @@ class ParticipantSelection(qt.QWidget):
     logging.debug('ParticipantSelection.disconnect')
 
     self.ui.participantSearchText.textChanged.disconnect()
-    self.ui.participantsTable.itemSelectionChanged.disconnect()
+    self.participantSearchTimer.timeout.disconnect()
+    self.ui.participantsTable.selectionModel().selectionChanged.disconnect()
     self.ui.newParticipantButton.clicked.disconnect()
     self.ui.editParticipantButton.clicked.disconnect()
     self.ui.deleteParticipantButton.clicked.disconnect()
@@ -161,7 +179,11 @@ class ParticipantSelection(qt.QWidget):
   
   #------------------------------------------------------------------------------
   def onParticipantSearchTextChanged(self, searchText):
-    
+    # Restart timer, so that only the last search text of a burst of key presses is used
+    self.participantSearchTimer.start()
+
+  #------------------------------------------------------------------------------
+  def onParticipantSearchTimerTimeout(self):
     # Update table content
     self.homeWidget.updateParticipantsTable()
 
@@ -170,14 +192,11 @@ class ParticipantSelection(qt.QWidget):
 
   #------------------------------------------------------------------------------
   def onParticipantSelectionTableItemSelected(self):
-    # Get selected cells
+    # Get participant of selected row
     participantID = ''
-    selected = self.ui.participantsTable.selectedItems()
-    if selected:
-      for item in selected:
-        # Get data
-        if item.column() == 0: # participant ID is stored in column 0
-          participantID = item.text()
+    selectedRows = self.ui.participantsTable.selectionModel().selectedRows()
+    if selectedRows:
+      participantID = self.participantsTableModel.getIDFromProxyIndex(self.participantsTableProxyModel, selectedRows[0])
 
     # Update selected participant
     self.trainUsWidget.logic.recordingManager.setSelectedParticipantID(participantID)
@@ -187,8 +206,9 @@ class ParticipantSelection(qt.QWidget):
 
   #------------------------------------------------------------------------------
   def onNewParticipantButtonClicked(self):
-    # Update table content to remove current selection
+    # Update table content and remove current selection
     self.homeWidget.updateParticipantsTable()
+    self.ui.participantsTable.clearSelection()
 
     # Update group box visibility
     self.newParticipantVisible = True
@@ -317,16 +337,16 @@ class ParticipantSelection(qt.QWidget):
   #------------------------------------------------------------------------------
   def onPreviousPageButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 2) # TODO: if switching directly to mode 0, UI moves to the bottom. 
-    self.homeWidget.logic.setMode(modeID = 3) # After a few times, buttons go out of the screen. Why does this happen?
-    self.homeWidget.logic.setMode(modeID = 4)
-    self.homeWidget.logic.setMode(modeID = 5) 
-    self.homeWidget.logic.setMode(modeID = 0) # switch back to welcome page
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_HARDWARE_SELECTION) # TODO: if switching directly to mode 0, UI moves to the bottom. 
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_REVIEW_SELECTION) # After a few times, buttons go out of the screen. Why does this happen?
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_PLUG_AND_PLAY)
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_TRAINING_SESSION) 
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_WELCOME) # switch back to welcome page
 
   #------------------------------------------------------------------------------
   def onNextPageButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 2) # switch to hardware selection page
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_HARDWARE_SELECTION) # switch to hardware selection page
 
 
   #------------------------------------------------------------------------------
@@ -2,6 +2,9 @@ from __main__ import vtk, qt, ctk, slicer
 import logging
 import os
 
+# TrainUS parameters
+import TrainUSLib.TrainUSParameters as Parameters
+
 #------------------------------------------------------------------------------
 #
 # PlugAndPlay
@@ -79,12 +82,12 @@ class PlugAndPlay(qt.QWidget):
   #------------------------------------------------------------------------------
   def onPreviousPageButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 3)
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_REVIEW_SELECTION)
 
   #------------------------------------------------------------------------------
   def onNextPageButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 5)
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_TRAINING_SESSION)
 
   #------------------------------------------------------------------------------
   #
@@ -2,6 +2,9 @@ from __main__ import vtk, qt, ctk, slicer
 import logging
 import os
 
+# TrainUS parameters
+import TrainUSLib.TrainUSParameters as Parameters
+
 #------------------------------------------------------------------------------
 #
 # ReviewSelection
@@ -86,22 +89,22 @@ class ReviewSelection(qt.QWidget):
   #------------------------------------------------------------------------------
   def onEditParticipantSelectionButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 1)
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_PARTICIPANT_SELECTION)
 
   #------------------------------------------------------------------------------
   def onEditHardwareSelectionButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 2)
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_HARDWARE_SELECTION)
 
   #------------------------------------------------------------------------------
   def onPreviousPageButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 2)
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_HARDWARE_SELECTION)
 
   #------------------------------------------------------------------------------
   def onNextPageButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 4)
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_PLUG_AND_PLAY)
 
     # Select first tab in training session tab widget
     self.homeWidget.ui.TrainingSessionPanel.ui.trainingTabWidget.currentIndex = 0
@@ -175,7 +175,7 @@ class TrainingSession(qt.QWidget):
   #------------------------------------------------------------------------------
   def onFinishTrainingButtonClicked(self):
     # Update UI page
-    self.homeWidget.logic.setMode(modeID = 0) # switch back to welcome page
+    self.homeWidget.logic.setMode(modeID = Parameters.APP_MODE_WELCOME) # switch back to welcome page
 
   
   #------------------------------------------------------------------------------
@@ -65,13 +65,15 @@ class TrainUSWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     slicer.trainUsWidget = self
 
     # Remove unneeded UI elements
-    self.modifyWindowUI()
+    with self.logic.startupProfiler.measure('TrainUS.modifyWindowUI'):
+      self.modifyWindowUI()
 
     # Setup connections
     self.setupConnections()
 
     # Apply style
-    self.applyApplicationStyle()
+    with self.logic.startupProfiler.measure('TrainUS.applyApplicationStyle'):
+      self.applyApplicationStyle()
 
     # Avoid style to be applied by default
     #self.settingsUI.CustomStyleCheckBox.checked = False
@@ -144,11 +146,9 @@ class TrainUSWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     gearIcon = qt.QIcon(self.resourcePath('Icons/Gears.png'))
     self.settingsAction = self.CustomToolBar.addAction(gearIcon, "")
 
-    self.settingsDialog = slicer.util.loadUI(self.resourcePath('UI/Settings.ui'))
-    self.settingsUI = slicer.util.childWidgetVariables(self.settingsDialog)
-
-    self.settingsUI.CustomUICheckBox.toggled.connect(self.toggleUI)
-    self.settingsUI.CustomStyleCheckBox.toggled.connect(self.toggleStyle)
+    # Settings dialog is loaded the first time it is opened
+    self.settingsDialog = None
+    self.settingsUI = None
 
     self.settingsAction.triggered.connect(self.raiseSettings)
     self.hideSlicerUI()
@@ -169,6 +169,11 @@ class TrainUSWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
 
   #------------------------------------------------------------------------------
   def raiseSettings(self, unused):
+    if not self.settingsDialog:
+      self.settingsDialog = slicer.util.loadUI(self.resourcePath('UI/Settings.ui'))
+      self.settingsUI = slicer.util.childWidgetVariables(self.settingsDialog)
+      self.settingsUI.CustomUICheckBox.toggled.connect(self.toggleUI)
+      self.settingsUI.CustomStyleCheckBox.toggled.connect(self.toggleStyle)
     self.settingsDialog.exec()
 
   #------------------------------------------------------------------------------
@@ -186,6 +191,8 @@ class TrainUSWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
 
   #------------------------------------------------------------------------------
   def onStartupCompleted(self):
+    self.logic.startupProfiler.mark('Slicer startup completed')
+
     # Apply singleton parameter node settings to application
     Parameters.instance.setParameterNode(self.logic.getParameterNode())
 
@@ -221,6 +228,9 @@ class TrainUSLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
     # Pointer to the parameter node so that we have access to the old one before setting the new one
     self.parameterNode = None
 
+    # Measure time of startup steps, logged when the home screen is displayed
+    self.startupProfiler = TrainUsUtilities.StartupProfiler()
+
     # Parameters
     Parameters.instance = Parameters(widgetInstance)
 
@@ -229,13 +239,18 @@ class TrainUSLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
     self.deviceDirectoryPath = self.moduleWidget.resourcePath('DeviceConfig')
 
     # Data manager to handle participants and recordings
-    self.recordingManager = TrainUsUtilities.RecordingManager()
-    self.recordingManager.setRootDirectory(self.rootDirectoryPath)
+    with self.startupProfiler.measure('RecordingManager.setRootDirectory'):
+      self.recordingManager = TrainUsUtilities.RecordingManager()
+      self.recordingManager.setRootDirectory(self.rootDirectoryPath)
 
     # Device manager to access device info
-    self.deviceManager = TrainUsUtilities.DeviceManager()
-    self.deviceManager.setMainDirectory(self.deviceDirectoryPath)
-    self.deviceManager.readMainDirectory()
+    with self.startupProfiler.measure('DeviceManager.readMainDirectory'):
+      self.deviceManager = TrainUsUtilities.DeviceManager()
+      self.deviceManager.setMainDirectory(self.deviceDirectoryPath)
+      self.deviceManager.readMainDirectory()
+
+    # Cache of exercise assets (models, transforms, markups, instructions) shared by all exercises
+    self.assetCache = TrainUsUtilities.AssetCache()
 
     # Hardware configurations
     self.ultrasoundDeviceOptions = ['None'] + self.deviceManager.getListOfRegisteredUltrasoundDevices()
@@ -289,7 +304,8 @@ class TrainUSLogic(ScriptedLoadableModuleLogic, VTKObservationMixin):
     self.igtlConnectorNodeIDParameterName = 'IGTLConnectorNodeID'
 
     # Setup scene
-    self.setupScene()
+    with self.startupProfiler.measure('TrainUS.setupScene'):
+      self.setupScene()
 
     # Setup keyboard shortcuts
     self.setupKeyboardShortcuts()
@@ -20,6 +20,13 @@ class TrainUSParameters(VTKObservationMixin):
   The TrainUSLogic class still owns the parameter node (being subclass of
   GuideletLogic), but this class encapsulates the related functionality for
   easier usage and better code readability and maintainability.
+
+  Parameter values are kept in memory, so that getters do not access the
+  parameter node, and typed values are only parsed once after each change.
+  Changed values are written to the parameter node (for scene persistence)
+  in a single batch when control returns to the event loop, and functions
+  registered with addParameterObserver are called when a given parameter
+  changes, instead of on every modification of the parameter node.
   """
 
   instance = None
@@ -62,10 +69,22 @@ class TrainUSParameters(VTKObservationMixin):
   PLUS_SERVER_LAUNCHER_PATH = 'PlusServerLauncherPath'
   PLUS_CONNECTION_STATUS = 'PlusConnectionStatus'
   IGTL_CONNECTION_STATUS = 'IGTLConnectionStatus'
+  LAZY_RECORDING_LOADING = 'LazyRecordingLoading'
+  RECORDING_PRE_ROLL_DURATION = 'RecordingPreRollDuration'
+  RECORDING_MEMORY_BUDGET = 'RecordingMemoryBudgetMB'
+  TRACKING_DATA_FILE_FORMAT = 'TrackingDataFileFormat'
 
   #
   # Constants
   #
+  APP_MODE_WELCOME = 0
+  APP_MODE_PARTICIPANT_SELECTION = 1 # start training - step 1
+  APP_MODE_HARDWARE_SELECTION = 2 # start training - step 2
+  APP_MODE_REVIEW_SELECTION = 3 # start training - step 3
+  APP_MODE_PLUG_AND_PLAY = 4 # start training - step 4
+  APP_MODE_TRAINING_SESSION = 5
+  APP_MODE_EVALUATION = 6
+  APP_MODE_CONFIGURATION = 7
   APP_USE_CASE_RECORDING = 'Recording'
   APP_USE_CASE_EVALUATION = 'Evaluation'
   EXERCISE_BASIC_INPLANE_INSERTION = 'In-plane needle insertion'
@@ -115,6 +134,25 @@ class TrainUSParameters(VTKObservationMixin):
     self.defaultParameters[self.PLUS_SERVER_LAUNCHER_PATH] = ''
     self.defaultParameters[self.PLUS_CONNECTION_STATUS] = 'OFF'
     self.defaultParameters[self.IGTL_CONNECTION_STATUS] = 'OFF'
+    self.defaultParameters[self.LAZY_RECORDING_LOADING] = 'True'
+    self.defaultParameters[self.RECORDING_PRE_ROLL_DURATION] = '0.0'
+    self.defaultParameters[self.RECORDING_MEMORY_BUDGET] = '2048'
+    self.defaultParameters[self.TRACKING_DATA_FILE_FORMAT] = 'npz'
+
+    # Parameter values kept in memory, and typed values parsed from them
+    self.parameterValues = {}
+    self.typedParameterValues = {}
+
+    # Values not written to the parameter node yet
+    self.pendingParameterValues = {}
+    self.writingParameters = False
+    self.writeTimer = qt.QTimer()
+    self.writeTimer.setSingleShot(True)
+    self.writeTimer.setInterval(0)
+    self.writeTimer.connect('timeout()', self.writePendingParameters)
+
+    # Functions called when a parameter changes, for each parameter name
+    self.parameterObservers = {}
 
   def getParameterNode(self):
     """
@@ -136,18 +174,24 @@ class TrainUSParameters(VTKObservationMixin):
 
     # Remove observations from nodes referenced in the old parameter node
     if self.parameterNode:
+      self.writePendingParameters()
+      self.removeObserver(self.parameterNode, vtk.vtkCommand.ModifiedEvent, self.onParameterNodeModified)
       self.removeObserver(self.parameterNode, vtk.vtkCommand.ModifiedEvent, self.trainUsWidgetInstance.updateGUIFromMRML)
 
-    # Reset member variables
-    #TODO: If any
+    # Reset values kept in memory, so that values of the old parameter node are not returned
+    previousParameterValues = self.parameterValues
+    self.parameterValues = {}
+    self.typedParameterValues = {}
+    self.pendingParameterValues = {}
 
     #
     # Set parameter node member variable (so that we have access to the old one before setting the new one)
     #
     self.parameterNode = inputParameterNode
 
-    # Add observations on referenced nodes
+    # Add observations on referenced nodes (values in memory are updated before other observers are called)
     if self.parameterNode:
+      self.addObserver(self.parameterNode, vtk.vtkCommand.ModifiedEvent, self.onParameterNodeModified, priority=1.0)
       self.addObserver(self.parameterNode, vtk.vtkCommand.ModifiedEvent, self.trainUsWidgetInstance.updateGUIFromMRML)
 
     # Make sure parameter node is associated to this module
@@ -155,9 +199,16 @@ class TrainUSParameters(VTKObservationMixin):
       self.parameterNode.SetModuleName(self.trainUsWidgetInstance.moduleName)
 
     #
-    # Set default parameters if missing
+    # Set default parameters if missing (values are read from the node below)
     #
-    self.setDefaultParameters()
+    self.writingParameters = True
+    try:
+      self.setDefaultParameters()
+    finally:
+      self.writingParameters = False
+
+    # Read values of the new parameter node, notifying observers of values that differ from the old node
+    self.readParametersFromNode(previousParameterValues)
 
     # Create nodes that are persistent in the scene and missing
     #TODO: If any, like the basic transformation nodes or an SH folder
@@ -221,7 +272,9 @@ class TrainUSParameters(VTKObservationMixin):
 
   def setParameter(self, parameterName, parameterValue):
     """
-    Convenience function to set a parameter in the parameter node
+    Convenience function to set a parameter. The value is available immediately from the getters and
+    is written to the parameter node together with other changes when control returns to the event loop.
+    Observers of the parameter are only called if the value changes.
     :param string parameterName: Name of the parameter. Should be coming from a constant stored as member variable
     :param string parameterValue: Value of the parameter. Any value is accepted and converted to string
     """
@@ -229,63 +282,164 @@ class TrainUSParameters(VTKObservationMixin):
     if not parameterNode:
       raise Exception('Failed to set value %s to parameter named %s due to missing parameter node' % (str(parameterValue), parameterName))
 
-    parameterNode.SetParameter(parameterName, str(parameterValue))
+    value = str(parameterValue)
+    if self.getParameterValue(parameterName) == value:
+      return
+    self.pendingParameterValues[parameterName] = value
+    self.setParameterValue(parameterName, value)
+    if not self.writeTimer.isActive():
+      self.writeTimer.start()
+    self.notifyParameterObservers([parameterName])
 
   def getParameterBool(self, parameterName):
     """
-    Convenience function to get a boolean parameter from the parameter node
+    Convenience function to get a boolean parameter
     :param string parameterName: Name of the parameter. Should be coming from a constant stored as member variable
     :return bool: The parameter value if found, False otherwise
     """
-    parameterNode = self.getParameterNode()
-    if not parameterNode:
-      raise Exception('Failed to get value of parameter named %s due to missing parameter node' % (parameterName))
-
-    value = parameterNode.GetParameter(parameterName)
-    return (value == 'True')
+    return (self.getParameterValue(parameterName) == 'True')
 
   def getParameterInt(self, parameterName):
     """
-    Convenience function to get an integer parameter from the parameter node
+    Convenience function to get an integer parameter
     :param string parameterName: Name of the parameter. Should be coming from a constant stored as member variable
     :return int: The parameter value if found, 0 otherwise
     """
-    parameterNode = self.getParameterNode()
-    if not parameterNode:
-      raise Exception('Failed to get value of parameter named %s due to missing parameter node' % (parameterName))
-
-    value = parameterNode.GetParameter(parameterName)
-    try:
-      return int(value)
-    except ValueError:
-      logging.error('Failed to convert value %s of parameter %s to integer. Returning zero' % (str(value), parameterName))
-      raise
+    typedValues = self.typedParameterValues.setdefault(parameterName, {})
+    if int not in typedValues:
+      value = self.getParameterValue(parameterName)
+      try:
+        typedValues[int] = int(value)
+      except ValueError:
+        logging.error('Failed to convert value %s of parameter %s to integer. Returning zero' % (str(value), parameterName))
+        raise
+    return typedValues[int]
 
   def getParameterFloat(self, parameterName):
     """
-    Convenience function to get a floating point parameter from the parameter node
+    Convenience function to get a floating point parameter
     :param string parameterName: Name of the parameter. Should be coming from a constant stored as member variable
     :return float: The parameter value if found, 0 otherwise
     """
-    parameterNode = self.getParameterNode()
-    if not parameterNode:
-      raise Exception('Failed to get value of parameter named %s due to missing parameter node' % (parameterName))
-
-    value = parameterNode.GetParameter(parameterName)
-    try:
-      return float(value)
-    except ValueError:
-      logging.error('Failed to convert value %s of parameter %s to floating point number. Returning zero' % (str(value), parameterName))
-      raise
+    typedValues = self.typedParameterValues.setdefault(parameterName, {})
+    if float not in typedValues:
+      value = self.getParameterValue(parameterName)
+      try:
+        typedValues[float] = float(value)
+      except ValueError:
+        logging.error('Failed to convert value %s of parameter %s to floating point number. Returning zero' % (str(value), parameterName))
+        raise
+    return typedValues[float]
 
   def getParameterString(self, parameterName):
     """
-    Convenience function to get a string parameter from the parameter node
+    Convenience function to get a string parameter
     :param string parameterName: Name of the parameter. Should be coming from a constant stored as member variable
     :return string: The parameter value if found, empty string otherwise
     """
+    return self.getParameterValue(parameterName)
+
+  def getParameterValue(self, parameterName):
+    """
+    Get the value of a parameter kept in memory, reading it from the parameter node the first time.
+    :param string parameterName: Name of the parameter
+    :return string: The parameter value if found, empty string otherwise
+    """
+    if parameterName in self.parameterValues:
+      return self.parameterValues[parameterName]
+
     parameterNode = self.getParameterNode()
     if not parameterNode:
       raise Exception('Failed to get value of parameter named %s due to missing parameter node' % (parameterName))
 
-    return parameterNode.GetParameter(parameterName)
+    self.setParameterValue(parameterName, parameterNode.GetParameter(parameterName))
+    return self.parameterValues[parameterName]
+
+  def setParameterValue(self, parameterName, value):
+    """
+    Set the value of a parameter kept in memory, discarding typed values parsed from the previous value.
+    """
+    self.parameterValues[parameterName] = value
+    self.typedParameterValues.pop(parameterName, None)
+
+  def writePendingParameters(self):
+    """
+    Write changed values to the parameter node in a single batch, so that observers of the parameter node
+    are notified once.
+    """
+    self.writeTimer.stop()
+    if not self.pendingParameterValues:
+      return
+    pendingParameterValues = self.pendingParameterValues
+    self.pendingParameterValues = {}
+
+    parameterNode = self.getParameterNode()
+    if not parameterNode:
+      logging.error('Failed to write parameters due to missing parameter node')
+      return
+
+    self.writingParameters = True
+    try:
+      wasModified = parameterNode.StartModify()
+      for parameterName, value in pendingParameterValues.items():
+        parameterNode.SetParameter(parameterName, value)
+      parameterNode.EndModify(wasModified)
+    finally:
+      self.writingParameters = False
+
+  def readParametersFromNode(self, previousParameterValues=None):
+    """
+    Update values kept in memory from the parameter node, e.g. when a scene is loaded or other code modifies
+    the node directly. Observers of the parameters that changed are called.
+    :param dict previousParameterValues: Values of the previous parameter node when the node is replaced. Values
+      are compared to these instead of the values in memory, including parameters missing from the new node
+    """
+    parameterNode = self.getParameterNode()
+    if not parameterNode:
+      return
+
+    parameterNames = list(parameterNode.GetParameterNames())
+    if previousParameterValues is None:
+      previousParameterValues = self.parameterValues
+    else:
+      parameterNames += sorted(set(previousParameterValues.keys()) - set(parameterNames))
+
+    changedParameterNames = []
+    for parameterName in parameterNames:
+      if parameterName in self.pendingParameterValues:
+        continue # value in memory is newer
+      value = parameterNode.GetParameter(parameterName)
+      if previousParameterValues.get(parameterName) != value:
+        self.setParameterValue(parameterName, value)
+        changedParameterNames.append(parameterName)
+    self.notifyParameterObservers(changedParameterNames)
+
+  def onParameterNodeModified(self, caller=None, event=None):
+    if self.writingParameters:
+      return # values in memory are already up to date
+    self.readParametersFromNode()
+
+  def addParameterObserver(self, parameterName, callback):
+    """
+    Call a function when the value of a parameter changes.
+    :param string parameterName: Name of the parameter. Should be coming from a constant stored as member variable
+    :param callable callback: Function called with the parameter name and new value
+    """
+    callbacks = self.parameterObservers.setdefault(parameterName, [])
+    if callback not in callbacks:
+      callbacks.append(callback)
+
+  def removeParameterObserver(self, parameterName, callback):
+    """
+    Stop calling a function added with addParameterObserver.
+    :param string parameterName: Name of the parameter
+    :param callable callback: Function to remove
+    """
+    callbacks = self.parameterObservers.get(parameterName, [])
+    if callback in callbacks:
+      callbacks.remove(callback)
+
+  def notifyParameterObservers(self, parameterNames):
+    for parameterName in parameterNames:
+      for callback in list(self.parameterObservers.get(parameterName, [])):
+        callback(parameterName, self.parameterValues[parameterName])